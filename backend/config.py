@@ -7,9 +7,164 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = "gemini-2.5-flash"
 
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
-EMBEDDING_DIM = 384
+EMBEDDING_MODEL_DIM = 384
+# Optional PCA reduction of stored and query vectors; 0 keeps the model's dimension.
+# The Actian collection and local indexes use EMBEDDING_DIM.
+EMBEDDING_REDUCED_DIM = int(os.getenv("EMBEDDING_REDUCED_DIM", "0"))
+EMBEDDING_DIM = EMBEDDING_REDUCED_DIM or EMBEDDING_MODEL_DIM
 CONFIDENCE_THRESHOLD = 0.65
 
 ACTIAN_HOST = os.getenv("ACTIAN_HOST", "localhost")
 ACTIAN_PORT = os.getenv("ACTIAN_PORT", "50051")
 ACTIAN_ADDRESS = f"{ACTIAN_HOST}:{ACTIAN_PORT}"
+
+# Comma-separated host:port list to shard the catalog across several Actian nodes.
+# Points go to the shard picked by their ID (a hash of product_code) and searches
+# query every shard, merging the top-k; a shard slower than ACTIAN_SHARD_TIMEOUT_MS
+# is left out of the serving API's results. Defaults to the single ACTIAN_ADDRESS.
+ACTIAN_SHARDS = [a.strip() for a in os.getenv("ACTIAN_SHARDS", ACTIAN_ADDRESS).split(",") if a.strip()]
+ACTIAN_SHARD_TIMEOUT_MS = float(os.getenv("ACTIAN_SHARD_TIMEOUT_MS", "1000"))
+
+# Each ACTIAN_SHARDS entry may list read replicas joined with "|", e.g.
+# "a:50051|b:50051,c:50051|d:50051". Reads go to the replica with the fewest
+# requests in flight, writes go to every replica, and a replica failing its
+# health_check (polled every ACTIAN_HEALTH_INTERVAL_SECONDS) is taken out of
+# rotation until it passes again. ACTIAN_HEDGE_PERCENTILE > 0 (e.g. 95) sends a
+# duplicate read to a second replica once the first is slower than that
+# percentile of recent latencies; 0 disables hedging.
+ACTIAN_HEALTH_INTERVAL_SECONDS = float(os.getenv("ACTIAN_HEALTH_INTERVAL_SECONDS", "5"))
+ACTIAN_HEDGE_PERCENTILE = float(os.getenv("ACTIAN_HEDGE_PERCENTILE", "0"))
+
+# Async gRPC connection pool used by the API (see services/actian.py)
+ACTIAN_POOL_SIZE = int(os.getenv("ACTIAN_POOL_SIZE", "4"))
+ACTIAN_KEEPALIVE_MS = int(os.getenv("ACTIAN_KEEPALIVE_MS", "30000"))
+ACTIAN_KEEPALIVE_TIMEOUT_MS = int(os.getenv("ACTIAN_KEEPALIVE_TIMEOUT_MS", "10000"))
+ACTIAN_TIMEOUT_SECONDS = float(os.getenv("ACTIAN_TIMEOUT_SECONDS", "10"))
+
+# In-process product payload cache in ActianClient (set size to 0 to disable)
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "5000"))
+PRODUCT_CACHE_TTL_SECONDS = float(os.getenv("PRODUCT_CACHE_TTL_SECONDS", "600"))
+PRODUCT_CACHE_VECTORS = os.getenv("PRODUCT_CACHE_VECTORS", "true").lower() == "true"
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# Two-phase retrieval: score-only search + local rerank fields, then hydrate the winners
+TWO_PHASE_RETRIEVAL = os.getenv("TWO_PHASE_RETRIEVAL", "true").lower() == "true"
+RERANK_FIELDS_PATH = os.getenv("RERANK_FIELDS_PATH", os.path.join(DATA_DIR, "rerank_fields.json"))
+
+# Bulky payload fields live in a local read-only SQLite file instead of Actian
+COLD_STORE_PATH = os.getenv("COLD_STORE_PATH", os.path.join(DATA_DIR, "cold_store.sqlite"))
+
+# Local vector search over data/embeddings.npy: "actian" (default), "exact", "hnsw" or "int8".
+# With LOCAL_SEARCH_FALLBACK the local engine also answers when Actian search fails.
+SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "actian").lower()
+LOCAL_SEARCH_FALLBACK = os.getenv("LOCAL_SEARCH_FALLBACK", "true").lower() == "true"
+EMBEDDINGS_PATH = os.getenv("EMBEDDINGS_PATH", os.path.join(DATA_DIR, "embeddings.npy"))
+EMBEDDING_INDEX_PATH = os.getenv("EMBEDDING_INDEX_PATH", os.path.join(DATA_DIR, "embedding_index.json"))
+
+# HNSW index built by scripts/build_hnsw_index.py (SEARCH_ENGINE=hnsw).
+HNSW_INDEX_PATH = os.getenv("HNSW_INDEX_PATH", os.path.join(DATA_DIR, "products.hnsw"))
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "64"))
+
+# int8 codes from scripts/quantize_embeddings.py (SEARCH_ENGINE=int8). The int8 scan
+# keeps top_k * QUANTIZED_RESCORE_FACTOR candidates and rescores them against
+# RESCORE_EMBEDDINGS_PATH.
+QUANTIZED_EMBEDDINGS_PATH = os.getenv("QUANTIZED_EMBEDDINGS_PATH", os.path.join(DATA_DIR, "embeddings_int8.npy"))
+QUANTIZATION_PARAMS_PATH = os.getenv("QUANTIZATION_PARAMS_PATH", os.path.join(DATA_DIR, "embeddings_int8_params.npz"))
+RESCORE_EMBEDDINGS_PATH = os.getenv("RESCORE_EMBEDDINGS_PATH", os.path.join(DATA_DIR, "embeddings_f16.npy"))
+QUANTIZED_RESCORE_FACTOR = int(os.getenv("QUANTIZED_RESCORE_FACTOR", "4"))
+
+# PCA projection fitted by the embedding pipeline when EMBEDDING_REDUCED_DIM is set.
+# The unreduced model output is kept alongside for scripts/bench_pca.py.
+PCA_PROJECTION_PATH = os.getenv("PCA_PROJECTION_PATH", os.path.join(DATA_DIR, "pca_projection.npz"))
+PCA_WHITEN = os.getenv("PCA_WHITEN", "false").lower() == "true"
+# The streaming setup.py fits the projection on the first PCA_FIT_ROWS products.
+PCA_FIT_ROWS = int(os.getenv("PCA_FIT_ROWS", "50000"))
+EMBEDDINGS_FULL_PATH = os.getenv("EMBEDDINGS_FULL_PATH", os.path.join(DATA_DIR, "embeddings_full.npy"))
+
+# Category partitions (data/partitions.json, written at ingest). Greener-alternative
+# search stays inside the source product's partition, widening to its
+# PARTITION_SIBLINGS nearest partitions and then the whole catalog when short.
+PARTITIONS_PATH = os.getenv("PARTITIONS_PATH", os.path.join(DATA_DIR, "partitions.json"))
+PARTITION_SIBLINGS = int(os.getenv("PARTITION_SIBLINGS", "3"))
+PARTITION_SEARCH = os.getenv("PARTITION_SEARCH", "true").lower() == "true"
+
+# Adaptive over-fetch for /api/recommend: start with a small candidate window and
+# multiply it by RECOMMEND_WINDOW_GROWTH until post-filtering leaves enough results.
+RECOMMEND_START_WINDOW = int(os.getenv("RECOMMEND_START_WINDOW", "10"))
+RECOMMEND_WINDOW_GROWTH = int(os.getenv("RECOMMEND_WINDOW_GROWTH", "2"))
+if RECOMMEND_WINDOW_GROWTH < 2:
+    # A factor of 1 would re-run the same window forever; fail at startup instead.
+    raise ValueError(f"RECOMMEND_WINDOW_GROWTH must be at least 2, got {RECOMMEND_WINDOW_GROWTH}")
+RECOMMEND_MAX_WINDOW = int(os.getenv("RECOMMEND_MAX_WINDOW", "120"))
+# An empty window never grows, so the search would loop forever as well.
+if RECOMMEND_START_WINDOW < 1:
+    raise ValueError(f"RECOMMEND_START_WINDOW must be at least 1, got {RECOMMEND_START_WINDOW}")
+if RECOMMEND_MAX_WINDOW < RECOMMEND_START_WINDOW:
+    raise ValueError(
+        f"RECOMMEND_MAX_WINDOW ({RECOMMEND_MAX_WINDOW}) must be at least RECOMMEND_START_WINDOW ({RECOMMEND_START_WINDOW})"
+    )
+
+# Offline greener-alternatives table from scripts/precompute_alternatives.py;
+# /api/recommend/{code} serves from it before falling back to live search.
+ALTERNATIVES_PATH = os.getenv("ALTERNATIVES_PATH", os.path.join(DATA_DIR, "alternatives.npz"))
+PRECOMPUTED_ALTERNATIVES = os.getenv("PRECOMPUTED_ALTERNATIVES", "true").lower() == "true"
+
+# Search result cache, keyed by the query vector rounded to SEARCH_CACHE_DECIMALS
+# plus filter and top_k. Cleared whenever this process writes to the collection.
+SEARCH_CACHE_SIZE = int(os.getenv("SEARCH_CACHE_SIZE", "10000"))
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_DECIMALS = int(os.getenv("SEARCH_CACHE_DECIMALS", "4"))
+# Query text -> embedding cache. Embeddings are deterministic, so the TTL is long.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_TTL_SECONDS = float(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", "86400"))
+
+# Circuit breaker around Actian calls: a call that errors or exceeds its latency
+# budget is a failure; after ACTIAN_BREAKER_FAILURES in a row calls fail fast for
+# ACTIAN_BREAKER_OPEN_SECONDS, then a single probe decides whether to close again.
+ACTIAN_BREAKER_FAILURES = int(os.getenv("ACTIAN_BREAKER_FAILURES", "5"))
+ACTIAN_BREAKER_OPEN_SECONDS = float(os.getenv("ACTIAN_BREAKER_OPEN_SECONDS", "15"))
+ACTIAN_LATENCY_BUDGET_MS = {
+    "search": float(os.getenv("ACTIAN_SEARCH_BUDGET_MS", "1500")),
+    "get": float(os.getenv("ACTIAN_GET_BUDGET_MS", "800")),
+    "count": float(os.getenv("ACTIAN_COUNT_BUDGET_MS", "1500")),
+    "write": float(os.getenv("ACTIAN_WRITE_BUDGET_MS", "10000")),
+}
+
+# Versioned product collections. Ingest builds PRODUCTS_ALIAS_v{n}, verifies it and
+# then repoints PRODUCTS_ALIAS at it; the API re-resolves the alias every
+# COLLECTION_REFRESH_SECONDS. The newest COLLECTION_KEEP_VERSIONS previous
+# versions are kept for rollback (scripts/switch_collection.py).
+PRODUCTS_ALIAS = os.getenv("PRODUCTS_ALIAS", "products")
+COLLECTION_REFRESH_SECONDS = float(os.getenv("COLLECTION_REFRESH_SECONDS", "30"))
+COLLECTION_KEEP_VERSIONS = int(os.getenv("COLLECTION_KEEP_VERSIONS", "2"))
+# Local files (embeddings, rerank fields, cold store, ...) of the live and kept
+# versions, one directory per collection, so a switch back restores them too.
+COLLECTION_SIDECARS_DIR = os.getenv("COLLECTION_SIDECARS_DIR", os.path.join(DATA_DIR, "versions"))
+
+# product_code -> (payload hash, embedding-text hash) for the live collection,
+# written by scripts/setup.py so the next run only re-embeds and upserts changes.
+INGEST_MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", os.path.join(DATA_DIR, "ingest_manifest.json"))
+
+# Async bulk ingest (--async-ingest in the ingest scripts): SmartBatcher cuts
+# batches at INGEST_BATCH_BYTES of estimated payload, and INGEST_CHANNELS
+# senders, each on its own gRPC channel, keep that many batches in flight.
+INGEST_CHANNELS = int(os.getenv("INGEST_CHANNELS", "4"))
+INGEST_BATCH_BYTES = int(os.getenv("INGEST_BATCH_BYTES", str(2 * 1024 * 1024)))
+INGEST_BATCH_MAX_POINTS = int(os.getenv("INGEST_BATCH_MAX_POINTS", "2000"))
+INGEST_MAX_RETRIES = int(os.getenv("INGEST_MAX_RETRIES", "3"))
+
+# scripts/snapshot.py: bundles of a server-side collection snapshot plus the local
+# sidecar files, for bringing up new environments without re-encoding.
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", os.path.join(DATA_DIR, "snapshots"))
+
+# Startup warm-up in main.py's lifespan; /api/ready answers 503 until the model is
+# loaded and a test search succeeds. WARMUP_PRODUCTS_PATH optionally lists product
+# codes (a JSON array) to pull into the product cache.
+WARMUP_PRODUCTS_PATH = os.getenv("WARMUP_PRODUCTS_PATH", os.path.join(DATA_DIR, "warmup_products.json"))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+# Optional warm-up steps (Gemini, product cache priming) run after the worker is
+# marked ready and are abandoned after WARMUP_OPTIONAL_TIMEOUT_SECONDS.
+WARMUP_OPTIONAL_TIMEOUT_SECONDS = float(os.getenv("WARMUP_OPTIONAL_TIMEOUT_SECONDS", "30"))
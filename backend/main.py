@@ -1,10 +1,16 @@
+import asyncio
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from config import ACTIAN_ADDRESS
+from config import ACTIAN_SHARDS
 from services.actian import actian_client
+from services.circuit_breaker import CircuitOpenError, track_staleness
+from services.embeddings import cache_stats as embedding_cache_stats
+from services.metrics import recommend_metrics
+from services.warmup import readiness, warm_up
 from routers import identify, product, recommend, explain
 
 
@@ -12,20 +18,23 @@ from routers import identify, product, recommend, explain
 async def lifespan(app: FastAPI):
     # Startup: connect to Actian VectorDB
     try:
-        actian_client.connect()
-        actian_client.ensure_collection()
-        initial_count = actian_client.count()
+        await actian_client.connect()
+        await actian_client.ensure_collection()
+        initial_count = await actian_client.count()
         print(f"Actian products count: {initial_count}")
-        if initial_count == 0 and actian_client.seed_dummy_products_if_empty():
+        if initial_count == 0 and await actian_client.seed_dummy_products_if_empty():
             print("Seeded Actian with dummy products for local testing.")
-        print(f"Actian products count (active): {actian_client.count()}")
-        print(f"Connected to Actian VectorDB at {ACTIAN_ADDRESS}")
+        print(f"Actian products count (active): {await actian_client.count()}")
+        print(f"Connected to Actian VectorDB at {', '.join(ACTIAN_SHARDS)}")
     except Exception as e:
         print(f"Warning: Could not connect to Actian VectorDB: {e}")
+    # Warm up in the background so /api/health and /api/ready answer meanwhile.
+    warmup_task = asyncio.create_task(warm_up())
     yield
     # Shutdown: close connection
+    warmup_task.cancel()
     try:
-        actian_client.close()
+        await actian_client.close()
     except Exception:
         pass
 
@@ -40,6 +49,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def mark_stale_responses(request: Request, call_next):
+    # Set when ActianClient had to answer from expired cache, local sidecar data or
+    # without every shard.
+    with track_staleness() as stale:
+        response = await call_next(request)
+    if stale[0]:
+        response.headers["X-Data-Stale"] = "true"
+    return response
+
+
+@app.exception_handler(CircuitOpenError)
+async def actian_unavailable(request: Request, exc: CircuitOpenError):
+    return JSONResponse(status_code=503, content={"detail": "Product database temporarily unavailable"})
+
+
 app.include_router(identify.router, prefix="/api")
 app.include_router(product.router, prefix="/api")
 app.include_router(recommend.router, prefix="/api")
@@ -48,4 +73,18 @@ app.include_router(explain.router, prefix="/api")
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "cache": {**actian_client.cache_stats(), "embedding_cache": embedding_cache_stats()},
+        "recommend": recommend_metrics.stats(),
+        "actian_circuit": actian_client.breaker_stats(),
+        "actian_cluster": actian_client.cluster_stats(),
+        "warmup": readiness.stats(),
+    }
+
+
+@app.get("/api/ready")
+async def ready():
+    # For load balancers: 503 until the model is loaded and a test search has succeeded.
+    status = readiness.stats()
+    return JSONResponse(status_code=200 if status["ready"] else 503, content=status)
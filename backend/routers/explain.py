@@ -51,7 +51,7 @@ async def explain_from_product(body: ExplainRequest):
 async def explain(product_code: str):
     print(f"[explain] called for product_code={product_code}")
 
-    product = actian_client.get_product(product_code)
+    product = await actian_client.get_product(product_code)
     if not product:
         print(f"[explain] product not found in Actian: {product_code}")
         raise HTTPException(status_code=404, detail="Product not found")
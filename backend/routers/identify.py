@@ -1,5 +1,6 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
 import re
+import time
 from services import gemini
 from services.embeddings import embed_texts_batch
 from services.actian import actian_client
@@ -96,7 +97,7 @@ async def identify(image: UploadFile = File(...)):
         print(f"[identify] Gemini extracted front text: {front_text[:160]}")
 
     try:
-        db_count = actian_client.count()
+        db_count = await actian_client.count()
         print(f"[identify] Products in VectorDB: {db_count}")
     except Exception:
         print("[identify] Could not get DB product count")
@@ -110,26 +111,31 @@ async def identify(image: UploadFile = File(...)):
         traceback.print_exc()
         raise HTTPException(status_code=502, detail=f"Embedding error: {e}")
 
+    search_started = time.perf_counter()
+    per_guess_matches = await actian_client.search_similar_many(embeddings, top_k=3)
+    search_ms = (time.perf_counter() - search_started) * 1000
+    print(f"[identify] Vector fan-out: {len(embeddings)} searches in {search_ms:.1f}ms")
+
+    # Merge in guess order so deduplication keeps the same winner as a serial loop.
     all_results = []
     seen_codes = set()
     search_errors = []
-    for i, emb in enumerate(embeddings):
-        try:
-            matches = actian_client.search_similar(emb, top_k=3)
-            print(f"[identify] Search results for guess '{guesses[i]}':")
-            for j, m in enumerate(matches):
-                print(f"  [{j}] score={m.get('similarity_score', 0):.4f} "
-                      f"name='{m.get('product_name')}' "
-                      f"code={m.get('product_code')} "
-                      f"brands='{m.get('brands')}'")
-            for m in matches:
-                code = m.get("product_code")
-                if code and code not in seen_codes:
-                    seen_codes.add(code)
-                    all_results.append(m)
-        except Exception as e:
-            search_errors.append(str(e))
-            print(f"[identify] Search error for guess '{guesses[i]}': {e}")
+    for i, matches in enumerate(per_guess_matches):
+        if isinstance(matches, BaseException):
+            search_errors.append(str(matches))
+            print(f"[identify] Search error for guess '{guesses[i]}': {matches}")
+            continue
+        print(f"[identify] Search results for guess '{guesses[i]}':")
+        for j, m in enumerate(matches):
+            print(f"  [{j}] score={m.get('similarity_score', 0):.4f} "
+                  f"name='{m.get('product_name')}' "
+                  f"code={m.get('product_code')} "
+                  f"brands='{m.get('brands')}'")
+        for m in matches:
+            code = m.get("product_code")
+            if code and code not in seen_codes:
+                seen_codes.add(code)
+                all_results.append(m)
 
     if not all_results and search_errors:
         raise HTTPException(status_code=502, detail=f"Vector search error: {search_errors[0]}")
@@ -181,7 +187,7 @@ async def identify(image: UploadFile = File(...)):
             print(f"  -> Penalized '{res.get('product_name')}' by {abs(boost):.2f} (new score: {res['similarity_score']:.4f})")
 
     all_results.sort(key=lambda x: x.get("similarity_score", 0), reverse=True)
-    candidates = all_results[:5]
+    candidates = await actian_client.hydrate(all_results[:5])
 
     print(f"[identify] Total unique results: {len(all_results)}, returning top {len(candidates)}")
     for i, c in enumerate(candidates):
@@ -240,4 +246,5 @@ async def identify(image: UploadFile = File(...)):
         "best_match_explanation": best_match_explanation,
         "candidates": candidate_list,
         "needs_confirmation": needs_confirmation,
+        "timings": {"vector_search_ms": round(search_ms, 1)},
     }
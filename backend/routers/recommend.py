@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException
+from typing import Callable
+
+from fastapi import APIRouter, HTTPException, Response
 from pydantic import BaseModel
+from config import RECOMMEND_MAX_WINDOW, RECOMMEND_START_WINDOW, RECOMMEND_WINDOW_GROWTH
 from services.actian import actian_client
+from services.alternatives import dedupe_alternatives, diversify_by_brand, normalize, primary_brand
 from services.embeddings import embed_text
+from services.metrics import recommend_metrics
+from services.partitions import category_tag, product_partition
 
 router = APIRouter()
 
@@ -14,109 +20,120 @@ class RecommendationSource(BaseModel):
     ecoscore_grade: str | None = None
 
 
-def _normalize(value: str | None) -> str:
-    return (value or "").strip().casefold()
-
-
-def _primary_brand(value: str | None) -> str:
-    normalized = _normalize(value)
-    if not normalized:
-        return ""
-    return normalized.split(",")[0].strip()
-
-
-def _dedupe_alternatives(items: list[dict]) -> list[dict]:
-    unique: list[dict] = []
-    seen: set[tuple[str, str] | tuple[str, str, str]] = set()
-
-    for item in items:
-        name = _normalize(item.get("product_name"))
-        brand = _normalize(item.get("brands"))
-        code = _normalize(item.get("product_code"))
-
-        # Prefer product identity by name+brand. Fall back to code only when needed.
-        key: tuple[str, str] | tuple[str, str, str]
-        if name:
-            key = (name, brand)
-        elif code:
-            key = ("code", code, "")
-        else:
+async def _deepening_search(
+    embedding: list[float],
+    category: str,
+    partition: str | None,
+    post_filter: Callable[[list[dict]], list[dict]],
+    response: Response,
+    wanted: int = 5,
+) -> list[dict]:
+    """Widen the candidate window geometrically until post-filtering leaves `wanted` results.
+
+    Off-category padding is only allowed in the final round, at the window cap
+    or once the in-category matches are exhausted.
+    """
+    window = RECOMMEND_START_WINDOW
+    rounds = 0
+    candidates = 0
+    final = False
+    while True:
+        rounds += 1
+        alternatives = await actian_client.search_greener_alternatives(
+            embedding=embedding,
+            category=category,
+            min_ecoscore="b",
+            top_k=window,
+            partition=partition,
+            pad_off_category=final,
+        )
+        candidates += len(alternatives)
+        results = post_filter(alternatives)
+        if final or len(results) >= wanted:
+            break
+        if len(alternatives) < window:
+            # Every in-category match is already in hand; a wider window only adds padding.
+            final = True
             continue
+        window = min(window * RECOMMEND_WINDOW_GROWTH, RECOMMEND_MAX_WINDOW)
+        final = window == RECOMMEND_MAX_WINDOW
 
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(item)
-
-    return unique
-
-
-def _diversify_by_brand(items: list[dict]) -> list[dict]:
-    unique: list[dict] = []
-    seen_brands: set[str] = set()
-
-    for item in items:
-        brand = _primary_brand(item.get("brands"))
-        if brand and brand in seen_brands:
-            continue
-        if brand:
-            seen_brands.add(brand)
-        unique.append(item)
-
-    return unique
+    recommend_metrics.record(rounds, candidates, window, len(results), wanted)
+    response.headers["X-Search-Rounds"] = str(rounds)
+    response.headers["X-Search-Candidates"] = str(candidates)
+    print(f"[recommend] {rounds} round(s), {candidates} candidates, window={window}, results={len(results)}")
+    return results[:wanted]
 
 
 @router.get("/recommend/{product_code}")
-async def recommend(product_code: str):
-    product, vector = actian_client.get_product_with_vector(product_code)
+async def recommend(product_code: str, response: Response):
+    precomputed = actian_client.precomputed_alternatives(product_code)
+    if precomputed is not None:
+        response.headers["X-Alternatives-Source"] = "table"
+        # Table hits carry only the projected rerank fields; always hydrate them.
+        return await actian_client.hydrate(precomputed, force=True)
+
+    product, vector = await actian_client.get_product_with_vector(product_code)
     if not product or not vector:
         raise HTTPException(status_code=404, detail="Product not found")
 
-    category = product.get("categories", "")
-    alternatives = actian_client.search_greener_alternatives(
+    # Written back by scripts/precompute_alternatives.py --write-payload.
+    if product.get("greener_alternatives"):
+        response.headers["X-Alternatives-Source"] = "payload"
+        return await actian_client.hydrate(
+            [{"product_code": code} for code in product["greener_alternatives"]], force=True
+        )
+
+    response.headers["X-Alternatives-Source"] = "live"
+
+    def post_filter(alternatives: list[dict]) -> list[dict]:
+        # Filter out the original product and near-duplicate alternatives.
+        alternatives = [a for a in alternatives if a.get("product_code") != product_code]
+        alternatives = dedupe_alternatives(alternatives)
+        return diversify_by_brand(alternatives)
+
+    alternatives = await _deepening_search(
         embedding=vector,
-        category=category,
-        min_ecoscore="b",
-        top_k=25,
+        category=product.get("categories", ""),
+        partition=product.get("partition") or product_partition(product.get("categories_tags")),
+        post_filter=post_filter,
+        response=response,
     )
-
-    # Filter out the original product and near-duplicate alternatives.
-    alternatives = [a for a in alternatives if a.get("product_code") != product_code]
-    alternatives = _dedupe_alternatives(alternatives)
-    alternatives = _diversify_by_brand(alternatives)
-    return alternatives[:5]
+    return await actian_client.hydrate(alternatives)
 
 
 @router.post("/recommend")
-async def recommend_from_source(source: RecommendationSource):
+async def recommend_from_source(source: RecommendationSource, response: Response):
     source_text = " ".join(
         part for part in [source.product_name, source.brands, source.categories] if part
     )
     query_embedding = embed_text(source_text)
 
-    alternatives = actian_client.search_greener_alternatives(
-        embedding=query_embedding,
-        category=source.categories or "",
-        min_ecoscore="b",
-        top_k=60,
-    )
+    source_code = normalize(source.product_code)
+    source_name = normalize(source.product_name)
+    source_brand = primary_brand(source.brands)
 
-    source_code = _normalize(source.product_code)
-    source_name = _normalize(source.product_name)
-    source_brand = _primary_brand(source.brands)
+    def post_filter(alternatives: list[dict]) -> list[dict]:
+        filtered = []
+        for alt in alternatives:
+            alt_code = normalize(alt.get("product_code"))
+            alt_name = normalize(alt.get("product_name"))
+            alt_brand = primary_brand(alt.get("brands"))
 
-    filtered = []
-    for alt in alternatives:
-        alt_code = _normalize(alt.get("product_code"))
-        alt_name = _normalize(alt.get("product_name"))
-        alt_brand = _primary_brand(alt.get("brands"))
+            same_code = bool(source_code) and alt_code == source_code
+            same_name_brand = bool(source_name) and alt_name == source_name and alt_brand == source_brand
+            if same_code or same_name_brand:
+                continue
+            filtered.append(alt)
 
-        same_code = bool(source_code) and alt_code == source_code
-        same_name_brand = bool(source_name) and alt_name == source_name and alt_brand == source_brand
-        if same_code or same_name_brand:
-            continue
-        filtered.append(alt)
+        filtered = dedupe_alternatives(filtered)
+        return diversify_by_brand(filtered)
 
-    filtered = _dedupe_alternatives(filtered)
-    filtered = _diversify_by_brand(filtered)
-    return filtered[:5]
+    alternatives = await _deepening_search(
+        embedding=query_embedding,
+        category=source.categories or "",
+        partition=category_tag((source.categories or "").split(",")[0]),
+        post_filter=post_filter,
+        response=response,
+    )
+    return await actian_client.hydrate(alternatives)
@@ -1,33 +1,72 @@
 """
-Backfill missing Nutri-Score / Eco-Score directly in the existing Actian collection.
+Backfill missing Nutri-Score / Eco-Score directly in the live Actian collection
+(whichever versioned collection the products alias points at).
 
-This updates payloads in-place (no collection rebuild).
+This updates payloads in-place (no collection rebuild). Records are streamed a
+page at a time: each page's points are read, handed straight to the
+OpenFoodFacts fetchers, and the patched points are written back in concurrent
+batches, with a few pages in flight at once. The catalog offset below which
+every page is done is checkpointed, so an interrupted run resumes there.
+
+The SDK has no set_payload yet, so a patch is written by re-upserting the
+point with its merged payload; don't run this alongside an ingest.
+
+The grades are also read from local files, so after the writes the patched
+grades are copied into the rerank fields sidecar, and the precomputed
+alternatives table (whose greener set depends on them) is rebuilt. The
+products alias's generation is then bumped so running API workers reload both.
 
 Usage:
   python scripts/backfill_scores_db.py
   python scripts/backfill_scores_db.py --concurrency 16 --limit 3000
   python scripts/backfill_scores_db.py --dry-run
+  python scripts/backfill_scores_db.py --restart
 """
 
 from __future__ import annotations
 
 import argparse
 import asyncio
+import json
 import os
 import sys
+import time
+from itertools import islice
 from typing import Any
 
 import httpx
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from cortex import CortexClient
-from config import ACTIAN_ADDRESS
-
-COLLECTION = "products"
+from cortex import AsyncCortexClient
+from config import (
+    ACTIAN_SHARDS,
+    ALTERNATIVES_PATH,
+    EMBEDDING_INDEX_PATH,
+    EMBEDDINGS_PATH,
+    PRODUCTS_ALIAS,
+    RERANK_FIELDS_PATH,
+)
+from services.collections import CollectionAliases, resolve_collection
+from services.point_ids import product_point_id
+from services.rerank_fields import patch_rerank_fields
+from services.sharding import async_cortex_client, cortex_client
+from services.sidecars import archive_sidecars
+from services.streaming import chunked, iter_json_array
+from scripts.precompute_alternatives import build_alternatives
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog.json")
+CHECKPOINT_PATH = os.path.join(DATA_DIR, "backfill_scores_checkpoint.json")
 OFF_V2_URL = "https://world.openfoodfacts.org/api/v2/product/{code}.json"
 OFF_V0_URL = "https://world.openfoodfacts.org/api/v0/product/{code}.json"
 
+PAGE_SIZE = 500
+# Pages read/fetched/written at once; bounds memory to a few pages of points.
+PAGE_WINDOW = 4
+READ_CONCURRENCY = 32
+WRITE_BATCH = 100
+
 
 def _is_missing_grade(val: Any) -> bool:
     if val is None:
@@ -45,37 +84,8 @@ def _safe_int(val: Any) -> int | None:
         return None
 
 
-def _record_id(record: Any) -> int | None:
-    # SDK objects usually expose .id
-    rid = getattr(record, "id", None)
-    if rid is not None:
-        try:
-            return int(rid)
-        except (TypeError, ValueError):
-            pass
-
-    # Fallback for dict-like variants.
-    if isinstance(record, dict):
-        for key in ("id", "point_id"):
-            if key in record:
-                try:
-                    return int(record[key])
-                except (TypeError, ValueError):
-                    continue
-    return None
-
-
-def _record_payload(record: Any) -> dict[str, Any]:
-    payload = getattr(record, "payload", None)
-    if isinstance(payload, dict):
-        return payload
-    if isinstance(record, dict):
-        maybe = record.get("payload")
-        if isinstance(maybe, dict):
-            return maybe
-        # Some SDK variants flatten payload keys.
-        return record
-    return {}
+def _needs_backfill(payload: dict[str, Any]) -> bool:
+    return _is_missing_grade(payload.get("nutriscore_grade")) or _is_missing_grade(payload.get("ecoscore_grade"))
 
 
 async def _fetch_product_scores(client: httpx.AsyncClient, code: str) -> dict[str, Any] | None:
@@ -100,149 +110,247 @@ async def _fetch_product_scores(client: httpx.AsyncClient, code: str) -> dict[st
     return None
 
 
-def _iter_collection_records(db_client: CortexClient, limit: int | None) -> list[tuple[int, dict[str, Any]]]:
-    records_out: list[tuple[int, dict[str, Any]]] = []
-    cursor = None
-    page_size = 500
-
-    while True:
-        records, cursor = db_client.scroll(COLLECTION, limit=page_size, cursor=cursor)
-        if not records:
-            break
-        for r in records:
-            rid = _record_id(r)
-            payload = _record_payload(r)
-            if rid is None or not isinstance(payload, dict):
-                continue
-            records_out.append((rid, payload))
-            if limit is not None and len(records_out) >= limit:
-                return records_out
-        if cursor is None:
-            break
-
-    return records_out
-
-
-async def _run_backfill(
-    targets: list[tuple[int, dict[str, Any]]],
-    concurrency: int,
-) -> list[tuple[int, dict[str, Any]]]:
-    semaphore = asyncio.Semaphore(concurrency)
-    updates: list[tuple[int, dict[str, Any]]] = []
-    processed = 0
-    progress_every = 200
-    lock = asyncio.Lock()
-
-    timeout = httpx.Timeout(20.0, connect=10.0)
-    headers = {"User-Agent": "sfhacks2026-db-score-backfill/1.0"}
-
-    async with httpx.AsyncClient(timeout=timeout, headers=headers) as http_client:
-        async def process(item: tuple[int, dict[str, Any]]) -> None:
-            nonlocal processed
-            rid, payload = item
-            code = str(payload.get("product_code") or "").strip()
-            if not code:
-                async with lock:
-                    processed += 1
-                return
-
-            missing_nutri = _is_missing_grade(payload.get("nutriscore_grade"))
-            missing_eco = _is_missing_grade(payload.get("ecoscore_grade"))
-            if not (missing_nutri or missing_eco):
-                async with lock:
-                    processed += 1
-                return
-
-            async with semaphore:
-                remote = await _fetch_product_scores(http_client, code)
-            if not remote:
-                async with lock:
-                    processed += 1
-                    if processed % progress_every == 0 or processed == len(targets):
-                        pct = (processed / len(targets)) * 100 if targets else 100
-                        print(
-                            f"  Backfill progress: {processed}/{len(targets)} "
-                            f"({pct:.1f}%), updates found={len(updates)}"
-                        )
-                return
-
-            patch: dict[str, Any] = {}
-            if missing_nutri:
-                g = remote.get("nutriscore_grade")
-                if not _is_missing_grade(g):
-                    patch["nutriscore_grade"] = str(g).strip().lower()
-                if payload.get("nutriscore_score") is None:
-                    s = _safe_int(remote.get("nutriscore_score"))
-                    if s is not None:
-                        patch["nutriscore_score"] = s
-
-            if missing_eco:
-                g = remote.get("ecoscore_grade")
-                if not _is_missing_grade(g):
-                    patch["ecoscore_grade"] = str(g).strip().lower()
-                if payload.get("ecoscore_score") is None:
-                    s = _safe_int(remote.get("ecoscore_score"))
-                    if s is not None:
-                        patch["ecoscore_score"] = s
-
-            if patch:
-                async with lock:
-                    updates.append((rid, patch))
-
-            async with lock:
-                processed += 1
-                if processed % progress_every == 0 or processed == len(targets):
-                    pct = (processed / len(targets)) * 100 if targets else 100
-                    print(
-                        f"  Backfill progress: {processed}/{len(targets)} "
-                        f"({pct:.1f}%), updates found={len(updates)}"
-                    )
-
-        await asyncio.gather(*(process(t) for t in targets))
-
-    return updates
+def _score_patch(payload: dict[str, Any], remote: dict[str, Any]) -> dict[str, Any]:
+    patch: dict[str, Any] = {}
+    if _is_missing_grade(payload.get("nutriscore_grade")):
+        g = remote.get("nutriscore_grade")
+        if not _is_missing_grade(g):
+            patch["nutriscore_grade"] = str(g).strip().lower()
+        if payload.get("nutriscore_score") is None:
+            s = _safe_int(remote.get("nutriscore_score"))
+            if s is not None:
+                patch["nutriscore_score"] = s
+
+    if _is_missing_grade(payload.get("ecoscore_grade")):
+        g = remote.get("ecoscore_grade")
+        if not _is_missing_grade(g):
+            patch["ecoscore_grade"] = str(g).strip().lower()
+        if payload.get("ecoscore_score") is None:
+            s = _safe_int(remote.get("ecoscore_score"))
+            if s is not None:
+                patch["ecoscore_score"] = s
+    return patch
+
+
+def _iter_catalog_codes(offset: int):
+    # Point IDs are hashed from product codes, so the SDK's scroll (which walks
+    # IDs 0..count) can't enumerate them. Page through the known codes instead;
+    # the catalog offset is the scroll cursor.
+    codes = (str(p["code"]) for p in iter_json_array(CATALOG_PATH) if p.get("code"))
+    return islice(codes, offset, None)
+
+
+class _Checkpoint:
+    """Catalog offset below which every page is done, saved after each page.
+
+    Pages finish out of order, so the offset only advances over a contiguous
+    run of finished pages. It is tied to the collection and catalog file it
+    was taken against; a rebuilt catalog starts over.
+    """
+
+    def __init__(self, path: str, collection: str, enabled: bool = True):
+        self._path = path
+        self._enabled = enabled
+        self._key = {"collection": collection, "catalog_mtime": os.path.getmtime(CATALOG_PATH)}
+        self.offset = 0
+        self._finished: dict[int, int] = {}
+
+    def load(self) -> int:
+        try:
+            with open(self._path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if {k: saved.get(k) for k in self._key} == self._key:
+            self.offset = int(saved.get("offset", 0))
+        return self.offset
+
+    def done(self, start: int, end: int):
+        self._finished[start] = end
+        while self.offset in self._finished:
+            self.offset = self._finished.pop(self.offset)
+        if self._enabled:
+            tmp_path = f"{self._path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({**self._key, "offset": self.offset, "saved_at": time.time()}, f)
+            os.replace(tmp_path, self._path)
+
+    def clear(self):
+        if self._enabled and os.path.exists(self._path):
+            os.remove(self._path)
+
+
+class _Backfill:
+    def __init__(
+        self,
+        db: AsyncCortexClient,
+        http: httpx.AsyncClient,
+        collection: str,
+        concurrency: int,
+        write_concurrency: int,
+        dry_run: bool,
+    ):
+        self._db = db
+        self._http = http
+        self._collection = collection
+        self._dry_run = dry_run
+        self._read_slots = asyncio.Semaphore(READ_CONCURRENCY)
+        self._fetch_slots = asyncio.Semaphore(concurrency)
+        self._write_slots = asyncio.Semaphore(write_concurrency)
+        self.read = 0
+        self.targets = 0
+        self.updates = 0
+        # point_id -> patched fields, for the sidecar once the writes are done.
+        self.written: dict[int, dict[str, Any]] = {}
+
+    async def _get_point(self, point_id: int) -> tuple[list[float] | None, dict[str, Any] | None]:
+        async with self._read_slots:
+            results = await self._db.get_many(self._collection, ids=[point_id])
+        return results[0]
+
+    async def _resolve(self, payload: dict[str, Any]) -> dict[str, Any]:
+        code = str(payload.get("product_code") or "").strip()
+        if not code:
+            return {}
+        async with self._fetch_slots:
+            remote = await _fetch_product_scores(self._http, code)
+        return _score_patch(payload, remote) if remote else {}
+
+    async def _write(self, batch: list[tuple[int, list[float], dict[str, Any], dict[str, Any]]]):
+        async with self._write_slots:
+            await self._db.batch_upsert(
+                self._collection,
+                ids=[rid for rid, _, _, _ in batch],
+                vectors=[vector for _, vector, _, _ in batch],
+                payloads=[payload for _, _, payload, _ in batch],
+            )
+        # Recorded per batch: once written, a point no longer needs a
+        # backfill, so a resumed run would not find it again.
+        self.written.update((rid, patch) for rid, _, _, patch in batch)
+
+    async def page(self, codes: list[str]):
+        ids = [product_point_id(code) for code in codes]
+        points = await asyncio.gather(*(self._get_point(rid) for rid in ids))
+        # Only records that need a backfill keep their vector past this point.
+        targets = [
+            (rid, vector, payload)
+            for rid, (vector, payload) in zip(ids, points)
+            if isinstance(payload, dict) and vector is not None and _needs_backfill(payload)
+        ]
+        del points
+        patches = await asyncio.gather(*(self._resolve(payload) for _, _, payload in targets))
+        updates = [
+            (rid, vector, {**payload, **patch}, patch)
+            for (rid, vector, payload), patch in zip(targets, patches)
+            if patch
+        ]
+        if updates and not self._dry_run:
+            await asyncio.gather(
+                *(self._write(updates[i:i + WRITE_BATCH]) for i in range(0, len(updates), WRITE_BATCH))
+            )
+        self.read += len(codes)
+        self.targets += len(targets)
+        self.updates += len(updates)
+
+
+async def _run_backfill(args: argparse.Namespace) -> str | None:
+    """Run the backfill; returns the collection if its local files were updated."""
+    print(f"Connecting to Actian at {', '.join(ACTIAN_SHARDS)}...")
+    async with async_cortex_client(enable_smart_batching=False) as db:
+        version, uptime = await db.health_check()
+        print(f"Connected: {version}, uptime={uptime}s")
+        collection = await resolve_collection(db, PRODUCTS_ALIAS)
+
+        checkpoint = _Checkpoint(CHECKPOINT_PATH, collection, enabled=not args.dry_run)
+        start = 0 if args.restart or args.dry_run else checkpoint.load()
+        checkpoint.offset = start
+        if start:
+            print(f"Resuming at catalog offset {start} from {CHECKPOINT_PATH} (--restart to rescan)")
+        print(f"Reading catalog products from collection '{collection}' (codes from {CATALOG_PATH})...")
+
+        codes = _iter_catalog_codes(start)
+        if args.limit is not None:
+            codes = islice(codes, args.limit)
+
+        timeout = httpx.Timeout(20.0, connect=10.0)
+        headers = {"User-Agent": "sfhacks2026-db-score-backfill/1.0"}
+        started = time.perf_counter()
+        async with httpx.AsyncClient(timeout=timeout, headers=headers) as http_client:
+            backfill = _Backfill(
+                db,
+                http_client,
+                collection,
+                concurrency=max(1, args.concurrency),
+                write_concurrency=max(1, args.write_concurrency),
+                dry_run=args.dry_run,
+            )
+            in_flight: dict[asyncio.Task, tuple[int, int]] = {}
+
+            async def wait_for_page():
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    page_start, page_end = in_flight.pop(task)
+                    task.result()
+                    checkpoint.done(page_start, page_end)
+                elapsed = time.perf_counter() - started
+                print(
+                    f"  Backfill progress: {backfill.read} read ({backfill.read / elapsed:.0f}/s), "
+                    f"{backfill.targets} need scores, updates found={backfill.updates}"
+                )
+
+            offset = start
+            try:
+                for page in chunked(codes, PAGE_SIZE):
+                    if len(in_flight) >= PAGE_WINDOW:
+                        await wait_for_page()
+                    in_flight[asyncio.create_task(backfill.page(page))] = (offset, offset + len(page))
+                    offset += len(page)
+                while in_flight:
+                    await wait_for_page()
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                # Even on failure, so the sidecar matches every point written so far.
+                patched = patch_rerank_fields(RERANK_FIELDS_PATH, backfill.written)
+                if patched:
+                    print(f"Updated {patched} rows of {RERANK_FIELDS_PATH}")
+
+        print(f"Records read: {backfill.read}, needing score backfill: {backfill.targets}")
+        print(f"Resolved updates from OpenFoodFacts: {backfill.updates}")
+        if args.dry_run:
+            print("Dry run enabled. No DB writes performed.")
+            return None
+        if args.limit is None:
+            checkpoint.clear()
+        else:
+            print(f"Stopped at catalog offset {checkpoint.offset}; the next run resumes there")
+        # A resumed run rebuilds too: the interrupted one patched the sidecar
+        # without getting here.
+        if (patched or start) and os.path.exists(ALTERNATIVES_PATH):
+            print("Rebuilding precomputed alternatives against the new grades...")
+            build_alternatives(EMBEDDINGS_PATH, EMBEDDING_INDEX_PATH, RERANK_FIELDS_PATH, ALTERNATIVES_PATH)
+        print(f"Done. Applied {backfill.updates} payload updates in-place.")
+        return collection if patched or start else None
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Backfill missing scores directly in Actian DB payloads")
     parser.add_argument("--concurrency", type=int, default=12, help="Concurrent OFF requests (default: 12)")
+    parser.add_argument(
+        "--write-concurrency", type=int, default=4, help="Concurrent batch writes to Actian (default: 4)"
+    )
     parser.add_argument("--limit", type=int, default=None, help="Process at most N records from collection")
     parser.add_argument("--dry-run", action="store_true", help="Show counts but do not write updates")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
     args = parser.parse_args()
 
-    print(f"Connecting to Actian at {ACTIAN_ADDRESS}...")
-    with CortexClient(ACTIAN_ADDRESS) as db:
-        version, uptime = db.health_check()
-        print(f"Connected: {version}, uptime={uptime}s")
-
-        print("Scanning collection via scroll...")
-        items = _iter_collection_records(db, limit=args.limit)
-        print(f"Loaded {len(items)} records from collection '{COLLECTION}'")
-
-        targets = []
-        for rid, payload in items:
-            if _is_missing_grade(payload.get("nutriscore_grade")) or _is_missing_grade(
-                payload.get("ecoscore_grade")
-            ):
-                targets.append((rid, payload))
-        print(f"Records needing score backfill: {len(targets)}")
-
-        updates = asyncio.run(_run_backfill(targets, concurrency=max(1, args.concurrency)))
-        print(f"Resolved updates from OpenFoodFacts: {len(updates)}")
-
-        if args.dry_run:
-            print("Dry run enabled. No DB writes performed.")
-            return
-
-        applied = 0
-        for rid, patch in updates:
-            # set_payload merges these keys into existing payload.
-            db.set_payload(COLLECTION, rid, patch)
-            applied += 1
-            if applied % 500 == 0:
-                print(f"  Applied {applied}/{len(updates)} payload updates")
-
-        print(f"Done. Applied {applied} payload updates in-place.")
+    collection = asyncio.run(_run_backfill(args))
+    if collection:
+        with cortex_client() as client:
+            aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+            if aliases.resolve() == collection:
+                archive_sidecars(collection)
+                print(f"'{PRODUCTS_ALIAS}' is at generation {aliases.touch()}; API workers reload the local files")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,98 @@
+"""
+Compare the local search engines against exact search on catalog queries.
+
+Queries are sampled rows of data/embeddings.npy (product names are what identify
+searches with). Each engine that has its index files on disk is run through both
+query shapes the API uses, and reports recall@5 against the exact engine,
+mean/p95 latency, and the size of what it scans.
+
+Usage:
+    python scripts/bench_local_search.py
+    python scripts/bench_local_search.py --queries 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    EMBEDDING_DIM,
+    EMBEDDING_INDEX_PATH,
+    EMBEDDINGS_PATH,
+    HNSW_EF_SEARCH,
+    HNSW_INDEX_PATH,
+    QUANTIZATION_PARAMS_PATH,
+    QUANTIZED_EMBEDDINGS_PATH,
+    QUANTIZED_RESCORE_FACTOR,
+    RERANK_FIELDS_PATH,
+    RESCORE_EMBEDDINGS_PATH,
+)
+from services.local_search import ExactSearchEngine, HnswSearchEngine, QuantizedSearchEngine
+from services.rerank_fields import RerankFieldStore
+
+# shape -> (top_k, ecoscore grades)
+QUERY_SHAPES = {
+    "identify": (5, None),
+    "greener": (250, ["a", "b"]),
+}
+RECALL_AT = 5
+
+
+def _load_engines(rerank_fields: RerankFieldStore) -> dict[str, tuple[object, float]]:
+    """name -> (engine, MB scanned per query)."""
+    engines = {}
+    exact = ExactSearchEngine()
+    if not exact.load(EMBEDDINGS_PATH, EMBEDDING_INDEX_PATH, rerank_fields):
+        sys.exit(f"Need {EMBEDDINGS_PATH}, {EMBEDDING_INDEX_PATH} and {RERANK_FIELDS_PATH}; run setup.py first")
+    engines["exact"] = (exact, os.path.getsize(EMBEDDINGS_PATH) / 1e6)
+
+    int8 = QuantizedSearchEngine(rescore_factor=QUANTIZED_RESCORE_FACTOR)
+    if int8.load(QUANTIZED_EMBEDDINGS_PATH, QUANTIZATION_PARAMS_PATH, RESCORE_EMBEDDINGS_PATH,
+                 EMBEDDING_INDEX_PATH, rerank_fields):
+        engines["int8"] = (int8, os.path.getsize(QUANTIZED_EMBEDDINGS_PATH) / 1e6)
+
+    hnsw = HnswSearchEngine(EMBEDDING_DIM, ef_search=HNSW_EF_SEARCH)
+    if hnsw.load(HNSW_INDEX_PATH, EMBEDDING_INDEX_PATH, rerank_fields):
+        engines["hnsw"] = (hnsw, os.path.getsize(HNSW_INDEX_PATH) / 1e6)
+    return engines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark local search engines against exact search")
+    parser.add_argument("--queries", type=int, default=200, help="Number of sampled catalog vectors to query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rerank_fields = RerankFieldStore()
+    rerank_fields.load(RERANK_FIELDS_PATH)
+    engines = _load_engines(rerank_fields)
+
+    vectors = np.load(EMBEDDINGS_PATH, mmap_mode="r")
+    rng = np.random.default_rng(args.seed)
+    rows = np.sort(rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False))
+    queries = np.asarray(vectors[rows], dtype=np.float32).tolist()
+    print(f"{len(queries)} queries over {len(vectors)} products\n")
+
+    exact = engines["exact"][0]
+    print(f"{'engine':<8} {'shape':<10} {'recall@5':>9} {'mean ms':>8} {'p95 ms':>7} {'MB':>8}")
+    for name, (engine, size_mb) in engines.items():
+        for shape, (top_k, grades) in QUERY_SHAPES.items():
+            hits = 0
+            latencies = []
+            for q in queries:
+                truth = {pid for pid, _ in exact.search(q, RECALL_AT, grades)}
+                start = time.perf_counter()
+                results = engine.search(q, top_k, grades)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(truth & {pid for pid, _ in results[:RECALL_AT]}) / max(len(truth), 1)
+            print(f"{name:<8} {shape:<10} {hits / len(queries):>9.3f} {np.mean(latencies):>8.2f} "
+                  f"{np.percentile(latencies, 95):>7.2f} {size_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
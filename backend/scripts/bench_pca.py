@@ -0,0 +1,76 @@
+"""
+Report recall loss against latency and memory gain for PCA-reduced embeddings.
+
+Fits a projection per candidate dimension on the full-dimension catalog vectors
+(data/embeddings_full.npy when the pipeline already reduced, else
+data/embeddings.npy) and compares exact top-5 search in the reduced space with
+exact search at full dimension. Use it to pick EMBEDDING_REDUCED_DIM.
+
+Usage:
+    python scripts/bench_pca.py
+    python scripts/bench_pca.py --dims 64,96,128,192 --whiten
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMBEDDINGS_FULL_PATH, EMBEDDINGS_PATH
+from services.projection import PcaProjection
+
+TOP_K = 5
+
+
+def _top_k(matrix: np.ndarray, q: np.ndarray) -> tuple[set[int], float]:
+    start = time.perf_counter()
+    scores = matrix @ q
+    idx = np.argpartition(scores, len(scores) - TOP_K)[-TOP_K:]
+    return set(idx.tolist()), (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PCA-reduced embedding dimensions")
+    parser.add_argument("--dims", default="64,128,192,256", help="Comma-separated reduced dimensions")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--whiten", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = EMBEDDINGS_FULL_PATH if os.path.exists(EMBEDDINGS_FULL_PATH) else EMBEDDINGS_PATH
+    full = np.load(path).astype(np.float32)
+    rng = np.random.default_rng(args.seed)
+    rows = rng.choice(len(full), size=min(args.queries, len(full)), replace=False)
+    print(f"{len(rows)} queries over {full.shape[0]} x {full.shape[1]} vectors from {path}\n")
+
+    truth = []
+    full_ms = []
+    for r in rows:
+        ids, ms = _top_k(full, full[r])
+        truth.append(ids)
+        full_ms.append(ms)
+
+    print(f"{'dim':>5} {'variance':>9} {'recall@5':>9} {'mean ms':>8} {'float32 MB':>11} {'int8 MB':>8}")
+    print(f"{full.shape[1]:>5} {1:>9.1%} {1:>9.3f} {np.mean(full_ms):>8.2f} "
+          f"{full.nbytes / 1e6:>11.1f} {full.size / 1e6:>8.1f}")
+    for dim in sorted(int(d) for d in args.dims.split(",")):
+        if dim >= full.shape[1]:
+            continue
+        projection = PcaProjection.fit(full, dim, whiten=args.whiten)
+        reduced = projection.apply(full)
+        hits = 0.0
+        ms = []
+        for r, expected in zip(rows, truth):
+            ids, elapsed = _top_k(reduced, reduced[r])
+            hits += len(ids & expected) / TOP_K
+            ms.append(elapsed)
+        print(f"{dim:>5} {projection.explained_variance_ratio:>9.1%} {hits / len(rows):>9.3f} "
+              f"{np.mean(ms):>8.2f} {reduced.nbytes / 1e6:>11.1f} {reduced.size / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Compare full-payload search against two-phase retrieval for each endpoint's query shape.
+
+Full mode asks Actian for payloads on every hit (what the API did before two-phase
+retrieval). Two-phase mode asks for IDs and scores only, then fetches full payloads
+for just the final results. Reports payload bytes moved and latency per endpoint.
+
+Usage:
+    python scripts/bench_retrieval.py
+    python scripts/bench_retrieval.py --queries 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+from sentence_transformers import SentenceTransformer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cortex.filters import Field, Filter
+from config import ACTIAN_SHARDS, EMBEDDING_MODEL_NAME, PRODUCTS_ALIAS
+from services.collections import resolve_collection
+from services.sharding import async_cortex_client
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+CATALOG_PATH = os.path.join(DATA_DIR, "catalog.json")
+
+# Rough wire size of a score-only hit: u64 id + float score + protobuf framing.
+SCORE_ONLY_HIT_BYTES = 16
+
+GREENER_FILTER = Filter().must(Field("ecoscore_grade").is_in(["a", "b"]))
+
+# endpoint -> (top_k searched, filter, results hydrated)
+ENDPOINT_SHAPES = {
+    "POST /identify (per guess)": (3, None, 3),
+    "GET /recommend/{code}": (250, GREENER_FILTER, 5),
+    "POST /recommend": (600, GREENER_FILTER, 5),
+}
+
+
+def _payload_bytes(payload) -> int:
+    return len(json.dumps(payload)) if payload else 0
+
+
+async def _full(client, collection, query, top_k, f) -> tuple[int, float]:
+    start = time.perf_counter()
+    results = await client.search(collection, query=query, top_k=top_k, filter=f, with_payload=True)
+    elapsed = time.perf_counter() - start
+    return sum(_payload_bytes(r.payload) for r in results), elapsed
+
+
+async def _two_phase(client, collection, query, top_k, f, hydrate) -> tuple[int, float]:
+    start = time.perf_counter()
+    results = await client.search(collection, query=query, top_k=top_k, filter=f, with_payload=False)
+    winners = results[:hydrate]
+    fetched = await asyncio.gather(*(client.get(collection, r.id) for r in winners))
+    elapsed = time.perf_counter() - start
+    hydrated_bytes = sum(_payload_bytes(payload) for _, payload in fetched)
+    return len(results) * SCORE_ONLY_HIT_BYTES + hydrated_bytes, elapsed
+
+
+async def run(queries: list[list[float]]):
+    async with async_cortex_client(enable_smart_batching=False) as client:
+        collection = await resolve_collection(client, PRODUCTS_ALIAS)
+        print(f"{'endpoint':<28} {'full KB':>9} {'2-phase KB':>11} {'saved':>7} "
+              f"{'full ms':>8} {'2-phase ms':>11}")
+        for name, (top_k, f, hydrate) in ENDPOINT_SHAPES.items():
+            full_bytes = full_time = two_bytes = two_time = 0.0
+            for q in queries:
+                b, t = await _full(client, collection, q, top_k, f)
+                full_bytes += b
+                full_time += t
+                b, t = await _two_phase(client, collection, q, top_k, f, hydrate)
+                two_bytes += b
+                two_time += t
+            n = len(queries)
+            saved = 1 - (two_bytes / full_bytes) if full_bytes else 0.0
+            print(f"{name:<28} {full_bytes / n / 1024:>9.1f} {two_bytes / n / 1024:>11.1f} "
+                  f"{saved:>6.0%} {full_time / n * 1000:>8.1f} {two_time / n * 1000:>11.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark two-phase retrieval against full-payload search")
+    parser.add_argument("--queries", type=int, default=20, help="Number of sample product names to query")
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
+        products = json.load(f)
+    names = [p.get("product_name", "") for p in random.sample(products, min(args.queries, len(products)))]
+
+    model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    queries = model.encode(names, normalize_embeddings=True).tolist()
+    print(f"Benchmarking {len(queries)} queries against {', '.join(ACTIAN_SHARDS)}\n")
+    asyncio.run(run(queries))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Build the HNSW index used by SEARCH_ENGINE=hnsw from data/embeddings.npy.
+
+Labels are product point IDs, so search hits map straight onto the rerank
+fields sidecar and Actian point reads. Run after generate_embeddings.py (or
+setup.py, which saves the same files).
+
+Usage:
+    python scripts/build_hnsw_index.py
+    python scripts/build_hnsw_index.py --m 32 --ef-construction 400
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import hnswlib
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMBEDDING_INDEX_PATH, EMBEDDINGS_PATH, HNSW_EF_CONSTRUCTION, HNSW_INDEX_PATH, HNSW_M
+from services.point_ids import assign_point_ids
+
+
+def build_index(embeddings_path: str, index_path: str, out_path: str, m: int, ef_construction: int) -> int:
+    vectors = np.load(embeddings_path, mmap_mode="r")
+    with open(index_path, "r", encoding="utf-8") as f:
+        codes = json.load(f)
+    if len(codes) != len(vectors):
+        raise ValueError(f"{index_path} has {len(codes)} codes but {embeddings_path} has {len(vectors)} rows")
+    point_ids = np.array(assign_point_ids(codes), dtype=np.uint64)
+
+    print(f"Building HNSW index: {len(vectors)} vectors, dim={vectors.shape[1]}, M={m}, ef_construction={ef_construction}")
+    start = time.time()
+    index = hnswlib.Index(space="ip", dim=vectors.shape[1])
+    index.init_index(max_elements=len(vectors), ef_construction=ef_construction, M=m)
+    batch_size = 50_000
+    for start_idx in range(0, len(vectors), batch_size):
+        end_idx = min(start_idx + batch_size, len(vectors))
+        index.add_items(np.asarray(vectors[start_idx:end_idx], dtype=np.float32), point_ids[start_idx:end_idx])
+        print(f"  Indexed {end_idx}/{len(vectors)}")
+    elapsed = time.time() - start
+
+    tmp_path = f"{out_path}.tmp"
+    index.save_index(tmp_path)
+    os.replace(tmp_path, out_path)
+    print(f"Built in {elapsed:.1f}s, saved to {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+    return len(vectors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the local HNSW search index")
+    parser.add_argument("--m", type=int, default=HNSW_M, help="Graph out-degree (HNSW_M)")
+    parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION, help="Build-time candidate list size")
+    parser.add_argument("--out", default=HNSW_INDEX_PATH, help="Output index path")
+    args = parser.parse_args()
+
+    build_index(EMBEDDINGS_PATH, EMBEDDING_INDEX_PATH, args.out, args.m, args.ef_construction)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 """
 Generate embeddings for all products in catalog.json using sentence-transformers (local).
 Uses multi-process pool for parallel encoding.
-Saves embeddings to data/embeddings.npy and index mapping to data/embedding_index.json.
+Saves embeddings to data/embeddings.npy and index mapping to data/embedding_index.json,
+staged as data/embeddings.next.npy etc.: scripts/ingest_actian.py moves them into
+place once the collection built from them verifies, so the API never pairs them
+with the collection still being served.
 """
 
 import json
@@ -13,7 +16,9 @@ import numpy as np
 from sentence_transformers import SentenceTransformer
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import EMBEDDING_MODEL_NAME
+from config import EMBEDDING_MODEL_NAME, EMBEDDING_REDUCED_DIM, EMBEDDINGS_FULL_PATH, PCA_PROJECTION_PATH, PCA_WHITEN
+from services.projection import reduce_catalog
+from services.sidecars import staging_path
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
 CATALOG_PATH = os.path.join(DATA_DIR, "catalog.json")
@@ -53,14 +58,22 @@ def main():
     print(f"Encoded {len(texts)} texts in {elapsed:.1f}s ({len(texts)/elapsed:.0f} texts/sec)")
 
     embeddings_array = np.array(embeddings, dtype=np.float32)
+    if EMBEDDING_REDUCED_DIM:
+        embeddings_array = reduce_catalog(
+            embeddings_array,
+            EMBEDDING_REDUCED_DIM,
+            PCA_WHITEN,
+            staging_path(PCA_PROJECTION_PATH),
+            staging_path(EMBEDDINGS_FULL_PATH),
+        )
     print(f"Embeddings shape: {embeddings_array.shape}")
 
-    np.save(EMBEDDINGS_PATH, embeddings_array)
-    print(f"Saved embeddings to {EMBEDDINGS_PATH}")
+    np.save(staging_path(EMBEDDINGS_PATH), embeddings_array)
+    print(f"Saved embeddings to {staging_path(EMBEDDINGS_PATH)}")
 
-    with open(INDEX_PATH, "w", encoding="utf-8") as f:
+    with open(staging_path(INDEX_PATH), "w", encoding="utf-8") as f:
         json.dump(codes, f)
-    print(f"Saved index mapping to {INDEX_PATH}")
+    print(f"Saved index mapping to {staging_path(INDEX_PATH)}")
 
 
 if __name__ == "__main__":
@@ -1,62 +1,117 @@
 """
 Bulk-insert catalog products and embeddings into Actian VectorDB.
+
+Loads into a new versioned collection and repoints the products alias at it
+once the point count and a sample of self-queries check out. Reads the
+embeddings scripts/generate_embeddings.py staged (or the live ones), writes
+the other local files beside the live ones, and moves them all into place
+only after verification, just before the alias switch.
+
+Usage:
+    python scripts/ingest_actian.py
+    python scripts/ingest_actian.py --async-ingest
 """
 
+import argparse
 import json
 import os
+import random
 import sys
+import time
 
 import numpy as np
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from cortex import CortexClient, DistanceMetric
-from config import ACTIAN_ADDRESS, EMBEDDING_DIM
-from sentence_transformers import SentenceTransformer
-from config import EMBEDDING_MODEL_NAME
+from config import (
+    ACTIAN_SHARDS,
+    ALTERNATIVES_PATH,
+    COLLECTION_KEEP_VERSIONS,
+    EMBEDDING_DIM,
+    EMBEDDINGS_FULL_PATH,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_INDEX_PATH,
+    HNSW_M,
+    PARTITION_SIBLINGS,
+    PARTITIONS_PATH,
+    PCA_PROJECTION_PATH,
+    PRODUCTS_ALIAS,
+    SEARCH_ENGINE,
+)
+from services.bulk_ingest import BackgroundIngester
+from services.collections import CollectionAliases, verify_collection
+from services.embeddings import embed_text
+from services.sharding import cortex_client
+from services.cold_store import ColdStoreWriter, split_payload
+from services.partitions import PartitionBuilder, category_keys, product_partition
+from services.point_ids import assign_point_ids
+from services.rerank_fields import rerank_row, write_rerank_fields
+from services.sidecars import StagedSidecars, archive_sidecars, drop_sidecars
+from scripts.precompute_alternatives import build_alternatives
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
 CATALOG_PATH = os.path.join(DATA_DIR, "catalog.json")
 EMBEDDINGS_PATH = os.path.join(DATA_DIR, "embeddings.npy")
 INDEX_PATH = os.path.join(DATA_DIR, "embedding_index.json")
+RERANK_FIELDS_PATH = os.path.join(DATA_DIR, "rerank_fields.json")
+COLD_STORE_PATH = os.path.join(DATA_DIR, "cold_store.sqlite")
 
 BATCH_SIZE = 100
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Bulk-insert the catalog into Actian VectorDB")
+    parser.add_argument(
+        "--async-ingest", action="store_true", help="Concurrent byte-sized batches over several channels"
+    )
+    args = parser.parse_args()
+
     with open(CATALOG_PATH, "r", encoding="utf-8") as f:
         products = json.load(f)
 
-    embeddings = np.load(EMBEDDINGS_PATH)
+    staged = StagedSidecars(
+        EMBEDDINGS_PATH, INDEX_PATH, EMBEDDINGS_FULL_PATH, PCA_PROJECTION_PATH, HNSW_INDEX_PATH,
+        RERANK_FIELDS_PATH, COLD_STORE_PATH, PARTITIONS_PATH, ALTERNATIVES_PATH,
+    )
+    embeddings_path = staged.current(EMBEDDINGS_PATH)
+    index_path = staged.current(INDEX_PATH)
+    embeddings = np.load(embeddings_path)
 
-    with open(INDEX_PATH, "r", encoding="utf-8") as f:
+    with open(index_path, "r", encoding="utf-8") as f:
         codes = json.load(f)
 
     assert len(products) == len(embeddings) == len(codes), (
         f"Mismatch: {len(products)} products, {len(embeddings)} embeddings, {len(codes)} codes"
     )
 
-    print(f"Connecting to Actian VectorDB at {ACTIAN_ADDRESS}...")
-    with CortexClient(ACTIAN_ADDRESS) as client:
+    # Point IDs are hashed from product codes; this fails fast on a collision.
+    point_ids = assign_point_ids(codes)
+
+    print(f"Connecting to Actian VectorDB at {', '.join(ACTIAN_SHARDS)}...")
+    with cortex_client() as client:
         version, uptime = client.health_check()
         print(f"Connected: {version}, uptime={uptime}s")
 
-        # Recreate collection
-        print(f"Creating collection 'products' (dim={EMBEDDING_DIM}, COSINE)...")
-        client.recreate_collection(
-            name="products",
-            dimension=EMBEDDING_DIM,
-            distance_metric=DistanceMetric.COSINE,
-        )
+        # New versioned collection; the alias keeps serving the old one meanwhile.
+        aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+        live = aliases.resolve()
+        collection = aliases.create_next(EMBEDDING_DIM)
+        print(f"Creating collection '{collection}' (dim={EMBEDDING_DIM}, COSINE); '{PRODUCTS_ALIAS}' stays on '{live}'")
 
         # Batch insert
         total = len(products)
+        rerank_rows = {}
+        cold_writer = ColdStoreWriter(staged.path(COLD_STORE_PATH))
+        partition_builder = PartitionBuilder()
+        ingester = BackgroundIngester(ACTIAN_SHARDS, collection) if args.async_ingest else None
+        started = time.perf_counter()
         for start in range(0, total, BATCH_SIZE):
             end = min(start + BATCH_SIZE, total)
             batch_products = products[start:end]
-            batch_ids = list(range(start, end))
-            batch_vectors = [embeddings[i].tolist() for i in range(start, end)]
+            batch_ids = point_ids[start:end]
+            batch_vectors = embeddings[start:end]
             batch_payloads = []
+            batch_cold = []
 
             for p in batch_products:
                 payload = {
@@ -75,21 +130,72 @@ def main():
                     "palm_oil_count": p.get("ingredients_from_palm_oil_n", 0),
                     "nutrition_json": json.dumps(p.get("nutriments", {})),
                     "image_url": p.get("image_front_url"),
+                    "partition": product_partition(p.get("categories_tags")),
+                    "category_keys": category_keys(p.get("categories")),
                 }
-                batch_payloads.append(payload)
+                hot, cold = split_payload(payload)
+                batch_payloads.append(hot)
+                batch_cold.append((p["code"], cold))
+
+            for point_id, payload in zip(batch_ids, batch_payloads):
+                rerank_rows[point_id] = rerank_row(payload)
+            for payload, vector in zip(batch_payloads, batch_vectors):
+                partition_builder.add(payload["partition"], vector)
+
+            if ingester:
+                ingester.add_many(batch_ids, batch_vectors, batch_payloads)
+            else:
+                client.batch_upsert(collection, ids=batch_ids, vectors=batch_vectors.tolist(), payloads=batch_payloads)
+                print(f"  Inserted {end}/{total}")
+            cold_writer.add_many(batch_cold)
+
+        if ingester:
+            stats = ingester.close()
+            print(
+                f"Upserted {stats['points']} points in {stats['batches']} batches over {stats['seconds']}s "
+                f"({stats['points_per_sec']:.0f} points/sec, {stats['retries']} retries, {stats['failed']} failed)"
+            )
+        else:
+            elapsed = max(time.perf_counter() - started, 1e-9)
+            print(f"Upserted {total} points in {elapsed:.1f}s ({total / elapsed:.0f} points/sec)")
+
+        count = client.count(collection)
+        print(f"\nTotal vectors in collection: {count}")
 
-            client.batch_upsert("products", ids=batch_ids, vectors=batch_vectors, payloads=batch_payloads)
-            print(f"  Inserted {end}/{total}")
+        samples = [(point_ids[i], embeddings[i].tolist()) for i in random.sample(range(total), min(20, total))]
+        problems = verify_collection(client, collection, total, samples)
+        if problems:
+            raise SystemExit(f"Not switching '{PRODUCTS_ALIAS}' to '{collection}': " + "; ".join(problems))
+
+        write_rerank_fields(staged.path(RERANK_FIELDS_PATH), rerank_rows)
+        print(f"Saved rerank fields for {len(rerank_rows)} products to {staged.path(RERANK_FIELDS_PATH)}")
+        cold_count = cold_writer.close()
+        print(f"Saved cold payloads for {cold_count} products to {staged.path(COLD_STORE_PATH)}")
+        partition_count = partition_builder.write(staged.path(PARTITIONS_PATH), siblings=PARTITION_SIBLINGS)
+        print(f"Saved {partition_count} category partitions to {staged.path(PARTITIONS_PATH)}")
+        if SEARCH_ENGINE == "hnsw":
+            from scripts.build_hnsw_index import build_index
+            build_index(embeddings_path, index_path, staged.path(HNSW_INDEX_PATH), HNSW_M, HNSW_EF_CONSTRUCTION)
+        build_alternatives(
+            embeddings_path, index_path, staged.path(RERANK_FIELDS_PATH), staged.path(ALTERNATIVES_PATH)
+        )
 
-        count = client.count("products")
-        print(f"\nTotal vectors in collection: {count}")
+        # The API reloads its local files when the alias moves, so they go first.
+        print(f"Moved {staged.commit()} local files into place")
+        aliases.switch(collection)
+        print(f"Switched '{PRODUCTS_ALIAS}': '{live}' -> '{collection}'")
+        archive_sidecars(collection)
+        dropped = aliases.prune(COLLECTION_KEEP_VERSIONS)
+        for name in dropped:
+            drop_sidecars(name)
+        if dropped:
+            print(f"Dropped old collections: {', '.join(dropped)}")
 
         # Test query using local model
         print("\nTest query: embedding 'Nutella hazelnut spread'...")
-        model = SentenceTransformer(EMBEDDING_MODEL_NAME)
-        test_emb = model.encode("Nutella hazelnut spread", normalize_embeddings=True).tolist()
+        test_emb = embed_text("Nutella hazelnut spread")
 
-        results = client.search("products", query=test_emb, top_k=5, with_payload=True)
+        results = client.search(collection, query=test_emb, top_k=5, with_payload=True)
         print("Top 5 matches:")
         for r in results:
             print(f"  Score={r.score:.4f} | {r.payload.get('product_name')} ({r.payload.get('brands')})")
@@ -0,0 +1,166 @@
+"""
+Precompute the top greener alternatives for every catalog product.
+
+Runs after ingest, as step 3 of scripts/setup.py. Scores every product against every greener (ecoscore a/b)
+product with blocked matrix products over data/embeddings.npy, keeps the
+closest candidates per product, then applies the same category, dedupe and
+brand rules as /api/recommend/{code}. The result is a compact point-ID table
+(data/alternatives.npz) that the router serves from before falling back to
+live search. Run on its own, it then bumps the products alias's generation so
+running API processes reload the table.
+
+Usage:
+    python scripts/precompute_alternatives.py
+    python scripts/precompute_alternatives.py --candidates 500 --write-payload
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    ACTIAN_SHARDS,
+    ALTERNATIVES_PATH,
+    EMBEDDING_INDEX_PATH,
+    EMBEDDINGS_PATH,
+    PRODUCTS_ALIAS,
+    RERANK_FIELDS_PATH,
+)
+from services.alternatives import pick_alternatives, write_alternatives_table
+from services.partitions import category_keys
+from services.point_ids import product_point_id
+from services.rerank_fields import RerankFieldStore
+
+GREENER_GRADES = ("a", "b")
+TOP_N = 5
+BLOCK_ROWS = 1024
+WRITE_BATCH = 100
+
+
+def build_alternatives(
+    embeddings_path: str,
+    index_path: str,
+    rerank_path: str,
+    out_path: str,
+    top_n: int = TOP_N,
+    candidates: int = 200,
+) -> dict[str, list[str]]:
+    """Build the table and return product_code -> alternative codes."""
+    vectors = np.load(embeddings_path, mmap_mode="r")
+    with open(index_path, "r", encoding="utf-8") as f:
+        codes = json.load(f)
+    rerank_fields = RerankFieldStore()
+    if not rerank_fields.load(rerank_path):
+        raise FileNotFoundError(f"{rerank_path} not found; run ingest first")
+
+    point_ids = np.array([product_point_id(code) for code in codes], dtype=np.int64)
+    rows = [rerank_fields.get(int(pid)) or {"product_code": code} for pid, code in zip(point_ids, codes)]
+    cats = [frozenset(category_keys(row.get("categories"))) for row in rows]
+    greener = np.array([i for i, row in enumerate(rows) if row.get("ecoscore_grade") in GREENER_GRADES], dtype=np.int64)
+    print(f"{len(rows)} products, {len(greener)} greener candidates, keeping {candidates} per product")
+
+    greener_vectors = np.asarray(vectors[greener], dtype=np.float32)
+    k = min(candidates, len(greener))
+    alternative_ids = np.full((len(rows), top_n), -1, dtype=np.int64)
+    scores = np.zeros((len(rows), top_n), dtype=np.float32)
+    by_code: dict[str, list[str]] = {}
+
+    start = time.time()
+    for block_start in range(0, len(rows) if k else 0, BLOCK_ROWS):
+        block_stop = min(block_start + BLOCK_ROWS, len(rows))
+        sims = np.asarray(vectors[block_start:block_stop], dtype=np.float32) @ greener_vectors.T
+        top = np.argpartition(sims, sims.shape[1] - k, axis=1)[:, -k:]
+        for offset, idx in enumerate(top):
+            i = block_start + offset
+            idx = idx[np.argsort(-sims[offset, idx])]
+            candidate_rows = greener[idx]
+            candidate_items = [
+                {**rows[r], "_row": r, "similarity_score": float(s)}
+                for r, s in zip(candidate_rows, sims[offset, idx])
+            ]
+            picked = pick_alternatives(
+                rows[i].get("product_code"),
+                set(cats[i]),
+                candidate_items,
+                [cats[r] for r in candidate_rows],
+                top_n,
+            )
+            for slot, item in enumerate(picked):
+                alternative_ids[i, slot] = point_ids[item["_row"]]
+                scores[i, slot] = item["similarity_score"]
+            by_code[rows[i].get("product_code")] = [item["product_code"] for item in picked]
+        print(f"  {block_stop}/{len(rows)} ({block_stop / max(time.time() - start, 1e-9):.0f} products/sec)")
+
+    write_alternatives_table(out_path, point_ids, alternative_ids, scores)
+    print(f"Saved alternatives for {len(rows)} products to {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+    return by_code
+
+
+def write_back(by_code: dict[str, list[str]]) -> list[str]:
+    """Copy each product's alternative codes into its Actian payload; returns the codes not found."""
+    from services.collections import CollectionAliases
+    from services.sharding import cortex_client
+    from services.streaming import chunked
+
+    skipped = []
+    with cortex_client() as client:
+        collection = CollectionAliases(client, PRODUCTS_ALIAS).resolve()
+        print(f"Writing greener_alternatives to payloads in '{collection}' at {', '.join(ACTIAN_SHARDS)}...")
+        done = 0
+        for codes in chunked(by_code, WRITE_BATCH):
+            point_ids = [product_point_id(code) for code in codes]
+            ids, vectors, payloads = [], [], []
+            for code, point_id, (vector, payload) in zip(codes, point_ids, client.get_many(collection, point_ids)):
+                if vector is None or payload is None:
+                    skipped.append(code)
+                    continue
+                ids.append(point_id)
+                vectors.append(vector)
+                payloads.append({**payload, "greener_alternatives": by_code[code]})
+            if ids:
+                client.batch_upsert(collection, ids=ids, vectors=vectors, payloads=payloads)
+            done += len(codes)
+            if done % 5000 == 0:
+                print(f"  Updated {done}/{len(by_code)}")
+    print(f"Wrote greener_alternatives for {done - len(skipped)} products")
+    if skipped:
+        shown = ", ".join(skipped[:10]) + (", ..." if len(skipped) > 10 else "")
+        print(f"Skipped {len(skipped)} products not found in '{collection}': {shown}")
+    return skipped
+
+
+def publish_table():
+    """Have running API processes reload the rewritten table, as they would after an alias switch."""
+    from services.collections import CollectionAliases
+    from services.sharding import cortex_client
+    from services.sidecars import archive_sidecars
+
+    with cortex_client() as client:
+        aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+        archive_sidecars(aliases.resolve())
+        print(f"'{PRODUCTS_ALIAS}' is at generation {aliases.touch()}; API processes reload {ALTERNATIVES_PATH}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute greener alternatives for every product")
+    parser.add_argument("--candidates", type=int, default=200, help="Nearest greener products kept per product before rules")
+    parser.add_argument("--top-n", type=int, default=TOP_N)
+    parser.add_argument("--write-payload", action="store_true", help="Also store the codes in each Actian payload")
+    args = parser.parse_args()
+
+    by_code = build_alternatives(
+        EMBEDDINGS_PATH, EMBEDDING_INDEX_PATH, RERANK_FIELDS_PATH, ALTERNATIVES_PATH, args.top_n, args.candidates
+    )
+    if args.write_payload:
+        write_back(by_code)
+    publish_table()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Quantize data/embeddings.npy to per-dimension int8 codes for SEARCH_ENGINE=int8.
+
+Writes:
+    data/embeddings_int8.npy         int8 codes, one row per product
+    data/embeddings_int8_params.npz  per-dimension scale and offset (x ~= code * scale + offset)
+    data/embeddings_f16.npy          float16 originals used to rescore the int8 candidates
+
+With --no-float16 the float16 copy is skipped; point RESCORE_EMBEDDINGS_PATH at
+data/embeddings.npy to rescore against the float32 matrix instead.
+
+Usage:
+    python scripts/quantize_embeddings.py
+    python scripts/bench_local_search.py     # recall@5 against exact search
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import EMBEDDINGS_PATH, QUANTIZATION_PARAMS_PATH, QUANTIZED_EMBEDDINGS_PATH, RESCORE_EMBEDDINGS_PATH
+
+BLOCK_ROWS = 65536
+
+
+def fit_params(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Per-dimension scale/offset mapping each dimension's [min, max] onto [-128, 127]."""
+    lo = np.full(vectors.shape[1], np.inf, dtype=np.float32)
+    hi = np.full(vectors.shape[1], -np.inf, dtype=np.float32)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+        lo = np.minimum(lo, block.min(axis=0))
+        hi = np.maximum(hi, block.max(axis=0))
+    scale = np.maximum(hi - lo, 1e-12) / 255.0
+    offset = lo + 128.0 * scale
+    return scale.astype(np.float32), offset.astype(np.float32)
+
+
+def quantize(vectors: np.ndarray, scale: np.ndarray, offset: np.ndarray) -> np.ndarray:
+    codes = np.empty(vectors.shape, dtype=np.int8)
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        block = np.asarray(vectors[start:start + BLOCK_ROWS], dtype=np.float32)
+        codes[start:start + len(block)] = np.clip(np.rint((block - offset) / scale), -128, 127)
+    return codes
+
+
+def _save(path: str, array: np.ndarray):
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Quantize catalog embeddings to int8")
+    parser.add_argument("--no-float16", action="store_true", help="Skip writing the float16 rescoring copy")
+    args = parser.parse_args()
+
+    vectors = np.load(EMBEDDINGS_PATH, mmap_mode="r")
+    print(f"Quantizing {vectors.shape[0]} x {vectors.shape[1]} embeddings from {EMBEDDINGS_PATH}")
+
+    start = time.time()
+    scale, offset = fit_params(vectors)
+    codes = quantize(vectors, scale, offset)
+    elapsed = time.time() - start
+
+    _save(QUANTIZED_EMBEDDINGS_PATH, codes)
+    tmp_params = f"{QUANTIZATION_PARAMS_PATH}.tmp.npz"
+    np.savez(tmp_params, scale=scale, offset=offset)
+    os.replace(tmp_params, QUANTIZATION_PARAMS_PATH)
+
+    sample = np.asarray(vectors[:BLOCK_ROWS], dtype=np.float32)
+    err = np.abs(codes[:len(sample)].astype(np.float32) * scale + offset - sample).max()
+    print(f"Quantized in {elapsed:.1f}s, max reconstruction error {err:.4f}")
+    print(f"  float32: {vectors.nbytes / 1e6:.1f} MB -> int8: {codes.nbytes / 1e6:.1f} MB ({QUANTIZED_EMBEDDINGS_PATH})")
+
+    if not args.no_float16:
+        originals = np.empty(vectors.shape, dtype=np.float16)
+        for start in range(0, len(vectors), BLOCK_ROWS):
+            originals[start:start + BLOCK_ROWS] = vectors[start:start + BLOCK_ROWS]
+        _save(RESCORE_EMBEDDINGS_PATH, originals)
+        print(f"  float16 rescoring copy: {originals.nbytes / 1e6:.1f} MB ({RESCORE_EMBEDDINGS_PATH})")
+
+
+if __name__ == "__main__":
+    main()
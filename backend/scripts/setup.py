@@ -1,13 +1,34 @@
 """
-One-command data pipeline: build catalog → generate embeddings → ingest into Actian VectorDB.
-Wipes and recreates the VectorDB collection from scratch.
+One-command data pipeline: build catalog → generate embeddings → ingest into Actian VectorDB → precompute greener alternatives.
+Embedding and ingest run as a streaming pipeline: catalog records are read from
+disk in micro-batches, embedded on one thread and upserted on another, with
+bounded queues in between, so memory stays flat however large the catalog is.
+
+Builds a new versioned VectorDB collection and, once it checks out, repoints the
+products alias at it; the collection being served is left untouched until then.
+The local files for the new version (embeddings, rerank fields, cold store,
+partitions, alternatives, ...) are written beside the live ones and moved into
+place after verification, just before the alias switch, since the API reloads
+them as soon as the alias moves.
+
+Later runs are incremental: data/ingest_manifest.json records what the live
+collection holds, so only new or changed products are re-embedded and upserted
+(in place) and products gone from the catalog are deleted. The alias doesn't
+move then, so its generation is bumped for running API processes to reload the
+local files.
 
 Usage:
     python scripts/setup.py
+    python scripts/setup.py --full
+    python scripts/setup.py --async-ingest
+    python scripts/setup.py --micro-batch 1024
+    python scripts/setup.py --publish
 """
 
+import argparse
 import json
 import os
+import random
 import sys
 import time
 
@@ -16,17 +37,189 @@ from sentence_transformers import SentenceTransformer
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from config import ACTIAN_ADDRESS, EMBEDDING_DIM, EMBEDDING_MODEL_NAME
-from cortex import CortexClient, DistanceMetric
+from config import (
+    ACTIAN_SHARDS,
+    ALTERNATIVES_PATH,
+    COLLECTION_KEEP_VERSIONS,
+    EMBEDDING_DIM,
+    EMBEDDING_MODEL_DIM,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_REDUCED_DIM,
+    EMBEDDINGS_FULL_PATH,
+    HNSW_EF_CONSTRUCTION,
+    HNSW_INDEX_PATH,
+    HNSW_M,
+    INGEST_MANIFEST_PATH,
+    PARTITION_SIBLINGS,
+    PARTITIONS_PATH,
+    PCA_FIT_ROWS,
+    PCA_PROJECTION_PATH,
+    PCA_WHITEN,
+    PRODUCTS_ALIAS,
+    SEARCH_ENGINE,
+)
+from services.cold_store import ColdStoreWriter, split_payload
+from services.bulk_ingest import BackgroundIngester
+from services.collections import CollectionAliases, verify_collection
+from services.ingest_manifest import IngestManifest, content_hash
+from services.partitions import PartitionBuilder, category_keys, product_partition
+from services.point_ids import product_point_id
+from services.projection import PcaProjection
+from services.rerank_fields import rerank_row, write_rerank_fields
+from services.sharding import cortex_client
+from services.sidecars import StagedSidecars, archive_sidecars, drop_sidecars
+from services.streaming import NpyRowWriter, Stage, chunked, iter_json_array
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
 CATALOG_PATH = os.path.join(DATA_DIR, "catalog.json")
+RERANK_FIELDS_PATH = os.path.join(DATA_DIR, "rerank_fields.json")
+COLD_STORE_PATH = os.path.join(DATA_DIR, "cold_store.sqlite")
+EMBEDDINGS_PATH = os.path.join(DATA_DIR, "embeddings.npy")
+INDEX_PATH = os.path.join(DATA_DIR, "embedding_index.json")
 
 # Import build_catalog functions
 from scripts.build_catalog import main as build_catalog
+from scripts.precompute_alternatives import build_alternatives
+from scripts.snapshot import publish
+
+BATCH_SIZE = 100
+# Products per pipeline item, and items each queue may hold ahead of its consumer.
+MICRO_BATCH = 512
+QUEUE_DEPTH = 4
+
+# Fields to skip: "ingredients" is a massive nested structure (up to 80KB)
+# that duplicates "ingredients_text" in a less useful form.
+# "images" is per-image metadata blobs. "ecoscore_data" can also be huge.
+# "packagings" is structured packaging data redundant with packaging_tags.
+SKIP_KEYS = {"code", "ingredients", "images", "ecoscore_data", "packagings"}
+
+
+def build_payload(p: dict) -> dict:
+    payload = {}
+    payload["product_code"] = p["code"]
+    for key, val in p.items():
+        if key in SKIP_KEYS:
+            continue
+        if val is None:
+            continue
+        if isinstance(val, (list, dict)):
+            serialized = json.dumps(val)
+            if len(serialized) > 5_000:
+                continue
+            payload[key] = serialized
+        else:
+            payload[key] = val
+    # Keep legacy aliases the UI expects
+    payload.setdefault("palm_oil_count", p.get("ingredients_from_palm_oil_n") or 0)
+    payload.setdefault("nutrition_json", json.dumps(p.get("nutriments") or {}))
+    payload.setdefault("image_url", p.get("image_front_url") or "")
+    payload["partition"] = product_partition(p.get("categories_tags"))
+    payload["category_keys"] = category_keys(p.get("categories"))
+    return payload
+
+
+def previous_vectors() -> tuple[dict[str, int], np.ndarray | None]:
+    """Last run's model-space vectors and product_code -> row, for reusing unchanged names."""
+    path = EMBEDDINGS_FULL_PATH if EMBEDDING_REDUCED_DIM else EMBEDDINGS_PATH
+    if not (os.path.exists(path) and os.path.exists(INDEX_PATH)):
+        return {}, None
+    with open(INDEX_PATH, "r", encoding="utf-8") as f:
+        codes = json.load(f)
+    vectors = np.load(path, mmap_mode="r")
+    if len(vectors) != len(codes) or vectors.shape[1] != EMBEDDING_MODEL_DIM:
+        return {}, None
+    return {code: row for row, code in enumerate(codes)}, vectors
+
+
+def timed(items, timings: dict[str, float], stage: str):
+    """Pass items through, adding the time spent producing each one to timings[stage]."""
+    it = iter(items)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            return
+        finally:
+            timings[stage] += time.perf_counter() - start
+        yield item
+
+
+def fit_projection(sample: np.ndarray, path: str) -> PcaProjection:
+    projection = PcaProjection.fit(sample, EMBEDDING_REDUCED_DIM, whiten=PCA_WHITEN)
+    projection.save(path)
+    print(f"PCA {sample.shape[1]} -> {EMBEDDING_REDUCED_DIM} dims{' (whitened)' if PCA_WHITEN else ''} "
+          f"fitted on {len(sample)} products: {projection.explained_variance_ratio:.1%} of variance kept, "
+          f"saved to {path}")
+    return projection
+
+
+def embed_chunks(chunks, model, manifest: IngestManifest | None, timings: dict[str, float], projection_path: str):
+    """Embedding stage: (products, text_hashes, model_vectors, vectors, changed) per micro-batch.
+
+    Last run's vector is reused wherever the embedded text is unchanged;
+    `changed` marks the rows that were encoded. `vectors` are PCA-reduced when
+    EMBEDDING_REDUCED_DIM is set: with a manifest the fitted projection is kept
+    so unchanged products keep their stored vectors, otherwise it is fitted on
+    the first PCA_FIT_ROWS products, which are held back until then, and
+    saved to projection_path.
+    """
+    previous_rows, previous = previous_vectors() if manifest is not None else ({}, None)
+    projection = None
+    if EMBEDDING_REDUCED_DIM and manifest is not None:
+        projection = PcaProjection.load(PCA_PROJECTION_PATH)
+    held = []
+    for products in chunks:
+        start = time.perf_counter()
+        texts = [p.get("product_name", "") for p in products]
+        text_hashes = [content_hash(t) for t in texts]
+        model_vectors = np.empty((len(products), EMBEDDING_MODEL_DIM), dtype=np.float32)
+        changed = np.ones(len(products), dtype=bool)
+        for i, p in enumerate(products):
+            row = previous_rows.get(p["code"])
+            if row is not None and manifest.text_hash(p["code"]) == text_hashes[i]:
+                model_vectors[i] = previous[row]
+                changed[i] = False
+        if changed.any():
+            rows = np.flatnonzero(changed)
+            model_vectors[rows] = model.encode(
+                [texts[i] for i in rows], normalize_embeddings=True, batch_size=len(rows)
+            )
+        timings["embed"] += time.perf_counter() - start
+
+        if not EMBEDDING_REDUCED_DIM:
+            yield products, text_hashes, model_vectors, model_vectors, changed
+        elif projection is not None:
+            yield products, text_hashes, model_vectors, projection.apply(model_vectors), changed
+        else:
+            held.append((products, text_hashes, model_vectors, changed))
+            if sum(len(c[0]) for c in held) >= PCA_FIT_ROWS:
+                projection = fit_projection(np.concatenate([c[2] for c in held]), projection_path)
+                for products, text_hashes, model_vectors, changed in held:
+                    yield products, text_hashes, model_vectors, projection.apply(model_vectors), changed
+                held = []
+    if held:
+        projection = fit_projection(np.concatenate([c[2] for c in held]), projection_path)
+        for products, text_hashes, model_vectors, changed in held:
+            yield products, text_hashes, model_vectors, projection.apply(model_vectors), changed
+    # Release the memory map before the embeddings file is replaced.
+    del previous
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Build the catalog, embeddings and Actian collection")
+    parser.add_argument("--full", action="store_true", help="Ignore the ingest manifest and rebuild everything")
+    parser.add_argument(
+        "--async-ingest", action="store_true", help="Concurrent byte-sized batches over several channels"
+    )
+    parser.add_argument(
+        "--micro-batch", type=int, default=MICRO_BATCH, help="Products per pipeline item (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--publish", action="store_true", help="Snapshot the verified collection (scripts/snapshot.py publish)"
+    )
+    args = parser.parse_args()
+
     os.makedirs(DATA_DIR, exist_ok=True)
 
     # --- Step 1: Build catalog ---
@@ -35,97 +228,239 @@ def main():
     print("=" * 60)
     build_catalog()
 
-    # --- Step 2: Generate embeddings ---
+    # --- Step 2: Stream catalog -> embeddings -> Actian VectorDB ---
     print("\n" + "=" * 60)
-    print("STEP 2: Generating embeddings with local model")
+    print("STEP 2: Embedding and ingesting into Actian VectorDB")
     print("=" * 60)
 
-    with open(CATALOG_PATH, "r", encoding="utf-8") as f:
-        products = json.load(f)
-
-    print(f"Loaded {len(products)} products")
     print(f"Model: {EMBEDDING_MODEL_NAME}")
-
-    texts = [p.get("product_name", "") for p in products]
     model = SentenceTransformer(EMBEDDING_MODEL_NAME)
 
-    start = time.time()
-    embeddings = model.encode(texts, normalize_embeddings=True, batch_size=512, show_progress_bar=True)
-    elapsed = time.time() - start
-    print(f"Encoded {len(texts)} texts in {elapsed:.1f}s ({len(texts)/elapsed:.0f} texts/sec)")
-
-    # --- Step 3: Ingest into Actian VectorDB ---
-    print("\n" + "=" * 60)
-    print("STEP 3: Ingesting into Actian VectorDB")
-    print("=" * 60)
+    manifest = None if args.full else IngestManifest.load(INGEST_MANIFEST_PATH)
+    if manifest is not None and not manifest.matches(EMBEDDING_MODEL_NAME, EMBEDDING_DIM):
+        print(f"{INGEST_MANIFEST_PATH} was written for another model or dimension; rebuilding everything")
+        manifest = None
+    if EMBEDDING_REDUCED_DIM and not os.path.exists(PCA_PROJECTION_PATH):
+        manifest = None
 
-    print(f"Connecting to {ACTIAN_ADDRESS}...")
-    with CortexClient(ACTIAN_ADDRESS) as client:
+    print(f"Connecting to {', '.join(ACTIAN_SHARDS)}...")
+    with cortex_client() as client:
         version, uptime = client.health_check()
         print(f"Connected: {version}")
 
-        # Wipe and recreate
-        print(f"Recreating collection 'products' (dim={EMBEDDING_DIM}, COSINE)...")
-        client.recreate_collection(
-            name="products",
-            dimension=EMBEDDING_DIM,
-            distance_metric=DistanceMetric.COSINE,
-        )
+        aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+        live = aliases.resolve()
+        # The manifest describes the live collection; deltas go straight into it.
+        # Otherwise build a fresh versioned collection and switch the alias below.
+        incremental = manifest is not None and manifest.collection == live and client.has_collection(live)
+        if incremental:
+            collection = live
+            print(f"Updating '{collection}' in place ({len(manifest.products)} products in {INGEST_MANIFEST_PATH})")
+        else:
+            collection = aliases.create_next(EMBEDDING_DIM)
+            print(f"Creating collection '{collection}' (dim={EMBEDDING_DIM}, COSINE); '{PRODUCTS_ALIAS}' stays on '{live}'")
 
-        # Batch insert — store ALL fields from the catalog.
+        # Store ALL fields from the catalog, split into a lean hot payload in
+        # Actian and the bulky remainder in the local cold store.
         # Lists/dicts are JSON-serialized for storage; the UI selectively reads what it needs.
-        total = len(products)
-        BATCH_SIZE = 100
-        for start_idx in range(0, total, BATCH_SIZE):
-            end_idx = min(start_idx + BATCH_SIZE, total)
-            batch_ids = list(range(start_idx, end_idx))
-            batch_vectors = [embeddings[i].tolist() for i in range(start_idx, end_idx)]
-            batch_payloads = []
-
-            # Fields to skip: "ingredients" is a massive nested structure (up to 80KB)
-            # that duplicates "ingredients_text" in a less useful form.
-            # "images" is per-image metadata blobs. "ecoscore_data" can also be huge.
-            # "packagings" is structured packaging data redundant with packaging_tags.
-            SKIP_KEYS = {"code", "ingredients", "images", "ecoscore_data", "packagings"}
-
-            for p in products[start_idx:end_idx]:
-                payload = {}
-                payload["product_code"] = p["code"]
-                for key, val in p.items():
-                    if key in SKIP_KEYS:
-                        continue
-                    if val is None:
-                        continue
-                    if isinstance(val, (list, dict)):
-                        serialized = json.dumps(val)
-                        if len(serialized) > 5_000:
-                            continue
-                        payload[key] = serialized
-                    else:
-                        payload[key] = val
-                # Keep legacy aliases the UI expects
-                payload.setdefault("palm_oil_count", p.get("ingredients_from_palm_oil_n") or 0)
-                payload.setdefault("nutrition_json", json.dumps(p.get("nutriments") or {}))
-                payload.setdefault("image_url", p.get("image_front_url") or "")
-                batch_payloads.append(payload)
-
-            client.batch_upsert("products", ids=batch_ids, vectors=batch_vectors, payloads=batch_payloads)
-            if end_idx % 500 == 0 or end_idx == total:
-                print(f"  Inserted {end_idx}/{total}")
-
-        count = client.count("products")
+        timings = {"read": 0.0, "embed": 0.0, "ingest": 0.0}
+        total = encoded = upserted = skipped = 0
+        codes = []
+        samples = []
+        manifest_products = {}
+        pending_ids, pending_vectors, pending_payloads = [], [], []
+        ingester = BackgroundIngester(ACTIAN_SHARDS, collection) if args.async_ingest else None
+        # Local files for this version; the live ones stay as they are until step 4.
+        staged = StagedSidecars(
+            EMBEDDINGS_PATH, EMBEDDINGS_FULL_PATH, INDEX_PATH, PCA_PROJECTION_PATH, HNSW_INDEX_PATH,
+            RERANK_FIELDS_PATH, COLD_STORE_PATH, PARTITIONS_PATH, ALTERNATIVES_PATH,
+        )
+        staged.discard()  # left over from an interrupted run
+        vector_writer = NpyRowWriter(staged.path(EMBEDDINGS_PATH), EMBEDDING_DIM)
+        full_writer = (
+            NpyRowWriter(staged.path(EMBEDDINGS_FULL_PATH), EMBEDDING_MODEL_DIM) if EMBEDDING_REDUCED_DIM else None
+        )
+        rerank_rows = {}
+        cold_writer = ColdStoreWriter(staged.path(COLD_STORE_PATH))
+        partition_builder = PartitionBuilder()
+
+        def flush_pending():
+            nonlocal upserted, pending_ids, pending_vectors, pending_payloads
+            vectors = np.concatenate(pending_vectors)
+            if ingester:
+                ingester.add_many(pending_ids, vectors, pending_payloads)
+            else:
+                client.batch_upsert(collection, ids=pending_ids, vectors=vectors.tolist(), payloads=pending_payloads)
+            upserted += len(pending_ids)
+            pending_ids, pending_vectors, pending_payloads = [], [], []
+
+        started = time.perf_counter()
+        reader = Stage("read", timed(chunked(iter_json_array(CATALOG_PATH), args.micro_batch), timings, "read"), QUEUE_DEPTH)
+        embedder = Stage(
+            "embed", embed_chunks(reader, model, manifest, timings, staged.path(PCA_PROJECTION_PATH)), QUEUE_DEPTH
+        )
+        for products, text_hashes, model_vectors, vectors, changed in embedder:
+            stage_start = time.perf_counter()
+            vector_writer.append(vectors)
+            if full_writer:
+                full_writer.append(model_vectors)
+            encoded += int(changed.sum())
+
+            batch_cold = []
+            upsert_rows = []
+            for i, p in enumerate(products):
+                point_id = product_point_id(p["code"])
+                # rerank rows start with product_code; a different code here is a hash collision.
+                if point_id in rerank_rows and rerank_rows[point_id][0] != p["code"]:
+                    raise ValueError(f"Point ID collision: {rerank_rows[point_id][0]!r} and {p['code']!r} both map to {point_id}")
+                hot, cold = split_payload(build_payload(p))
+                batch_cold.append((p["code"], cold))
+                rerank_rows[point_id] = rerank_row(hot)
+                partition_builder.add(hot["partition"], vectors[i])
+                codes.append(p["code"])
+
+                # Reservoir sample of products to self-query once ingest is done.
+                if len(samples) < 20:
+                    samples.append((point_id, vectors[i].tolist()))
+                elif random.randrange(total + i + 1) < 20:
+                    samples[random.randrange(20)] = (point_id, vectors[i].tolist())
+
+                payload_hash = content_hash(hot)
+                manifest_products[p["code"]] = [payload_hash, text_hashes[i]]
+                if incremental and not changed[i] and manifest.payload_hash(p["code"]) == payload_hash:
+                    skipped += 1
+                    continue
+                upsert_rows.append(i)
+                pending_ids.append(point_id)
+                pending_payloads.append(hot)
+            total += len(products)
+
+            if upsert_rows:
+                pending_vectors.append(vectors[upsert_rows])
+            if len(pending_ids) >= BATCH_SIZE:
+                flush_pending()
+            cold_writer.add_many(batch_cold)
+            timings["ingest"] += time.perf_counter() - stage_start
+            if total % 5000 < len(products):
+                print(f"  Processed {total} ({encoded} encoded, {upserted} upserted, {skipped} unchanged)")
+
+        if pending_ids:
+            flush_pending()
+        if ingester:
+            stats = ingester.close()
+            upserted -= stats["failed"]
+            if stats["failed"]:
+                # Leave failed products out of the manifest so the next run retries them.
+                failed = set(stats["failed_ids"])
+                manifest_products = {
+                    code: hashes for code, hashes in manifest_products.items() if product_point_id(code) not in failed
+                }
+            print(
+                f"Upserted {stats['points']} points in {stats['batches']} batches over {stats['seconds']}s "
+                f"({stats['points_per_sec']:.0f} points/sec, {stats['retries']} retries, {stats['failed']} failed)"
+            )
+        wall = max(time.perf_counter() - started, 1e-9)
+        print(f"Processed {total} products in {wall:.1f}s ({total / wall:.0f} products/sec); busy time per stage: "
+              + ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in timings.items()))
+
+        # Keep the matrix on disk for the local search engine (SEARCH_ENGINE=exact / fallback).
+        vector_writer.close()
+        if full_writer:
+            full_writer.close()
+        with open(staged.path(INDEX_PATH), "w", encoding="utf-8") as f:
+            json.dump(codes, f)
+        print(f"Saved embeddings to {staged.path(EMBEDDINGS_PATH)}")
+        if SEARCH_ENGINE == "hnsw":
+            from scripts.build_hnsw_index import build_index
+            build_index(
+                staged.path(EMBEDDINGS_PATH), staged.path(INDEX_PATH), staged.path(HNSW_INDEX_PATH),
+                HNSW_M, HNSW_EF_CONSTRUCTION,
+            )
+
+        # Tombstones: products the live collection holds that left the catalog.
+        catalog_codes = set(codes)
+        removed = [code for code in manifest.products if code not in catalog_codes] if incremental else []
+        for start_idx in range(0, len(removed), BATCH_SIZE):
+            client.batch_delete(collection, [product_point_id(code) for code in removed[start_idx:start_idx + BATCH_SIZE]])
+        if removed:
+            print(f"  Deleted {len(removed)} products no longer in the catalog")
+
+        count = client.count(collection)
         print(f"\nTotal vectors in collection: {count}")
 
+        problems = verify_collection(client, collection, total, samples)
+        if incremental:
+            for problem in problems:
+                print(f"Warning: {problem}; rerun with --full to rebuild")
+        elif problems:
+            staged.discard()
+            raise SystemExit(
+                f"Not switching '{PRODUCTS_ALIAS}' to '{collection}': " + "; ".join(problems)
+            )
+
+        write_rerank_fields(staged.path(RERANK_FIELDS_PATH), rerank_rows)
+        print(f"Saved rerank fields for {len(rerank_rows)} products to {staged.path(RERANK_FIELDS_PATH)}")
+        cold_count = cold_writer.close()
+        print(f"Saved cold payloads for {cold_count} products to {staged.path(COLD_STORE_PATH)}")
+        partition_count = partition_builder.write(staged.path(PARTITIONS_PATH), siblings=PARTITION_SIBLINGS)
+        print(f"Saved {partition_count} category partitions to {staged.path(PARTITIONS_PATH)}")
+
         # Test query
         print("\nTest query: 'Nutella hazelnut spread'")
-        test_emb = model.encode("Nutella hazelnut spread", normalize_embeddings=True).tolist()
-        results = client.search("products", query=test_emb, top_k=5, with_payload=True)
+        test_emb = model.encode("Nutella hazelnut spread", normalize_embeddings=True)
+        if EMBEDDING_REDUCED_DIM:
+            test_emb = PcaProjection.load(staged.current(PCA_PROJECTION_PATH)).apply(test_emb)
+        test_emb = test_emb.tolist()
+        results = client.search(collection, query=test_emb, top_k=5, with_payload=True)
         for r in results:
             print(f"  {r.score:.4f} | {r.payload.get('product_name')} ({r.payload.get('brands')})")
 
+        # --- Step 3: Precompute greener alternatives ---
+        print("\n" + "=" * 60)
+        print("STEP 3: Precomputing greener alternatives")
+        print("=" * 60)
+        build_alternatives(
+            staged.path(EMBEDDINGS_PATH),
+            staged.path(INDEX_PATH),
+            staged.path(RERANK_FIELDS_PATH),
+            staged.path(ALTERNATIVES_PATH),
+        )
+
+        # --- Step 4: Local files into place, then the alias ---
+        print("\n" + "=" * 60)
+        print("STEP 4: Going live")
+        print("=" * 60)
+        print(f"Moved {staged.commit()} local files into place")
+        if not incremental:
+            aliases.switch(collection)
+            print(f"Switched '{PRODUCTS_ALIAS}': '{live}' -> '{collection}'")
+            dropped = aliases.prune(COLLECTION_KEEP_VERSIONS)
+            for name in dropped:
+                drop_sidecars(name)
+            if dropped:
+                print(f"Dropped old collections: {', '.join(dropped)}")
+        IngestManifest(collection, EMBEDDING_MODEL_NAME, EMBEDDING_DIM, manifest_products).save(INGEST_MANIFEST_PATH)
+        # Kept so scripts/switch_collection.py can bring this version's files back.
+        archive_sidecars(collection)
+        if incremental:
+            print(f"'{PRODUCTS_ALIAS}' is at generation {aliases.touch()}; API processes reload the local files")
+
+    if args.publish:
+        if problems:
+            print("\nNot publishing a snapshot: the collection did not verify cleanly")
+        else:
+            print("\n" + "=" * 60)
+            print("Publishing snapshot")
+            print("=" * 60)
+            publish()
+
     print("\n" + "=" * 60)
     print("DONE! Pipeline complete.")
     print("=" * 60)
+    print(f"Mode:       {'incremental into ' + collection if incremental else 'full rebuild into ' + collection}")
+    print(f"Embeddings: {encoded} encoded, {total - encoded} reused")
+    print(f"Upserts:    {upserted} written, {skipped} unchanged skipped")
+    print(f"Deletes:    {len(removed)} removed from the collection")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+"""
+Publish the live product collection as a snapshot bundle, or restore one.
+
+publish flushes the collection the products alias points at, has the server
+save a snapshot of it, and packages a bundle next to it: the local sidecar
+files the API serves from (embeddings, rerank fields, cold store, partitions,
+alternatives, ...) plus snapshot.json recording the collection, point count,
+catalog version and embedding model.
+
+restore copies a bundle's sidecars into place, has the server load the
+snapshot, checks the point count and points the alias at the collection, so
+a fresh environment reaches serving state without downloading the model,
+encoding or ingesting.
+
+The server keeps snapshot files under its own /data volume. To move them
+between machines, pass --server-data with the host directory mapped to /data:
+publish copies it into the bundle and restore copies it back (with the server
+stopped, or before it first starts).
+
+Usage:
+    python scripts/snapshot.py publish
+    python scripts/snapshot.py publish --archive --server-data ./actian-data
+    python scripts/snapshot.py restore data/snapshots/products_v3
+    python scripts/snapshot.py restore data/snapshots/products_v3.tar.gz
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from config import (
+    ACTIAN_SHARDS,
+    EMBEDDING_DIM,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_REDUCED_DIM,
+    PRODUCTS_ALIAS,
+    SNAPSHOT_DIR,
+)
+from cortex import CortexError
+from services.collections import CollectionAliases
+from services.sharding import cortex_client
+from services.sidecars import SIDECAR_SETTINGS, archive_sidecars
+
+CATALOG_PATH = os.path.join(config.DATA_DIR, "catalog.json")
+MANIFEST_NAME = "snapshot.json"
+SERVER_DATA_NAME = "server_data"
+
+
+def file_hash(path: str) -> str:
+    digest = hashlib.blake2b(digest_size=12)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _copy_atomic(src: str, dst: str):
+    os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+    tmp_path = f"{dst}.tmp"
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def publish(bundle_root: str = SNAPSHOT_DIR, archive: bool = False, server_data: str | None = None) -> str:
+    """Snapshot the live collection and write its bundle; returns the bundle path."""
+    with cortex_client() as client:
+        collection = CollectionAliases(client, PRODUCTS_ALIAS).resolve()
+        client.flush(collection)
+        client.save_snapshot(collection)
+        count = client.count(collection)
+    print(f"Saved server snapshot of '{collection}' ({count} points)")
+
+    bundle = os.path.join(bundle_root, collection)
+    if os.path.exists(bundle):
+        shutil.rmtree(bundle)
+    os.makedirs(bundle)
+    # Each file goes in under its basename; restore writes it back to whatever
+    # path that setting has in the target environment.
+    files = {}
+    for setting in SIDECAR_SETTINGS:
+        path = getattr(config, setting)
+        if os.path.exists(path):
+            shutil.copyfile(path, os.path.join(bundle, os.path.basename(path)))
+            files[setting] = os.path.basename(path)
+    if server_data:
+        shutil.copytree(server_data, os.path.join(bundle, SERVER_DATA_NAME), ignore=shutil.ignore_patterns("*.log"))
+
+    manifest = {
+        "collection": collection,
+        "alias": PRODUCTS_ALIAS,
+        "count": count,
+        # Points are placed by shard_of(id, shards), so a bundle only fits the same layout.
+        "shards": len(ACTIAN_SHARDS),
+        "catalog_version": file_hash(CATALOG_PATH) if os.path.exists(CATALOG_PATH) else None,
+        "embedding_model": EMBEDDING_MODEL_NAME,
+        "embedding_dim": EMBEDDING_DIM,
+        "embedding_reduced_dim": EMBEDDING_REDUCED_DIM,
+        "files": files,
+        "server_data": bool(server_data),
+        "published_at": time.time(),
+    }
+    with open(os.path.join(bundle, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Packaged {len(files)} sidecar files into {bundle}")
+
+    if archive:
+        bundle = shutil.make_archive(bundle, "gztar", root_dir=bundle_root, base_dir=collection)
+        print(f"Archived bundle to {bundle}")
+    return bundle
+
+
+def _open_bundle(path: str) -> tuple[str, tempfile.TemporaryDirectory | None]:
+    if os.path.isdir(path):
+        return path, None
+    extracted = tempfile.TemporaryDirectory()
+    with tarfile.open(path) as tar:
+        tar.extractall(extracted.name, filter="data")
+    (name,) = os.listdir(extracted.name)
+    return os.path.join(extracted.name, name), extracted
+
+
+def restore(path: str, server_data: str | None = None, force: bool = False) -> str:
+    """Load a bundle's snapshot and sidecars and point the alias at it; returns the collection."""
+    bundle, extracted = _open_bundle(path)
+    try:
+        with open(os.path.join(bundle, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        collection = manifest["collection"]
+        expected = (EMBEDDING_MODEL_NAME, EMBEDDING_DIM)
+        if (manifest["embedding_model"], manifest["embedding_dim"]) != expected and not force:
+            raise SystemExit(
+                f"Bundle was built with {manifest['embedding_model']} ({manifest['embedding_dim']} dims), "
+                f"this environment uses {expected[0]} ({expected[1]} dims); --force to restore anyway"
+            )
+
+        if manifest.get("shards", 1) != len(ACTIAN_SHARDS):
+            raise SystemExit(
+                f"Bundle was published from {manifest.get('shards', 1)} shards, ACTIAN_SHARDS lists {len(ACTIAN_SHARDS)}"
+            )
+        if server_data:
+            if not manifest.get("server_data"):
+                raise SystemExit(f"{path} has no server data; publish it with --server-data")
+            shutil.copytree(os.path.join(bundle, SERVER_DATA_NAME), server_data, dirs_exist_ok=True)
+            print(f"Copied server data into {server_data}")
+
+        with cortex_client() as client:
+            try:
+                client.load_snapshot(collection)
+            except CortexError as e:
+                raise SystemExit(f"Server could not load the snapshot of '{collection}': {e}") from None
+            count = client.count(collection)
+            if count != manifest["count"]:
+                raise SystemExit(f"'{collection}' has {count} points after loading, expected {manifest['count']}")
+            print(f"Loaded snapshot of '{collection}' ({count} points)")
+
+            # Sidecars go in before the switch so the API never serves the new
+            # collection with the old local files. The outgoing collection's
+            # are kept for switching back to it.
+            aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+            outgoing = aliases.resolve()
+            if outgoing != collection and client.has_collection(outgoing):
+                archive_sidecars(outgoing)
+            for setting, name in manifest["files"].items():
+                _copy_atomic(os.path.join(bundle, name), getattr(config, setting))
+            print(f"Restored {len(manifest['files'])} sidecar files")
+
+            previous = aliases.switch(collection)
+            print(f"Switched '{PRODUCTS_ALIAS}': '{previous}' -> '{collection}'")
+            archive_sidecars(collection)
+        return collection
+    finally:
+        if extracted:
+            extracted.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or restore a product collection snapshot")
+    commands = parser.add_subparsers(dest="command", required=True)
+    publish_cmd = commands.add_parser("publish", help="Snapshot the live collection into a bundle")
+    publish_cmd.add_argument("--out", default=SNAPSHOT_DIR, help="Directory for bundles (default: %(default)s)")
+    publish_cmd.add_argument("--archive", action="store_true", help="Also write the bundle as a .tar.gz")
+    publish_cmd.add_argument("--server-data", help="Host directory mapped to the server's /data, to include")
+    restore_cmd = commands.add_parser("restore", help="Load a bundle (directory or .tar.gz)")
+    restore_cmd.add_argument("bundle")
+    restore_cmd.add_argument("--server-data", help="Host directory mapped to the server's /data, to fill")
+    restore_cmd.add_argument("--force", action="store_true", help="Restore even if the embedding model differs")
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        publish(args.out, archive=args.archive, server_data=args.server_data)
+    else:
+        restore(args.bundle, server_data=args.server_data, force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Show or change which versioned collection the products alias points at.
+
+Ingest keeps the previous COLLECTION_KEEP_VERSIONS collections, and each
+version's local files under COLLECTION_SIDECARS_DIR/<collection>, so rolling
+back a bad reindex is a pointer switch rather than a re-ingest. The target's
+local files are put back in place first (the current ones are kept for
+switching forward again); a collection whose files weren't kept is refused.
+Running API processes pick the change up within COLLECTION_REFRESH_SECONDS and
+reload the local files with it.
+
+Usage:
+    python scripts/switch_collection.py
+    python scripts/switch_collection.py --rollback
+    python scripts/switch_collection.py --to products_v3
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PRODUCTS_ALIAS
+from services.collections import CollectionAliases
+from services.sharding import cortex_client
+from services.sidecars import archive_sidecars, has_sidecars, restore_sidecars, version_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show or switch the products alias")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--rollback", action="store_true", help="Point the alias at the previous collection")
+    group.add_argument("--to", help="Collection to point the alias at")
+    args = parser.parse_args()
+
+    with cortex_client() as client:
+        aliases = CollectionAliases(client, PRODUCTS_ALIAS)
+        history = aliases.history()
+        target = args.to
+        if args.rollback:
+            if not history:
+                raise SystemExit(f"No previous collection recorded for '{PRODUCTS_ALIAS}'")
+            target = history[0]
+        if target:
+            if not client.has_collection(target):
+                raise SystemExit(f"Collection '{target}' does not exist")
+            current = aliases.resolve()
+            if target != current:
+                # The API reloads its local files when the alias moves; they have to be target's.
+                if not has_sidecars(target):
+                    raise SystemExit(
+                        f"No local files kept for '{target}' in {version_dir(target)}; "
+                        "rebuild it with scripts/setup.py --full or restore a snapshot bundle"
+                    )
+                archive_sidecars(current)
+                print(f"Restored {restore_sidecars(target)} local files of '{target}'")
+            previous = aliases.switch(target)
+            print(f"Switched '{PRODUCTS_ALIAS}': '{previous}' -> '{target}'")
+
+        print(f"'{PRODUCTS_ALIAS}' -> '{aliases.resolve()}' ({client.count(aliases.resolve())} points)")
+        for name in aliases.history():
+            count = client.count(name) if client.has_collection(name) else "missing"
+            print(f"  previous: {name} ({count} points)")
+
+
+if __name__ == "__main__":
+    main()
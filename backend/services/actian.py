@@ -1,6 +1,68 @@
-from cortex import CortexClient, DistanceMetric
+import asyncio
+import hashlib
+import json
+import time
+
+import numpy as np
+
+from cortex import AsyncCortexClient, CortexError, DistanceMetric
 from cortex.filters import Filter, Field
-from config import ACTIAN_ADDRESS, EMBEDDING_DIM
+from cortex.transport.pool import PoolConfig
+from config import (
+    ACTIAN_BREAKER_FAILURES,
+    ACTIAN_BREAKER_OPEN_SECONDS,
+    ACTIAN_KEEPALIVE_MS,
+    ACTIAN_KEEPALIVE_TIMEOUT_MS,
+    ACTIAN_LATENCY_BUDGET_MS,
+    ACTIAN_POOL_SIZE,
+    ACTIAN_SHARDS,
+    ACTIAN_TIMEOUT_SECONDS,
+    ALTERNATIVES_PATH,
+    COLD_STORE_PATH,
+    COLLECTION_REFRESH_SECONDS,
+    EMBEDDING_DIM,
+    EMBEDDING_INDEX_PATH,
+    EMBEDDINGS_PATH,
+    HNSW_EF_SEARCH,
+    HNSW_INDEX_PATH,
+    LOCAL_SEARCH_FALLBACK,
+    PARTITION_SEARCH,
+    PARTITION_SIBLINGS,
+    PARTITIONS_PATH,
+    PRECOMPUTED_ALTERNATIVES,
+    QUANTIZATION_PARAMS_PATH,
+    QUANTIZED_EMBEDDINGS_PATH,
+    QUANTIZED_RESCORE_FACTOR,
+    PRODUCT_CACHE_SIZE,
+    PRODUCT_CACHE_TTL_SECONDS,
+    PRODUCT_CACHE_VECTORS,
+    PRODUCTS_ALIAS,
+    RERANK_FIELDS_PATH,
+    RESCORE_EMBEDDINGS_PATH,
+    SEARCH_CACHE_DECIMALS,
+    SEARCH_CACHE_SIZE,
+    SEARCH_CACHE_TTL_SECONDS,
+    SEARCH_ENGINE,
+    TWO_PHASE_RETRIEVAL,
+)
+from services.alternatives import AlternativesTable
+from services.cache import TTLCache
+from services.circuit_breaker import CircuitBreaker, mark_stale, track_staleness
+from services.cold_store import ColdStore
+from services.collections import resolve_version
+from services.partitions import PartitionMap, category_keys, product_partition
+from services.local_search import ExactSearchEngine, HnswSearchEngine, QuantizedSearchEngine
+from services.point_ids import assign_point_ids, product_point_id
+from services.rerank_fields import RerankFieldStore
+from services.replicas import replica_addresses, replica_set
+from services.sharding import serving_client
+
+# Candidates fetched per wanted result when categories are checked after the
+# search rather than in the filter.
+CATEGORY_OVERLAP_OVERFETCH = 10
+
+# Status code the server answers a read of a missing point with (gRPC's numbering).
+CORTEX_NOT_FOUND = 5
 
 _DUMMY_PRODUCTS = [
     {
@@ -82,19 +144,186 @@ _DUMMY_PRODUCTS = [
 
 
 class ActianClient:
-    def __init__(self, address: str):
-        self._address = address
-        self._client: CortexClient | None = None
-
-    def connect(self):
-        self._client = CortexClient(self._address)
-        self._client.connect()
-        version, uptime = self._client.health_check()
-        print(f"Actian VectorDB: {version}, uptime={uptime}s")
-
-    def ensure_collection(self):
-        self._client.get_or_create_collection(
-            name="products",
+    """Async access to the products collection.
+
+    Built on the SDK's AsyncCortexClient so every vector call is awaited on the
+    event loop instead of blocking it for a full gRPC round trip. Calls go to
+    whichever versioned collection PRODUCTS_ALIAS points at, so a reindex
+    swaps in underneath without a restart. With several addresses the
+    collection is sharded across them (see services/sharding.py), and an
+    address listing replicas is load balanced across them (services/replicas.py).
+    """
+
+    def __init__(
+        self,
+        addresses: list[str],
+        pool_size: int = ACTIAN_POOL_SIZE,
+        keepalive_ms: int = ACTIAN_KEEPALIVE_MS,
+        keepalive_timeout_ms: int = ACTIAN_KEEPALIVE_TIMEOUT_MS,
+        timeout: float | None = ACTIAN_TIMEOUT_SECONDS,
+    ):
+        self._addresses = list(addresses)
+        self._pool_size = pool_size
+        self._keepalive_ms = keepalive_ms
+        self._keepalive_timeout_ms = keepalive_timeout_ms
+        self._timeout = timeout
+        self._client: AsyncCortexClient | None = None
+        self._collection = PRODUCTS_ALIAS
+        # Pointer generation the local data was loaded for; None until the first resolve.
+        self._generation: int | None = None
+        self._collection_resolved_at = float("-inf")
+        self._product_cache = TTLCache(PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL_SECONDS)
+        self._search_cache = TTLCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL_SECONDS)
+        # collection -> whether its payloads carry category_keys (see _has_category_keys).
+        self._category_keys_by_collection: dict[str, bool] = {}
+        # Part of every search cache key; bumped when this process writes points.
+        self._collection_version = 0
+        self._breaker = CircuitBreaker(
+            ACTIAN_LATENCY_BUDGET_MS,
+            failure_threshold=ACTIAN_BREAKER_FAILURES,
+            open_seconds=ACTIAN_BREAKER_OPEN_SECONDS,
+            answered_errors=(CortexError,),
+        )
+        self._rerank_fields = RerankFieldStore()
+        self._cold_store = ColdStore()
+        self._partitions = PartitionMap()
+        self._alternatives = AlternativesTable()
+        self._local_engine: ExactSearchEngine | HnswSearchEngine | None = None
+        self._reload_lock = asyncio.Lock()
+
+    def _read_local_data(self) -> dict:
+        # Blocking file reads; every sidecar goes into a new object so the
+        # ones serving requests are never half-updated.
+        data = {
+            "rerank_fields": RerankFieldStore(),
+            "cold_store": ColdStore(),
+            "partitions": PartitionMap(),
+            "alternatives": AlternativesTable(),
+            "local_engine": None,
+        }
+        rerank_fields = data["rerank_fields"]
+        if rerank_fields.load(RERANK_FIELDS_PATH) and TWO_PHASE_RETRIEVAL:
+            print(f"Two-phase retrieval enabled ({len(rerank_fields)} rerank rows)")
+        if data["cold_store"].open(COLD_STORE_PATH):
+            print(f"Cold payload store: {COLD_STORE_PATH}")
+        if PARTITION_SEARCH and data["partitions"].load(PARTITIONS_PATH):
+            print(f"Category partitions: {len(data['partitions'])}")
+        if PRECOMPUTED_ALTERNATIVES and data["alternatives"].load(ALTERNATIVES_PATH):
+            print(f"Precomputed alternatives for {len(data['alternatives'])} products")
+        if SEARCH_ENGINE != "actian" or LOCAL_SEARCH_FALLBACK:
+            if SEARCH_ENGINE == "hnsw":
+                engine = HnswSearchEngine(EMBEDDING_DIM, ef_search=HNSW_EF_SEARCH)
+                loaded = engine.load(HNSW_INDEX_PATH, EMBEDDING_INDEX_PATH, rerank_fields)
+            elif SEARCH_ENGINE == "int8":
+                engine = QuantizedSearchEngine(rescore_factor=QUANTIZED_RESCORE_FACTOR)
+                loaded = engine.load(
+                    QUANTIZED_EMBEDDINGS_PATH,
+                    QUANTIZATION_PARAMS_PATH,
+                    RESCORE_EMBEDDINGS_PATH,
+                    EMBEDDING_INDEX_PATH,
+                    rerank_fields,
+                )
+            else:
+                engine = ExactSearchEngine()
+                loaded = engine.load(EMBEDDINGS_PATH, EMBEDDING_INDEX_PATH, rerank_fields)
+            if loaded:
+                data["local_engine"] = engine
+                role = "primary" if SEARCH_ENGINE != "actian" else "fallback"
+                print(f"Local {engine.name} search engine loaded ({len(engine)} vectors, {role})")
+            elif SEARCH_ENGINE != "actian":
+                print(f"Warning: SEARCH_ENGINE={SEARCH_ENGINE} but local index files are missing; using Actian")
+        return data
+
+    def _use_local_data(self, data: dict):
+        previous_cold_store = self._cold_store
+        self._rerank_fields = data["rerank_fields"]
+        self._cold_store = data["cold_store"]
+        self._partitions = data["partitions"]
+        self._alternatives = data["alternatives"]
+        self._local_engine = data["local_engine"]
+        # Cold store reads run on the event loop, same as this swap, so none
+        # is still using the old handle.
+        previous_cold_store.close()
+
+    def load_local_data(self):
+        # Sidecar files written at ingest. Loaded before connecting so the local
+        # engine can still serve searches if Actian turns out to be unreachable.
+        self._use_local_data(self._read_local_data())
+
+    async def _switch_collection(self, name: str, generation: int):
+        # A reindex rewrites the sidecars (and refits the PCA projection) before
+        # moving the alias, and an in-place update rewrites them before bumping
+        # the generation, so the files on disk now describe what the alias
+        # points at. Load them off the event loop and switch everything over
+        # together.
+        from services.embeddings import reload_projection
+
+        async with self._reload_lock:
+            data = await asyncio.to_thread(self._read_local_data)
+            if name != self._collection:
+                print(f"[actian] '{PRODUCTS_ALIAS}' now points at '{name}' (was '{self._collection}'); reloaded local data")
+            else:
+                print(f"[actian] '{name}' was updated in place (generation {generation}); reloaded local data")
+            self._use_local_data(data)
+            reload_projection()
+            self._collection = name
+            self._generation = generation
+            self._product_cache.clear()
+            self.bump_collection_version()
+
+    def _node_client(self, address: str) -> AsyncCortexClient:
+        client = AsyncCortexClient(
+            address,
+            pool_size=self._pool_size,
+            # The API never uses the SDK's buffered upsert() path.
+            enable_smart_batching=False,
+            timeout=self._timeout,
+        )
+        # AsyncCortexClient only exposes pool_size; keepalive lives on the pool config.
+        client._pool_config = PoolConfig(
+            pool_size=self._pool_size,
+            keepalive_time_ms=self._keepalive_ms,
+            keepalive_timeout_ms=self._keepalive_timeout_ms,
+        )
+        return client
+
+    async def connect(self):
+        self.load_local_data()
+        shards = [
+            replica_set({address: self._node_client(address) for address in replica_addresses(spec)})
+            for spec in self._addresses
+        ]
+        client = serving_client(shards)
+        await client.connect()
+        self._client = client
+        version, uptime = await self._client.health_check()
+        print(f"Actian VectorDB: {version}, uptime={uptime}s, pool_size={self._pool_size}")
+        print(f"Collection: '{PRODUCTS_ALIAS}' -> '{await self.collection()}'")
+
+    async def collection(self) -> str:
+        """Collection PRODUCTS_ALIAS points at, re-resolved every COLLECTION_REFRESH_SECONDS."""
+        now = time.monotonic()
+        if now - self._collection_resolved_at >= COLLECTION_REFRESH_SECONDS:
+            # Claim the refresh before awaiting so concurrent requests don't all resolve.
+            self._collection_resolved_at = now
+            try:
+                name, generation = await self._breaker.call(
+                    "get", lambda: resolve_version(self._client, PRODUCTS_ALIAS)
+                )
+            except Exception as e:
+                print(f"[actian] could not resolve '{PRODUCTS_ALIAS}' ({e}); staying on '{self._collection}'")
+            else:
+                if self._generation is None:
+                    # First resolve: the data loaded at startup is already this collection's.
+                    self._collection = name
+                    self._generation = generation
+                elif name != self._collection or generation != self._generation:
+                    await self._switch_collection(name, generation)
+        return self._collection
+
+    async def ensure_collection(self):
+        await self._client.get_or_create_collection(
+            name=await self.collection(),
             dimension=EMBEDDING_DIM,
             distance_metric=DistanceMetric.COSINE,
         )
@@ -125,24 +354,234 @@ class ActianClient:
         score = getattr(record, "score", 0)
         return float(score) if score is not None else 0.0
 
-    def search_similar(self, embedding: list[float], top_k: int = 5) -> list[dict]:
-        results = self._client.search(
-            "products",
-            query=embedding,
-            top_k=top_k,
-            with_payload=True,
+    @property
+    def two_phase(self) -> bool:
+        return TWO_PHASE_RETRIEVAL and len(self._rerank_fields) > 0
+
+    async def _search(
+        self,
+        embedding: list[float],
+        top_k: int,
+        grades: list[str] | None = None,
+        partitions: list[str] | None = None,
+        categories: list[str] | None = None,
+    ) -> list[dict]:
+        if not self._search_cache.enabled:
+            return await self._search_uncached(embedding, top_k, grades, partitions, categories)
+        key = self._search_cache_key(embedding, top_k, grades, partitions, categories)
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            # Callers annotate results in place, so never hand out the cached dicts.
+            return [dict(r) for r in cached]
+        try:
+            with track_staleness() as degraded:
+                results = await self._search_uncached(embedding, top_k, grades, partitions, categories)
+        except Exception:
+            stale = self._search_cache.get_stale(key)
+            if stale is None:
+                raise
+            mark_stale()
+            return [dict(r) for r in stale]
+        if degraded[0]:
+            # Results missing a shard are served but not cached.
+            mark_stale()
+            return results
+        self._search_cache.set(key, [dict(r) for r in results])
+        return results
+
+    def _search_cache_key(
+        self,
+        embedding: list[float],
+        top_k: int,
+        grades: list[str] | None,
+        partitions: list[str] | None,
+        categories: list[str] | None,
+    ) -> str:
+        # Adding 0.0 folds -0.0 into 0.0 so both round to the same bytes.
+        rounded = np.round(np.asarray(embedding, dtype=np.float32), SEARCH_CACHE_DECIMALS) + 0.0
+        spec = json.dumps(
+            [top_k, sorted(grades or []), sorted(partitions or []), sorted(categories or []), self._collection_version]
+        )
+        return hashlib.blake2b(rounded.tobytes() + spec.encode("utf-8"), digest_size=16).hexdigest()
+
+    def bump_collection_version(self):
+        self._collection_version += 1
+        self._search_cache.clear()
+
+    async def _search_uncached(
+        self,
+        embedding: list[float],
+        top_k: int,
+        grades: list[str] | None,
+        partitions: list[str] | None,
+        categories: list[str] | None,
+    ) -> list[dict]:
+        engine = self._local_engine
+        if engine is not None and SEARCH_ENGINE != "actian":
+            return await self._search_local(engine, embedding, top_k, grades, partitions, categories)
+        try:
+            return await self._search_actian(embedding, top_k, grades, partitions, categories)
+        except Exception as e:
+            if engine is None:
+                raise
+            print(f"[actian] search failed ({e}); answering from local {engine.name} index")
+            return await self._search_local(engine, embedding, top_k, grades, partitions, categories)
+
+    async def _search_local(
+        self,
+        engine,
+        embedding: list[float],
+        top_k: int,
+        grades: list[str] | None,
+        partitions: list[str] | None,
+        categories: list[str] | None,
+    ) -> list[dict]:
+        hits = await asyncio.to_thread(engine.search, embedding, top_k, grades, partitions, categories)
+        results = []
+        for point_id, score in hits:
+            fields = self._rerank_fields.get(point_id)
+            if fields:
+                results.append({**fields, "similarity_score": score})
+        return results
+
+    async def _search_actian(
+        self,
+        embedding: list[float],
+        top_k: int,
+        grades: list[str] | None,
+        partitions: list[str] | None,
+        categories: list[str] | None,
+    ) -> list[dict]:
+        f = None
+        if grades or partitions or categories:
+            f = Filter()
+            if grades:
+                f.must(Field("ecoscore_grade").is_in(grades))
+            if partitions:
+                f.must(Field("partition").is_in(partitions))
+            if categories:
+                f.must(Field("category_keys").is_in(categories))
+        # In two-phase mode the search only returns IDs and scores; the fields
+        # needed to rerank come from the local sidecar and the full payload is
+        # fetched later by hydrate() for the handful of final results.
+        two_phase = self.two_phase
+        collection = await self.collection()
+        results = await self._breaker.call(
+            "search",
+            lambda: self._client.search(
+                collection,
+                query=embedding,
+                top_k=top_k,
+                filter=f,
+                with_payload=not two_phase,
+            ),
         )
+        if not two_phase:
+            return [
+                {**self._payload_from_record(r), "similarity_score": self._score_from_record(r)}
+                for r in results
+            ]
+
+        projected = {r.id: self._rerank_fields.get(r.id) for r in results}
+        missing = [point_id for point_id, fields in projected.items() if fields is None]
+        if missing:
+            # Points written after the sidecar was built (e.g. seeded dummies).
+            fetched = await self._breaker.call(
+                "get", lambda: self._client.get_many(collection, missing, with_vectors=False)
+            )
+            for point_id, (_, payload) in zip(missing, fetched):
+                projected[point_id] = payload
         return [
-            {**self._payload_from_record(r), "similarity_score": self._score_from_record(r)}
+            {**projected[r.id], "similarity_score": self._score_from_record(r)}
             for r in results
+            if projected[r.id]
         ]
 
-    def search_greener_alternatives(
+    async def hydrate(self, items: list[dict], force: bool = False) -> list[dict]:
+        """Replace projected or hot-only search hits with their full payloads."""
+        if not force and not (self.two_phase or self._local_engine is not None or self._cold_store.is_open):
+            return items
+
+        async def hydrate_one(item: dict) -> dict:
+            code = item.get("product_code")
+            try:
+                payload = await self.get_product(code) if code else None
+            except Exception as e:
+                # Actian unreachable: serve what the local sidecars know.
+                print(f"[actian] hydrate failed for {code}: {e}")
+                payload = self._cold_store.get(code)
+                if payload:
+                    mark_stale()
+            if not payload:
+                return item
+            return {**item, **payload, "similarity_score": item.get("similarity_score", 0)}
+
+        return list(await asyncio.gather(*(hydrate_one(item) for item in items)))
+
+    def precomputed_alternatives(self, product_code: str) -> list[dict] | None:
+        """Greener alternatives from the offline table, or None when the product isn't in it."""
+        hits = self._alternatives.get(product_point_id(product_code))
+        if hits is None:
+            return None
+        results = []
+        for point_id, score in hits:
+            fields = self._rerank_fields.get(point_id)
+            if fields:
+                results.append({**fields, "similarity_score": score})
+        return results
+
+    async def search_similar(self, embedding: list[float], top_k: int = 5) -> list[dict]:
+        return await self._search(embedding, top_k)
+
+    async def probe_search(self, embedding: list[float]) -> dict:
+        """One uncached search through the primary engine, for readiness checks.
+
+        Unlike search_similar() this never answers from the search cache or the
+        local fallback engine, so it fails while Actian is down or the circuit
+        breaker is open.
+        """
+        engine = self._local_engine
+        if engine is not None and SEARCH_ENGINE != "actian":
+            results = await self._search_local(engine, embedding, 1, None, None, None)
+            return {"results": len(results), "engine": engine.name}
+        with track_staleness() as degraded:
+            results = await self._search_actian(embedding, 1, None, None, None)
+        return {"results": len(results), "engine": "actian", "partial": degraded[0]}
+
+    async def search_similar_many(
+        self, embeddings: list[list[float]], top_k: int = 5
+    ) -> list[list[dict] | Exception]:
+        # The SDK has no multi-query Search RPC, so fan the queries out concurrently.
+        # Errors are returned in place so one failing query doesn't sink the others;
+        # a cancelled query is not an error to report, so cancellation propagates.
+        results = await asyncio.gather(
+            *(self.search_similar(emb, top_k=top_k) for emb in embeddings),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException) and not isinstance(result, Exception):
+                raise result
+        return results
+
+    def _partition_scopes(self, partition: str | None) -> list[list[str] | None]:
+        """Search scopes from narrowest to widest: the partition, plus its siblings, then everything."""
+        if not partition or partition not in self._partitions:
+            return [None]
+        siblings = self._partitions.siblings(partition)[:PARTITION_SIBLINGS]
+        scopes: list[list[str] | None] = [[partition]]
+        if siblings:
+            scopes.append([partition, *siblings])
+        scopes.append(None)
+        return scopes
+
+    async def search_greener_alternatives(
         self,
         embedding: list[float],
         category: str,
         min_ecoscore: str = "b",
         top_k: int = 5,
+        partition: str | None = None,
+        pad_off_category: bool = True,
     ) -> list[dict]:
         grade_set = []
         for g in ["a", "b", "c", "d", "e"]:
@@ -150,96 +589,213 @@ class ActianClient:
             if g == min_ecoscore:
                 break
 
-        f = Filter().must(Field("ecoscore_grade").is_in(grade_set))
-
-        # Fetch more candidates to filter by category in application logic
-        # since exact category matching via vector search isn't strict enough
-        search_limit = top_k * 10
-        
-        results = self._client.search(
-            "products",
-            query=embedding,
-            top_k=search_limit,
-            filter=f,
-            with_payload=True,
-        )
-        
-        candidates = [
-            {**self._payload_from_record(r), "similarity_score": self._score_from_record(r)}
-            for r in results
-        ]
-
-        # Filter strictly by category overlap
-        if not category:
-            return candidates[:top_k]
-
-        source_cats = set(c.strip().lower() for c in category.split(","))
-        filtered = []
-        
-        for cand in candidates:
-            cand_cats_str = cand.get("categories", "")
-            if not cand_cats_str:
-                continue
-            
-            cand_cats = set(c.strip().lower() for c in cand_cats_str.split(","))
-            
-            # Check for overlap
-            # If we have specific categories, ensure at least one matches
-            if not source_cats.isdisjoint(cand_cats):
-                filtered.append(cand)
-                
+        # Category overlap is part of the filter, so the DB returns only
+        # in-category greener items. Search the source product's partition
+        # first and widen only when it can't fill top_k.
+        source_cats = category_keys(category)
+        filtered: list[dict] = []
+        if source_cats and not await self._has_category_keys(embedding):
+            filtered = await self._greener_by_category_overlap(embedding, source_cats, top_k, grade_set, partition)
             if len(filtered) >= top_k:
-                break
-        
+                return filtered
+        else:
+            for partitions in self._partition_scopes(partition):
+                filtered = await self._search(
+                    embedding, top_k, grades=grade_set, partitions=partitions, categories=source_cats or None
+                )
+                if not source_cats or len(filtered) >= top_k:
+                    return filtered
+        if not pad_off_category:
+            return filtered
+
         # If filtering was too strict, fall back (or just return what we have)
-        if len(filtered) < top_k:
-            # Add remaining candidates that weren't included, up to top_k
-            seen_ids = set(c.get("product_code") for c in filtered)
-            for c in candidates:
-                if c.get("product_code") not in seen_ids:
-                    filtered.append(c)
-                    if len(filtered) >= top_k:
-                        break
+        # Add the nearest greener items from any category, up to top_k
+        seen_ids = set(c.get("product_code") for c in filtered)
+        for c in await self._search(embedding, top_k, grades=grade_set):
+            if c.get("product_code") not in seen_ids:
+                filtered.append(c)
+                if len(filtered) >= top_k:
+                    break
 
         return filtered
 
-    def get_product(self, product_code: str) -> dict | None:
-        f = Filter().must(Field("product_code").eq(product_code))
-        records = self._client.query("products", filter=f, limit=1)
-        if not records:
+    async def _has_category_keys(self, embedding: list[float]) -> bool:
+        """Whether the live collection can be filtered on category_keys.
+
+        Collections ingested before the field existed don't have it, and a
+        category_keys filter on them matches nothing. Checked once per
+        collection on a nearby product's full payload.
+        """
+        engine = self._local_engine
+        if engine is not None and SEARCH_ENGINE != "actian":
+            # The local engines filter on the sidecar's categories instead.
+            return True
+        collection = await self.collection()
+        known = self._category_keys_by_collection.get(collection)
+        if known is not None:
+            return known
+        with track_staleness() as degraded:
+            hits = await self._search(embedding, 1)
+            payload = await self.get_product(hits[0]["product_code"]) if hits else None
+        if payload is None or degraded[0]:
+            # Nothing to go on (or only local data); assume a current collection.
+            return True
+        known = "category_keys" in payload
+        self._category_keys_by_collection[collection] = known
+        if not known:
+            print(
+                f"[actian] '{collection}' has no category_keys payloads; filtering categories after search "
+                "until it is re-ingested (scripts/setup.py --full)"
+            )
+        return known
+
+    async def _greener_by_category_overlap(
+        self,
+        embedding: list[float],
+        source_cats: list[str],
+        top_k: int,
+        grades: list[str],
+        partition: str | None,
+    ) -> list[dict]:
+        # Fallback for collections without category_keys: over-fetch greener
+        # items and keep the ones sharing a category with the source product.
+        wanted = set(source_cats)
+        filtered: list[dict] = []
+        for partitions in self._partition_scopes(partition):
+            candidates = await self._search(
+                embedding, top_k * CATEGORY_OVERLAP_OVERFETCH, grades=grades, partitions=partitions
+            )
+            filtered = [c for c in candidates if wanted.intersection(category_keys(c.get("categories")))][:top_k]
+            if len(filtered) >= top_k:
+                break
+        return filtered
+
+    async def get_product(self, product_code: str) -> dict | None:
+        cached = self._product_cache.get(product_code)
+        if cached is not None:
+            return dict(cached["payload"])
+
+        try:
+            vector, payload = await self._get_point(product_code)
+        except Exception:
+            stale = self._product_cache.get_stale(product_code)
+            payload = dict(stale["payload"]) if stale is not None else self._local_product(product_code)
+            if payload is None:
+                raise
+            mark_stale()
+            return payload
+        if payload is None:
+            return None
+        # The read fetched the vector anyway; keeping it spares /recommend a second read.
+        self._cache_product(product_code, payload, vector)
+        return dict(payload)
+
+    async def get_product_with_vector(self, product_code: str) -> tuple[dict | None, list[float] | None]:
+        cached = self._product_cache.get(product_code)
+        if cached is not None and cached["vector"] is not None:
+            return dict(cached["payload"]), cached["vector"]
+
+        try:
+            vector, payload = await self._get_point(product_code)
+        except Exception:
+            stale = self._product_cache.get_stale(product_code)
+            if stale is None or stale["vector"] is None:
+                raise
+            mark_stale()
+            return dict(stale["payload"]), stale["vector"]
+        if payload is None:
+            return None, None
+        self._cache_product(product_code, payload, vector)
+        return dict(payload), vector
+
+    def _local_product(self, product_code: str) -> dict | None:
+        """Best-effort product from the local sidecars, for when Actian can't be reached."""
+        fields = self._rerank_fields.get(product_point_id(product_code))
+        if not fields:
             return None
-        return self._payload_from_record(records[0])
+        return {**self._cold_store.get(product_code), **fields}
 
-    def get_product_with_vector(self, product_code: str) -> tuple[dict | None, list[float] | None]:
-        f = Filter().must(Field("product_code").eq(product_code))
-        records = self._client.query("products", filter=f, limit=1, with_vectors=True)
-        if not records:
+    async def _get_point(self, product_code: str) -> tuple[list[float] | None, dict | None]:
+        # Point IDs are derived from product_code, so this is a primary-key read.
+        collection = await self.collection()
+        try:
+            vector, payload = await self._breaker.call(
+                "get", lambda: self._client.get(collection, product_point_id(product_code))
+            )
+        except CortexError as e:
+            # Only "no such point" means the product is unknown; any other
+            # rejection is a failed read and goes to the caller's fallback.
+            if e.code != CORTEX_NOT_FOUND and "not found" not in e.message.lower():
+                raise
+            return None, None
+        if not payload or payload.get("product_code") != product_code:
             return None, None
-        record = records[0]
-        return self._payload_from_record(record), self._vector_from_record(record)
+        # Actian only holds the hot fields; the rest comes from the local cold store.
+        return vector or None, {**self._cold_store.get(product_code), **payload}
+
+    def _cache_product(self, product_code: str, payload: dict, vector: list[float] | None):
+        if not PRODUCT_CACHE_VECTORS:
+            vector = None
+        self._product_cache.set(product_code, {"payload": payload, "vector": vector})
+
+    def invalidate_products(self, product_codes: list[str]):
+        for code in product_codes:
+            self._product_cache.invalidate(code)
 
-    def batch_upsert(self, ids: list[int], vectors: list[list[float]], payloads: list[dict]):
-        self._client.batch_upsert("products", ids=ids, vectors=vectors, payloads=payloads)
+    def breaker_stats(self) -> dict:
+        return self._breaker.stats()
 
-    def seed_dummy_products_if_empty(self) -> bool:
-        if self.count() > 0:
+    def cluster_stats(self) -> dict:
+        stats = getattr(self._client, "stats", None)
+        return stats() if stats else {"shards": len(self._addresses), "partial_searches": 0}
+
+    def cache_stats(self) -> dict:
+        return {
+            "product_cache": self._product_cache.stats(),
+            "search_cache": {
+                **self._search_cache.stats(),
+                "collection": self._collection,
+                "collection_version": self._collection_version,
+            },
+        }
+
+    async def batch_upsert(self, ids: list[int], vectors: list[list[float]], payloads: list[dict]):
+        collection = await self.collection()
+        await self._breaker.call(
+            "write", lambda: self._client.batch_upsert(collection, ids=ids, vectors=vectors, payloads=payloads)
+        )
+        self.invalidate_products([p.get("product_code") for p in payloads if p.get("product_code")])
+        self.bump_collection_version()
+
+    async def seed_dummy_products_if_empty(self) -> bool:
+        if await self.count() > 0:
             return False
 
         from services.embeddings import embed_texts_batch
 
         texts = [p["product_name"] for p in _DUMMY_PRODUCTS]
-        vectors = embed_texts_batch(texts)
-        ids = list(range(len(_DUMMY_PRODUCTS)))
-        self.batch_upsert(ids=ids, vectors=vectors, payloads=_DUMMY_PRODUCTS)
+        vectors = await asyncio.to_thread(embed_texts_batch, texts)
+        ids = assign_point_ids([p["product_code"] for p in _DUMMY_PRODUCTS])
+        payloads = [
+            {
+                **p,
+                "partition": product_partition(p["categories_tags"]),
+                "category_keys": category_keys(p["categories"]),
+            }
+            for p in _DUMMY_PRODUCTS
+        ]
+        await self.batch_upsert(ids=ids, vectors=vectors, payloads=payloads)
         return True
 
-    def count(self) -> int:
-        return self._client.count("products")
+    async def count(self) -> int:
+        collection = await self.collection()
+        return await self._breaker.call("count", lambda: self._client.count(collection))
 
-    def close(self):
+    async def close(self):
+        self._cold_store.close()
         if self._client:
-            self._client.close()
+            await self._client.close()
             self._client = None
 
 
-actian_client = ActianClient(ACTIAN_ADDRESS)
+actian_client = ActianClient(ACTIAN_SHARDS)
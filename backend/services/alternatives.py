@@ -0,0 +1,127 @@
+import os
+
+import numpy as np
+
+# Post-filtering rules shared by /api/recommend and the offline alternatives
+# table (scripts/precompute_alternatives.py), so both give the same answer.
+
+
+def normalize(value: str | None) -> str:
+    return (value or "").strip().casefold()
+
+
+def primary_brand(value: str | None) -> str:
+    normalized = normalize(value)
+    if not normalized:
+        return ""
+    return normalized.split(",")[0].strip()
+
+
+def dedupe_alternatives(items: list[dict]) -> list[dict]:
+    unique: list[dict] = []
+    seen: set[tuple[str, str] | tuple[str, str, str]] = set()
+
+    for item in items:
+        name = normalize(item.get("product_name"))
+        brand = normalize(item.get("brands"))
+        code = normalize(item.get("product_code"))
+
+        # Prefer product identity by name+brand. Fall back to code only when needed.
+        key: tuple[str, str] | tuple[str, str, str]
+        if name:
+            key = (name, brand)
+        elif code:
+            key = ("code", code, "")
+        else:
+            continue
+
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+
+    return unique
+
+
+def diversify_by_brand(items: list[dict]) -> list[dict]:
+    unique: list[dict] = []
+    seen_brands: set[str] = set()
+
+    for item in items:
+        brand = primary_brand(item.get("brands"))
+        if brand and brand in seen_brands:
+            continue
+        if brand:
+            seen_brands.add(brand)
+        unique.append(item)
+
+    return unique
+
+
+def pick_alternatives(
+    source_code: str,
+    source_cats: set[str],
+    candidates: list[dict],
+    candidate_cats: list[frozenset[str]],
+    top_n: int = 5,
+) -> list[dict]:
+    """Apply recommend()'s rules to greener candidates ordered by similarity.
+
+    In-category candidates come first, padded with off-category ones as the
+    live search does when the category runs dry; then the source product is
+    dropped and the rest deduped and diversified by brand.
+    """
+    if source_cats:
+        in_category = [c for c, cats in zip(candidates, candidate_cats) if not source_cats.isdisjoint(cats)]
+        off_category = [c for c, cats in zip(candidates, candidate_cats) if source_cats.isdisjoint(cats)]
+        candidates = in_category + off_category
+    alternatives = [c for c in candidates if c.get("product_code") != source_code]
+    alternatives = dedupe_alternatives(alternatives)
+    return diversify_by_brand(alternatives)[:top_n]
+
+
+def write_alternatives_table(path: str, source_ids: np.ndarray, alternative_ids: np.ndarray, scores: np.ndarray):
+    """Save the point_id -> top-N alternatives table; unused slots hold -1."""
+    order = np.argsort(source_ids)
+    tmp_path = f"{path}.tmp.npz"
+    np.savez(
+        tmp_path,
+        source_ids=source_ids[order],
+        alternative_ids=alternative_ids[order],
+        scores=scores[order].astype(np.float16),
+    )
+    os.replace(tmp_path, path)
+
+
+class AlternativesTable:
+    """Read-only lookup of precomputed greener alternatives by source point ID."""
+
+    def __init__(self):
+        self._source_ids: np.ndarray | None = None
+        self._alternative_ids: np.ndarray | None = None
+        self._scores: np.ndarray | None = None
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as data:
+            self._source_ids = data["source_ids"]
+            self._alternative_ids = data["alternative_ids"]
+            self._scores = data["scores"]
+        return True
+
+    def __len__(self) -> int:
+        return 0 if self._source_ids is None else len(self._source_ids)
+
+    def get(self, point_id: int) -> list[tuple[int, float]] | None:
+        """(point_id, score) alternatives, or None when the product isn't in the table."""
+        if not len(self):
+            return None
+        i = int(np.searchsorted(self._source_ids, point_id))
+        if i == len(self._source_ids) or self._source_ids[i] != point_id:
+            return None
+        return [
+            (int(pid), float(score))
+            for pid, score in zip(self._alternative_ids[i], self._scores[i])
+            if pid >= 0
+        ]
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+
+from cortex import AsyncCortexClient, CortexError
+from cortex.batcher.smart_batcher import BatcherConfig, BatchItem, SmartBatcher
+from config import (
+    INGEST_BATCH_BYTES,
+    INGEST_BATCH_MAX_POINTS,
+    INGEST_CHANNELS,
+    INGEST_MAX_RETRIES,
+)
+from services.replicas import node_client
+from services.sharding import group_by_shard
+
+
+class AsyncIngester:
+    """Concurrent bulk upserts into one collection.
+
+    Points go through the SDK's SmartBatcher, which cuts batches by estimated
+    bytes (or INGEST_BATCH_MAX_POINTS, or a short timeout). The batcher awaits
+    its flush callback under a lock, so the callback only queues the batch;
+    one sender per gRPC channel drains the queue, keeping `channels` batches in
+    flight. The bounded queue pushes back on add_many() when senders fall behind.
+
+    A batch that fails in transit is retried on its own with backoff; one the
+    server rejects is split in half until the bad points are isolated. Points
+    that still fail are counted rather than aborting the whole ingest.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        collection: str,
+        channels: int = INGEST_CHANNELS,
+        batch_bytes: int = INGEST_BATCH_BYTES,
+        batch_max_points: int = INGEST_BATCH_MAX_POINTS,
+        max_retries: int = INGEST_MAX_RETRIES,
+        timeout: float | None = 60.0,
+        report_every: int = 10_000,
+    ):
+        self._address = address
+        self._collection = collection
+        self._channels = max(1, channels)
+        self._max_retries = max_retries
+        self._timeout = timeout
+        self._report_every = report_every
+        self._batcher = SmartBatcher(
+            self._enqueue,
+            BatcherConfig(size_limit=batch_max_points, byte_limit=batch_bytes, time_limit_ms=200),
+        )
+        self._queue: asyncio.Queue | None = None
+        self._clients: list[AsyncCortexClient] = []
+        self._senders: list[asyncio.Task] = []
+        self._started_at = 0.0
+        self._points = 0
+        self._batches = 0
+        self._retries = 0
+        self._failed: list[int] = []
+        self._last_report = 0
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self._channels * 2)
+        for _ in range(self._channels):
+            client = node_client(self._address, pool_size=1, enable_smart_batching=False, timeout=self._timeout)
+            await client.connect()
+            self._clients.append(client)
+        self._senders = [asyncio.create_task(self._sender(client)) for client in self._clients]
+        await self._batcher.start()
+        self._started_at = time.perf_counter()
+
+    async def add_many(self, ids: list[int], vectors: np.ndarray | list[list[float]], payloads: list[dict]):
+        # One bulk conversion instead of a .tolist() per row.
+        if isinstance(vectors, np.ndarray):
+            vectors = vectors.tolist()
+        for point_id, vector, payload in zip(ids, vectors, payloads):
+            await self._batcher.add(self._collection, point_id, vector, payload)
+
+    async def close(self) -> dict:
+        """Flush everything still buffered, wait for the senders and return stats()."""
+        await self._batcher.stop(flush_remaining=True)
+        await self._queue.join()
+        for task in self._senders:
+            task.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        for client in self._clients:
+            await client.close()
+        return self.stats()
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        return {
+            "points": self._points,
+            "batches": self._batches,
+            "retries": self._retries,
+            "failed": len(self._failed),
+            "failed_ids": list(self._failed),
+            "seconds": round(elapsed, 2),
+            "points_per_sec": round(self._points / elapsed, 1) if elapsed else 0.0,
+        }
+
+    async def _enqueue(self, collection: str, items: list[BatchItem]):
+        await self._queue.put(items)
+
+    async def _sender(self, client: AsyncCortexClient):
+        while True:
+            items = await self._queue.get()
+            try:
+                await self._send(
+                    client,
+                    [item.id for item in items],
+                    [item.vector for item in items],
+                    [item.payload for item in items],
+                )
+            finally:
+                self._queue.task_done()
+
+    async def _send(self, client: AsyncCortexClient, ids: list[int], vectors: list, payloads: list):
+        error = None
+        for attempt in range(self._max_retries + 1):
+            try:
+                await client.batch_upsert(self._collection, ids=ids, vectors=vectors, payloads=payloads)
+                error = None
+                break
+            except CortexError as e:
+                # The server answered and rejected the batch, so resending it whole
+                # won't help: bisect so one bad point doesn't sink the rest.
+                if len(ids) > 1:
+                    mid = len(ids) // 2
+                    await self._send(client, ids[:mid], vectors[:mid], payloads[:mid])
+                    await self._send(client, ids[mid:], vectors[mid:], payloads[mid:])
+                    return
+                error = e
+                break
+            except Exception as e:
+                error = e
+                if attempt < self._max_retries:
+                    self._retries += 1
+                    await asyncio.sleep(min(0.2 * 2 ** attempt, 5.0))
+        if error is not None:
+            print(f"  Batch of {len(ids)} points failed: {error}")
+            self._failed.extend(ids)
+            return
+
+        self._batches += 1
+        self._points += len(ids)
+        if self._points - self._last_report >= self._report_every:
+            self._last_report = self._points
+            stats = self.stats()
+            print(f"  Upserted {stats['points']} points ({stats['points_per_sec']:.0f} points/sec)")
+
+
+class ShardedIngester:
+    """One AsyncIngester per shard, with points routed by shard_of()."""
+
+    def __init__(self, addresses: list[str], collection: str, **kwargs):
+        self._ingesters = [AsyncIngester(address, collection, **kwargs) for address in addresses]
+
+    async def start(self):
+        await asyncio.gather(*(ingester.start() for ingester in self._ingesters))
+
+    async def add_many(self, ids: list[int], vectors: np.ndarray | list[list[float]], payloads: list[dict]):
+        for shard, positions in group_by_shard(ids, len(self._ingesters)).items():
+            if isinstance(vectors, np.ndarray):
+                shard_vectors = vectors[positions]
+            else:
+                shard_vectors = [vectors[p] for p in positions]
+            await self._ingesters[shard].add_many(
+                [ids[p] for p in positions], shard_vectors, [payloads[p] for p in positions]
+            )
+
+    async def close(self) -> dict:
+        await asyncio.gather(*(ingester.close() for ingester in self._ingesters))
+        return self.stats()
+
+    def stats(self) -> dict:
+        shards = [ingester.stats() for ingester in self._ingesters]
+        merged = {key: sum(s[key] for s in shards) for key in ("points", "batches", "retries", "failed")}
+        return {
+            **merged,
+            "failed_ids": [point_id for s in shards for point_id in s["failed_ids"]],
+            "seconds": max(s["seconds"] for s in shards),
+            "points_per_sec": round(sum(s["points_per_sec"] for s in shards), 1),
+        }
+
+
+class BackgroundIngester:
+    """Sync facade over AsyncIngester for the (synchronous) ingest scripts.
+
+    Runs the ingester on its own event loop thread, the same way the SDK's
+    CortexClient wraps AsyncCortexClient. add_many() blocks only while the
+    ingester's queue is full. Given several shard addresses it ingests into
+    all of them through a ShardedIngester.
+    """
+
+    def __init__(self, addresses: str | list[str], collection: str, **kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="ingest-loop", daemon=True)
+        self._thread.start()
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        if len(addresses) == 1:
+            self._ingester = AsyncIngester(addresses[0], collection, **kwargs)
+        else:
+            self._ingester = ShardedIngester(addresses, collection, **kwargs)
+        self._run(self._ingester.start())
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def add_many(self, ids: list[int], vectors: np.ndarray | list[list[float]], payloads: list[dict]):
+        self._run(self._ingester.add_many(ids, vectors, payloads))
+
+    def close(self) -> dict:
+        try:
+            return self._run(self._ingester.close())
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
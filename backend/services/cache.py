@@ -0,0 +1,74 @@
+import time
+from collections import OrderedDict
+from typing import Any
+
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a fixed TTL.
+
+    Expired entries stay in place until evicted or overwritten, so get_stale()
+    can still serve them while the backing store is unavailable. Only ever
+    touched from the event loop, so no locking is needed.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._max_size = max(0, max_size)
+        self._ttl = ttl_seconds
+        self._entries: OrderedDict[Any, tuple[float, Any]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._stale_hits = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_size > 0
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key)
+        if entry is None:
+            self._misses += 1
+            return default
+        stored_at, value = entry
+        if time.monotonic() - stored_at > self._ttl:
+            self._misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self._hits += 1
+        return value
+
+    def get_stale(self, key, default=None):
+        """Return the entry for key even if it has expired; doesn't count as a lookup."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        self._stale_hits += 1
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        if not self.enabled:
+            return
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, key) -> None:
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self._hits + self._misses
+        return {
+            "size": len(self._entries),
+            "max_size": self._max_size,
+            "ttl_seconds": self._ttl,
+            "hits": self._hits,
+            "misses": self._misses,
+            "evictions": self._evictions,
+            "stale_hits": self._stale_hits,
+            "hit_rate": round(self._hits / lookups, 4) if lookups else 0.0,
+        }
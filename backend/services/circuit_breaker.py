@@ -0,0 +1,120 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Actian while the circuit is open."""
+
+
+class CircuitBreaker:
+    """Fails Actian calls fast once they keep failing or running slow.
+
+    Each operation has a latency budget; a call that errors or exceeds it counts
+    as a failure. After failure_threshold consecutive failures the circuit opens
+    and calls raise CircuitOpenError immediately. After open_seconds one probe
+    call is let through (half-open): success closes the circuit, failure
+    re-opens it. Exceptions listed in answered_errors (e.g. a not-found status)
+    mean the server did respond and are passed through as successes.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        thresholds_ms: dict[str, float],
+        failure_threshold: int = 5,
+        open_seconds: float = 15.0,
+        answered_errors: tuple[type[Exception], ...] = (),
+    ):
+        self._answered_errors = answered_errors
+        self._thresholds = {op: ms / 1000 for op, ms in thresholds_ms.items()}
+        self._failure_threshold = max(1, failure_threshold)
+        self._open_seconds = open_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._rejected = 0
+        self._trips = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self._open_seconds:
+            return self.HALF_OPEN
+        return self._state
+
+    async def call(self, op: str, fn: Callable[[], Awaitable[T]]) -> T:
+        state = self.state
+        if state == self.OPEN or (state == self.HALF_OPEN and self._probing):
+            self._rejected += 1
+            raise CircuitOpenError(f"Actian circuit open; {op} not attempted")
+        probe = state == self.HALF_OPEN
+        if probe:
+            self._probing = True
+        try:
+            timeout = self._thresholds.get(op)
+            result = await (asyncio.wait_for(fn(), timeout) if timeout else fn())
+        except asyncio.CancelledError:
+            if probe:
+                self._probing = False
+            raise
+        except self._answered_errors:
+            self._on_success(probe)
+            raise
+        except Exception:
+            self._on_failure(probe)
+            raise
+        self._on_success(probe)
+        return result
+
+    def _on_success(self, probe: bool):
+        if probe or self._state != self.CLOSED:
+            print("[actian] circuit closed")
+        self._state = self.CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def _on_failure(self, probe: bool):
+        self._failures += 1
+        self._probing = False
+        if probe or (self._state == self.CLOSED and self._failures >= self._failure_threshold):
+            if self._state == self.CLOSED:
+                self._trips += 1
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+            print(f"[actian] circuit open for {self._open_seconds:.0f}s after {self._failures} failure(s)")
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self._trips,
+            "rejected": self._rejected,
+        }
+
+
+# Set per request by main.py; ActianClient flags it when it answers from stale data.
+_stale_flag: ContextVar[list[bool] | None] = ContextVar("stale_flag", default=None)
+
+
+@contextmanager
+def track_staleness():
+    flag = [False]
+    token = _stale_flag.set(flag)
+    try:
+        yield flag
+    finally:
+        _stale_flag.reset(token)
+
+
+def mark_stale():
+    flag = _stale_flag.get()
+    if flag is not None:
+        flag[0] = True
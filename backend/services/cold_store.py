@@ -0,0 +1,90 @@
+import json
+import os
+import sqlite3
+
+# Payload fields kept in Actian: everything search, filtering, reranking and
+# the result cards need. The rest (ingredients, nutriments, tag lists...) goes
+# to the local cold store and is merged back in for product lookups.
+HOT_FIELDS = frozenset({
+    "product_code",
+    "product_name",
+    "brands",
+    "categories",
+    "categories_tags",
+    "category_keys",
+    "labels_tags",
+    "ecoscore_grade",
+    "ecoscore_score",
+    "nutriscore_grade",
+    "nutriscore_score",
+    "image_url",
+    "partition",
+})
+
+# Let SQLite serve reads straight from a memory-mapped file.
+_MMAP_BYTES = 1 << 30
+
+
+def split_payload(payload: dict) -> tuple[dict, dict]:
+    hot = {k: v for k, v in payload.items() if k in HOT_FIELDS}
+    cold = {k: v for k, v in payload.items() if k not in HOT_FIELDS}
+    return hot, cold
+
+
+class ColdStoreWriter:
+    """Builds the cold store into a temp file and swaps it in on close()."""
+
+    def __init__(self, path: str):
+        self._path = path
+        self._tmp_path = f"{path}.tmp"
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+        self._conn = sqlite3.connect(self._tmp_path)
+        self._conn.execute("PRAGMA journal_mode=OFF")
+        self._conn.execute("PRAGMA synchronous=OFF")
+        self._conn.execute("CREATE TABLE products (product_code TEXT PRIMARY KEY, payload TEXT NOT NULL)")
+        self._count = 0
+
+    def add_many(self, rows: list[tuple[str, dict]]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO products (product_code, payload) VALUES (?, ?)",
+            [(code, json.dumps(cold, ensure_ascii=False)) for code, cold in rows],
+        )
+        self._count += len(rows)
+
+    def close(self) -> int:
+        self._conn.commit()
+        self._conn.close()
+        os.replace(self._tmp_path, self._path)
+        return self._count
+
+
+class ColdStore:
+    """Read-only product_code -> cold payload lookup."""
+
+    def __init__(self):
+        self._conn: sqlite3.Connection | None = None
+
+    def open(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._conn.execute(f"PRAGMA mmap_size={_MMAP_BYTES}")
+        return True
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    def get(self, product_code: str) -> dict:
+        if self._conn is None:
+            return {}
+        row = self._conn.execute(
+            "SELECT payload FROM products WHERE product_code = ?", (product_code,)
+        ).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
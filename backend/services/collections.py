@@ -0,0 +1,177 @@
+import hashlib
+import re
+import time
+
+from cortex import CortexError, DistanceMetric
+
+# Actian's SDK does not implement aliases yet (create_alias/alter_alias raise
+# NotImplementedError), so the alias -> collection mapping is also kept as a
+# one-point record in this collection, keyed by a hash of the alias name.
+# A single upsert repoints every reader at once, like an alias swap would.
+# Its generation goes up whenever the alias moves or the collection it points
+# at is updated in place, so readers know to reload their local files.
+POINTER_COLLECTION = "collection_aliases"
+_POINTER_VECTOR = [1.0]
+
+
+def versioned_name(alias: str, version: int) -> str:
+    return f"{alias}_v{version}"
+
+
+def collection_version(alias: str, name: str) -> int | None:
+    match = re.fullmatch(rf"{re.escape(alias)}_v(\d+)", name)
+    return int(match.group(1)) if match else None
+
+
+def pointer_id(alias: str) -> int:
+    digest = hashlib.blake2b(f"alias:{alias}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & ((1 << 63) - 1)
+
+
+def _target(alias: str, pointer: dict | None) -> str:
+    # No pointer yet: the alias name is itself the (pre-versioning) collection.
+    return (pointer or {}).get("collection") or alias
+
+
+async def resolve_version(client, alias: str) -> tuple[str, int]:
+    """Collection the alias currently points at and its generation, for an AsyncCortexClient."""
+    try:
+        _, pointer = await client.get(POINTER_COLLECTION, pointer_id(alias))
+    except CortexError:
+        pointer = None
+    generation = (pointer or {}).get("generation", 0)
+    try:
+        await client.describe_alias(alias)
+        return alias, generation  # a native alias; the server resolves it
+    except (NotImplementedError, CortexError):
+        return _target(alias, pointer), generation
+
+
+async def resolve_collection(client, alias: str) -> str:
+    """Collection the alias currently points at, for an AsyncCortexClient."""
+    return (await resolve_version(client, alias))[0]
+
+
+class CollectionAliases:
+    """Versioned collections behind an alias, for the ingest scripts' sync CortexClient.
+
+    The pointer record holds the current collection plus the previous ones,
+    newest first, so rollback and pruning don't depend on list_collections
+    (which the SDK does not implement).
+    """
+
+    def __init__(self, client, alias: str):
+        self._client = client
+        self.alias = alias
+
+    def _pointer(self) -> dict | None:
+        try:
+            _, pointer = self._client.get(POINTER_COLLECTION, pointer_id(self.alias))
+        except CortexError:
+            return None
+        return pointer or None
+
+    def resolve(self) -> str:
+        return _target(self.alias, self._pointer())
+
+    def _write_pointer(self, pointer: dict):
+        self._client.get_or_create_collection(
+            name=POINTER_COLLECTION, dimension=len(_POINTER_VECTOR), distance_metric=DistanceMetric.COSINE
+        )
+        self._client.upsert(POINTER_COLLECTION, pointer_id(self.alias), _POINTER_VECTOR, pointer)
+
+    def history(self) -> list[str]:
+        """Previous collections, newest first."""
+        return list((self._pointer() or {}).get("history", []))
+
+    def create_next(self, dimension: int) -> str:
+        """Create the next free {alias}_v{n} collection and return its name."""
+        pointer = self._pointer() or {}
+        known = [_target(self.alias, pointer), *pointer.get("history", [])]
+        versions = [v for v in (collection_version(self.alias, name) for name in known) if v is not None]
+        version = max(versions, default=0) + 1
+        while self._client.has_collection(versioned_name(self.alias, version)):
+            version += 1
+        name = versioned_name(self.alias, version)
+        self._client.create_collection(name=name, dimension=dimension, distance_metric=DistanceMetric.COSINE)
+        return name
+
+    def switch(self, collection: str) -> str:
+        """Point the alias at collection; returns the collection it pointed at before."""
+        pointer = self._pointer() or {}
+        previous = _target(self.alias, pointer)
+        if previous == collection:
+            return previous
+        try:
+            try:
+                self._client.alter_alias(collection, self.alias)
+            except CortexError:
+                self._client.create_alias(collection, self.alias)
+        except NotImplementedError:
+            pass
+        history = [name for name in [previous, *pointer.get("history", [])] if name != collection]
+        if not self._client.has_collection(previous):
+            history.remove(previous)
+        self._write_pointer(
+            {
+                "alias": self.alias,
+                "collection": collection,
+                "history": history,
+                "generation": pointer.get("generation", 0) + 1,
+                "switched_at": time.time(),
+            }
+        )
+        return previous
+
+    def touch(self) -> int:
+        """Record an in-place update of the live collection; returns the new generation.
+
+        Running API processes reload their local files when the generation
+        changes, as they do when the alias moves.
+        """
+        pointer = self._pointer() or {"alias": self.alias, "collection": self.resolve(), "history": []}
+        generation = pointer.get("generation", 0) + 1
+        self._write_pointer({**pointer, "generation": generation, "updated_at": time.time()})
+        return generation
+
+    def prune(self, keep: int) -> list[str]:
+        """Drop all but the newest `keep` previous collections; returns the dropped names."""
+        pointer = self._pointer()
+        if not pointer:
+            return []
+        history = pointer.get("history", [])
+        dropped = history[keep:]
+        for name in dropped:
+            if self._client.has_collection(name):
+                self._client.delete_collection(name)
+        if dropped:
+            self._write_pointer({**pointer, "history": history[:keep]})
+        return dropped
+
+
+def verify_collection(
+    client,
+    collection: str,
+    expected_count: int,
+    samples: list[tuple[int, list[float]]],
+    top_k: int = 10,
+    min_recall: float = 0.9,
+) -> list[str]:
+    """Problems that should stop a freshly built collection from going live.
+
+    Checks the point count and that sampled products come back when searching
+    with their own vectors.
+    """
+    problems = []
+    count = client.count(collection)
+    if count != expected_count:
+        problems.append(f"{collection} has {count} points, expected {expected_count}")
+    if samples:
+        found = 0
+        for point_id, vector in samples:
+            results = client.search(collection, query=vector, top_k=top_k, with_payload=False)
+            found += any(r.id == point_id for r in results)
+        recall = found / len(samples)
+        if recall < min_recall:
+            problems.append(f"{collection} returned {found}/{len(samples)} sample products for their own vectors")
+    return problems
@@ -1,7 +1,25 @@
+import threading
+
 from sentence_transformers import SentenceTransformer
-from config import EMBEDDING_MODEL_NAME
+from config import (
+    EMBEDDING_CACHE_SIZE,
+    EMBEDDING_CACHE_TTL_SECONDS,
+    EMBEDDING_MODEL_NAME,
+    EMBEDDING_REDUCED_DIM,
+    PCA_PROJECTION_PATH,
+)
+from services.cache import TTLCache
+from services.projection import PcaProjection
 
 _model: SentenceTransformer | None = None
+_projection: PcaProjection | None = None
+# Guesses and recommend source texts repeat across users. Callers may be on
+# worker threads, so the cache gets a lock.
+_cache = TTLCache(EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL_SECONDS)
+_cache_lock = threading.Lock()
+# Bumped by reload_projection(); vectors encoded under an older projection
+# are returned to their caller but not cached.
+_generation = 0
 
 
 def get_model() -> SentenceTransformer:
@@ -11,12 +29,61 @@ def get_model() -> SentenceTransformer:
     return _model
 
 
-def embed_text(text: str) -> list[float]:
-    model = get_model()
-    return model.encode(text, normalize_embeddings=True).tolist()
+def _load_projection() -> PcaProjection:
+    projection = PcaProjection.load(PCA_PROJECTION_PATH)
+    if projection.dim != EMBEDDING_REDUCED_DIM:
+        raise ValueError(
+            f"{PCA_PROJECTION_PATH} projects to {projection.dim} dims but EMBEDDING_REDUCED_DIM={EMBEDDING_REDUCED_DIM}"
+        )
+    return projection
 
 
-def embed_texts_batch(texts: list[str]) -> list[list[float]]:
+def get_projection() -> PcaProjection | None:
+    """PCA projection matching the stored vectors, or None when running at full dimension."""
+    global _projection
+    if _projection is None and EMBEDDING_REDUCED_DIM:
+        _projection = _load_projection()
+    return _projection
+
+
+def reload_projection():
+    """Re-read the projection after a reindex refit it, and drop query vectors made with the old one."""
+    global _projection, _generation
+    projection = _load_projection() if EMBEDDING_REDUCED_DIM else None
+    with _cache_lock:
+        _projection = projection
+        _generation += 1
+        _cache.clear()
+
+
+def _encode(texts: list[str]) -> list[tuple[float, ...]]:
     model = get_model()
     embeddings = model.encode(texts, normalize_embeddings=True, batch_size=256, show_progress_bar=False)
-    return embeddings.tolist()
+    projection = get_projection()
+    if projection is not None:
+        embeddings = projection.apply(embeddings)
+    return [tuple(e) for e in embeddings.tolist()]
+
+
+def embed_text(text: str) -> list[float]:
+    return embed_texts_batch([text])[0]
+
+
+def embed_texts_batch(texts: list[str]) -> list[list[float]]:
+    with _cache_lock:
+        found = {t: v for t in set(texts) if (v := _cache.get(t)) is not None}
+        generation = _generation
+    missing = [t for t in dict.fromkeys(texts) if t not in found]
+    if missing:
+        encoded = _encode(missing)
+        with _cache_lock:
+            if generation == _generation:
+                for text, embedding in zip(missing, encoded):
+                    _cache.set(text, embedding)
+        found.update(zip(missing, encoded))
+    return [list(found[t]) for t in texts]
+
+
+def cache_stats() -> dict:
+    with _cache_lock:
+        return _cache.stats()
@@ -0,0 +1,51 @@
+import hashlib
+import json
+import os
+
+
+def content_hash(value) -> str:
+    """Stable short hash of a JSON-serializable value (payload dict or embedding text)."""
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.blake2b(data.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class IngestManifest:
+    """What the last setup.py run put into the live collection.
+
+    Keyed by product_code: the hash of the hot payload upserted to Actian and
+    the hash of the text its vector was embedded from. Only valid for the
+    collection, model and dimension it was written against.
+    """
+
+    def __init__(self, collection: str, model: str, dim: int, products: dict[str, list[str]] | None = None):
+        self.collection = collection
+        self.model = model
+        self.dim = dim
+        self.products = products or {}
+
+    @classmethod
+    def load(cls, path: str) -> "IngestManifest | None":
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data["collection"], data["model"], data["dim"], data["products"])
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"collection": self.collection, "model": self.model, "dim": self.dim, "products": self.products}, f
+            )
+        os.replace(tmp_path, path)
+
+    def matches(self, model: str, dim: int) -> bool:
+        return (self.model, self.dim) == (model, dim)
+
+    def payload_hash(self, product_code: str) -> str | None:
+        entry = self.products.get(product_code)
+        return entry[0] if entry else None
+
+    def text_hash(self, product_code: str) -> str | None:
+        entry = self.products.get(product_code)
+        return entry[1] if entry else None
@@ -0,0 +1,295 @@
+import json
+import os
+
+import numpy as np
+
+from services.partitions import category_keys
+from services.point_ids import product_point_id
+from services.rerank_fields import RerankFieldStore
+
+# Single-valued payload fields the local engines can filter on, mirroring the
+# Actian filters ActianClient builds. Category keys are multi-valued and kept
+# as an inverted index instead.
+FILTER_FIELDS = ("ecoscore_grade", "partition")
+
+
+class RowFilters:
+    """Per-row filter values, turned into row masks for a grade/partition/category filter.
+
+    Single-valued fields are held as small integer codes; category keys as
+    key -> row-index lists. Masks are computed on first use and memoized, since
+    the API issues few distinct filters (grade sets x source partitions/categories).
+    """
+
+    def __init__(self, point_ids: np.ndarray, rerank_fields: RerankFieldStore, max_cached: int = 1024):
+        self._codes: dict[str, np.ndarray] = {}
+        self._vocab: dict[str, dict[str, int]] = {}
+        rows = [rerank_fields.get(int(pid)) or {} for pid in point_ids]
+        for field in FILTER_FIELDS:
+            vocab: dict[str, int] = {}
+            self._codes[field] = np.array(
+                [vocab.setdefault(row.get(field) or "", len(vocab)) for row in rows], dtype=np.int32
+            )
+            self._vocab[field] = vocab
+        category_rows: dict[str, list[int]] = {}
+        for i, row in enumerate(rows):
+            for key in category_keys(row.get("categories")):
+                category_rows.setdefault(key, []).append(i)
+        self._category_rows = {k: np.array(v, dtype=np.int32) for k, v in category_rows.items()}
+        self._rows = len(rows)
+        self._max_cached = max_cached
+        self._masks: dict[tuple, np.ndarray] = {}
+
+    @staticmethod
+    def key(grades: list[str] | None, partitions: list[str] | None, categories: list[str] | None) -> tuple | None:
+        if not grades and not partitions and not categories:
+            return None
+        return (frozenset(grades or ()), frozenset(partitions or ()), frozenset(categories or ()))
+
+    def mask(self, grades: list[str] | None, partitions: list[str] | None,
+             categories: list[str] | None = None) -> np.ndarray | None:
+        key = self.key(grades, partitions, categories)
+        if key is None:
+            return None
+        mask = self._masks.get(key)
+        if mask is None:
+            mask = np.ones(self._rows, dtype=bool)
+            for field, values in zip(FILTER_FIELDS, key):
+                if values:
+                    wanted = [self._vocab[field][v] for v in values if v in self._vocab[field]]
+                    mask &= np.isin(self._codes[field], wanted)
+            if key[2]:
+                in_category = np.zeros(self._rows, dtype=bool)
+                for k in key[2]:
+                    if k in self._category_rows:
+                        in_category[self._category_rows[k]] = True
+                mask &= in_category
+            if len(self._masks) >= self._max_cached:
+                self._masks.clear()
+            self._masks[key] = mask
+        return mask
+
+
+def _load_index(index_path: str, rerank_fields: RerankFieldStore) -> tuple[np.ndarray, RowFilters]:
+    """Point IDs for the rows of embedding_index.json, plus their filter values."""
+    with open(index_path, "r", encoding="utf-8") as f:
+        codes = json.load(f)
+    point_ids = np.array([product_point_id(code) for code in codes], dtype=np.int64)
+    return point_ids, RowFilters(point_ids, rerank_fields)
+
+
+class ExactSearchEngine:
+    """Exact cosine search over the memory-mapped catalog embeddings.
+
+    Rows of data/embeddings.npy line up with the codes in
+    data/embedding_index.json. Vectors are L2-normalized at encode time, so a
+    dot product is the cosine similarity Actian would report.
+    """
+
+    name = "exact"
+
+    def __init__(self, block_rows: int = 32768):
+        self._block_rows = block_rows
+        self._vectors: np.ndarray | None = None
+        self._point_ids: np.ndarray | None = None
+        self._filters: RowFilters | None = None
+
+    def load(self, embeddings_path: str, index_path: str, rerank_fields: RerankFieldStore) -> bool:
+        if not (os.path.exists(embeddings_path) and os.path.exists(index_path)) or not len(rerank_fields):
+            return False
+        vectors = np.load(embeddings_path, mmap_mode="r")
+        point_ids, filters = _load_index(index_path, rerank_fields)
+        if len(point_ids) != len(vectors):
+            raise ValueError(f"{index_path} has {len(point_ids)} codes but {embeddings_path} has {len(vectors)} rows")
+
+        self._vectors = vectors
+        self._point_ids = point_ids
+        self._filters = filters
+        return True
+
+    def __len__(self) -> int:
+        return 0 if self._vectors is None else len(self._vectors)
+
+    @property
+    def point_ids(self) -> np.ndarray:
+        return self._point_ids
+
+    def search(self, query: list[float], top_k: int, grades: list[str] | None = None,
+               partitions: list[str] | None = None, categories: list[str] | None = None) -> list[tuple[int, float]]:
+        """Top-k (point_id, score) pairs, optionally restricted by grade, partition and category."""
+        q = np.asarray(query, dtype=np.float32)
+        rows, scores = self._top_rows(q, top_k, self._filters.mask(grades, partitions, categories))
+        return [(int(self._point_ids[r]), float(score)) for r, score in zip(rows, scores)]
+
+    def _score_block(self, start: int, stop: int, q: np.ndarray) -> np.ndarray:
+        return np.asarray(self._vectors[start:stop], dtype=np.float32) @ q
+
+    def _top_rows(self, q: np.ndarray, top_k: int, mask: np.ndarray | None) -> tuple[np.ndarray, np.ndarray]:
+        """Best-first (rows, scores) over all blocks; masked-out rows never appear."""
+        top_rows: list[np.ndarray] = []
+        top_scores: list[np.ndarray] = []
+
+        for start in range(0, len(self), self._block_rows):
+            stop = min(start + self._block_rows, len(self))
+            scores = self._score_block(start, stop, q)
+            if mask is not None:
+                scores[~mask[start:stop]] = -np.inf
+            k = min(top_k, len(scores))
+            idx = np.argpartition(scores, len(scores) - k)[-k:]
+            top_rows.append(idx + start)
+            top_scores.append(scores[idx])
+
+        if not top_rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        rows = np.concatenate(top_rows)
+        scores = np.concatenate(top_scores)
+        order = np.argsort(-scores)[:top_k]
+        order = order[np.isfinite(scores[order])]
+        return rows[order], scores[order]
+
+
+class QuantizedSearchEngine(ExactSearchEngine):
+    """Exact engine variant that scans int8 codes and rescores with full precision.
+
+    scripts/quantize_embeddings.py stores per-dimension int8 codes with
+    x ~= code * scale + offset. The codes are held in RAM (a quarter of the
+    float32 matrix); the top candidates from the int8 scan are rescored
+    against the memory-mapped float16/float32 originals.
+    """
+
+    name = "int8"
+
+    def __init__(self, rescore_factor: int = 4, block_rows: int = 32768):
+        super().__init__(block_rows=block_rows)
+        self._rescore_factor = rescore_factor
+        self._scale: np.ndarray | None = None
+        self._offset: np.ndarray | None = None
+        self._originals: np.ndarray | None = None
+
+    def load(self, codes_path: str, params_path: str, originals_path: str, index_path: str,
+             rerank_fields: RerankFieldStore) -> bool:
+        paths = (codes_path, params_path, originals_path, index_path)
+        if not all(os.path.exists(p) for p in paths) or not len(rerank_fields):
+            return False
+        codes = np.load(codes_path)
+        with np.load(params_path) as params:
+            scale = params["scale"].astype(np.float32)
+            offset = params["offset"].astype(np.float32)
+        originals = np.load(originals_path, mmap_mode="r")
+        point_ids, filters = _load_index(index_path, rerank_fields)
+        if not len(point_ids) == len(codes) == len(originals):
+            raise ValueError(
+                f"{index_path} has {len(point_ids)} codes, {codes_path} {len(codes)} rows, "
+                f"{originals_path} {len(originals)} rows"
+            )
+
+        self._vectors = codes
+        self._scale = scale
+        self._offset = offset
+        self._originals = originals
+        self._point_ids = point_ids
+        self._filters = filters
+        return True
+
+    def _score_block(self, start: int, stop: int, q: np.ndarray) -> np.ndarray:
+        # q . (code * scale + offset) == code . (q * scale) + q . offset
+        return self._vectors[start:stop].astype(np.float32) @ (q * self._scale) + float(q @ self._offset)
+
+    def search(self, query: list[float], top_k: int, grades: list[str] | None = None,
+               partitions: list[str] | None = None, categories: list[str] | None = None) -> list[tuple[int, float]]:
+        q = np.asarray(query, dtype=np.float32)
+        rows, _ = self._top_rows(q, top_k * self._rescore_factor, self._filters.mask(grades, partitions, categories))
+        if not len(rows):
+            return []
+        rows = np.sort(rows)
+        scores = np.asarray(self._originals[rows], dtype=np.float32) @ q
+        order = np.argsort(-scores)[:top_k]
+        return [(int(self._point_ids[rows[i]]), float(scores[i])) for i in order]
+
+
+class HnswSearchEngine:
+    """Approximate cosine search over an hnswlib index built by scripts/build_hnsw_index.py.
+
+    Index labels are product point IDs. Grade/partition filters are passed to
+    hnswlib as allowed-ID sets, derived from the same row masks as the exact engine.
+    hnswlib reads the whole index into memory; it cannot be memory-mapped.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, dim: int, ef_search: int = 64):
+        self._dim = dim
+        self._ef_search = ef_search
+        self._index = None
+        self._point_ids: np.ndarray | None = None
+        self._filters: RowFilters | None = None
+        self._allowed: dict[tuple, frozenset] = {}
+
+    def load(self, hnsw_path: str, index_path: str, rerank_fields: RerankFieldStore) -> bool:
+        if not (os.path.exists(hnsw_path) and os.path.exists(index_path)) or not len(rerank_fields):
+            return False
+        try:
+            import hnswlib
+        except ImportError:
+            print("Warning: hnswlib is not installed; HNSW search engine unavailable")
+            return False
+
+        point_ids, filters = _load_index(index_path, rerank_fields)
+        index = hnswlib.Index(space="ip", dim=self._dim)
+        index.load_index(hnsw_path)
+        if index.get_current_count() != len(point_ids):
+            raise ValueError(f"{hnsw_path} has {index.get_current_count()} items but {index_path} has {len(point_ids)} codes")
+        # Fixed for the index's lifetime: hnswlib already widens the beam to k
+        # for larger queries, and set_ef is index-wide, so changing it per
+        # query would race with concurrent searches.
+        index.set_ef(self._ef_search)
+
+        self._index = index
+        self._point_ids = point_ids
+        self._filters = filters
+        self._allowed = {}
+        return True
+
+    def __len__(self) -> int:
+        return 0 if self._index is None else self._index.get_current_count()
+
+    def allowed_ids(self, grades: list[str] | None, partitions: list[str] | None,
+                    categories: list[str] | None = None) -> frozenset | None:
+        """Point IDs passing a grade/partition/category filter."""
+        key = RowFilters.key(grades, partitions, categories)
+        if key is None:
+            return None
+        allowed = self._allowed.get(key)
+        if allowed is None:
+            allowed = frozenset(self._point_ids[self._filters.mask(grades, partitions, categories)].tolist())
+            if len(self._allowed) >= 256:
+                self._allowed.clear()
+            self._allowed[key] = allowed
+        return allowed
+
+    def search(self, query: list[float], top_k: int, grades: list[str] | None = None,
+               partitions: list[str] | None = None, categories: list[str] | None = None) -> list[tuple[int, float]]:
+        """Top-k (point_id, score) pairs, optionally restricted by grade, partition and category."""
+        allowed = self.allowed_ids(grades, partitions, categories)
+        k = min(top_k, len(self) if allowed is None else len(allowed))
+        if k <= 0:
+            return []
+        q = np.asarray(query, dtype=np.float32).reshape(1, -1)
+        id_filter = None if allowed is None else allowed.__contains__
+        try:
+            labels, distances = self._index.knn_query(q, k=k, filter=id_filter)
+        except RuntimeError:
+            # A filtered walk can reach fewer than k allowed items; hnswlib raises
+            # rather than returning a short row, so find the most it can return.
+            reachable, unreachable = 0, k
+            while unreachable - reachable > 1:
+                mid = (reachable + unreachable) // 2
+                try:
+                    labels, distances = self._index.knn_query(q, k=mid, filter=id_filter)
+                    reachable = mid
+                except RuntimeError:
+                    unreachable = mid
+            if not reachable:
+                return []
+        # Inner-product distance is 1 - dot; vectors are normalized, so 1 - d is cosine.
+        return [(int(label), float(1.0 - d)) for label, d in zip(labels[0], distances[0])]
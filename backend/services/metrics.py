@@ -0,0 +1,36 @@
+from collections import Counter
+
+
+class DeepeningMetrics:
+    """Aggregates how many search rounds and candidates recommendations needed.
+
+    Surfaced on /api/health so RECOMMEND_START_WINDOW can be tuned from
+    production traffic.
+    """
+
+    def __init__(self):
+        self._requests = 0
+        self._candidates = 0
+        self._short = 0
+        self._rounds: Counter[int] = Counter()
+        self._final_windows: Counter[int] = Counter()
+
+    def record(self, rounds: int, candidates: int, window: int, results: int, wanted: int):
+        self._requests += 1
+        self._candidates += candidates
+        self._rounds[rounds] += 1
+        self._final_windows[window] += 1
+        if results < wanted:
+            self._short += 1
+
+    def stats(self) -> dict:
+        return {
+            "requests": self._requests,
+            "avg_candidates": round(self._candidates / self._requests, 1) if self._requests else 0.0,
+            "rounds": dict(sorted(self._rounds.items())),
+            "final_window": dict(sorted(self._final_windows.items())),
+            "short_results": self._short,
+        }
+
+
+recommend_metrics = DeepeningMetrics()
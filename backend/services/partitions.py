@@ -0,0 +1,99 @@
+import json
+import os
+import re
+
+import numpy as np
+
+# The SDK's partition API (create_partition/load_partitions) is not available
+# yet, so a partition is a filterable "partition" payload field holding the
+# product's top-level categories_tags entry. Ingest also writes
+# data/partitions.json with each partition's size and its closest siblings by
+# centroid similarity, used to widen a search that comes up short.
+
+
+def product_partition(categories_tags) -> str:
+    """Top-level category tag (e.g. "en:beverages") from a tag list or its JSON string."""
+    if isinstance(categories_tags, str):
+        try:
+            categories_tags = json.loads(categories_tags)
+        except ValueError:
+            return ""
+    if not isinstance(categories_tags, list) or not categories_tags:
+        return ""
+    return str(categories_tags[0]).strip().lower()
+
+
+def category_keys(categories: str | None) -> list[str]:
+    """Normalized category names from a comma-separated categories string.
+
+    Stored as the filterable "category_keys" payload field, so category overlap
+    with a source product is a single is_in filter.
+    """
+    return sorted({c.strip().lower() for c in (categories or "").split(",") if c.strip()})
+
+
+def category_tag(name: str) -> str:
+    """Best-effort OpenFoodFacts tag for a free-text category name ("Soft drinks" -> "en:soft-drinks")."""
+    slug = re.sub(r"[^a-z0-9]+", "-", (name or "").strip().lower()).strip("-")
+    return f"en:{slug}" if slug else ""
+
+
+class PartitionBuilder:
+    """Accumulates per-partition vector centroids during ingest."""
+
+    def __init__(self):
+        self._sums: dict[str, np.ndarray] = {}
+        self._counts: dict[str, int] = {}
+
+    def add(self, partition: str, vector):
+        if not partition:
+            return
+        v = np.asarray(vector, dtype=np.float64)
+        if partition in self._sums:
+            self._sums[partition] += v
+        else:
+            self._sums[partition] = v.copy()
+        self._counts[partition] = self._counts.get(partition, 0) + 1
+
+    def write(self, path: str, siblings: int = 3) -> int:
+        names = sorted(self._sums)
+        partitions = {}
+        if names:
+            centroids = np.stack([self._sums[n] / self._counts[n] for n in names])
+            centroids /= np.maximum(np.linalg.norm(centroids, axis=1, keepdims=True), 1e-12)
+            similarity = centroids @ centroids.T
+            np.fill_diagonal(similarity, -np.inf)
+            for i, name in enumerate(names):
+                nearest = np.argsort(-similarity[i])[:siblings]
+                partitions[name] = {
+                    "count": self._counts[name],
+                    "siblings": [names[j] for j in nearest if np.isfinite(similarity[i, j])],
+                }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"partitions": partitions}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        return len(partitions)
+
+
+class PartitionMap:
+    """Read-only view of data/partitions.json."""
+
+    def __init__(self):
+        self._partitions: dict[str, dict] = {}
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            self._partitions = json.load(f)["partitions"]
+        return True
+
+    def __len__(self) -> int:
+        return len(self._partitions)
+
+    def __contains__(self, partition: str) -> bool:
+        return partition in self._partitions
+
+    def siblings(self, partition: str) -> list[str]:
+        return list(self._partitions.get(partition, {}).get("siblings", []))
@@ -0,0 +1,26 @@
+import hashlib
+
+_ID_MASK = (1 << 63) - 1
+
+
+def product_point_id(product_code: str) -> int:
+    """Deterministic 63-bit point ID for a product code.
+
+    IDs no longer depend on catalog order, so re-ingests are order-independent
+    and lookups by code can go straight to a primary-key get.
+    """
+    digest = hashlib.blake2b(product_code.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") & _ID_MASK
+
+
+def assign_point_ids(product_codes: list[str]) -> list[int]:
+    """Point IDs for a batch of codes, failing loudly if two codes collide."""
+    owners: dict[int, str] = {}
+    ids = []
+    for code in product_codes:
+        point_id = product_point_id(code)
+        owner = owners.setdefault(point_id, code)
+        if owner != code:
+            raise ValueError(f"Point ID collision: {owner!r} and {code!r} both map to {point_id}")
+        ids.append(point_id)
+    return ids
@@ -0,0 +1,78 @@
+import os
+
+import numpy as np
+
+
+class PcaProjection:
+    """Linear map from model embeddings to the reduced EMBEDDING_DIM space.
+
+    Fit on catalog embeddings by the embedding pipeline and applied to both
+    catalog and query vectors, so cosine scores stay comparable. Outputs are
+    re-normalized to unit length.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, scale: np.ndarray | None = None,
+                 explained_variance_ratio: float = 0.0):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)
+        self.scale = None if scale is None else scale.astype(np.float32)
+        self.explained_variance_ratio = explained_variance_ratio
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[0]
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, dim: int, whiten: bool = False, sample_rows: int = 200_000,
+            seed: int = 0) -> "PcaProjection":
+        if len(vectors) > sample_rows:
+            rows = np.sort(np.random.default_rng(seed).choice(len(vectors), size=sample_rows, replace=False))
+            vectors = vectors[rows]
+        x = np.asarray(vectors, dtype=np.float64)
+        mean = x.mean(axis=0)
+        x -= mean
+        eigvals, eigvecs = np.linalg.eigh(x.T @ x / max(len(x) - 1, 1))
+        order = np.argsort(eigvals)[::-1][:dim]
+        scale = np.sqrt(np.maximum(eigvals[order], 1e-12)) if whiten else None
+        ratio = float(eigvals[order].sum() / eigvals.sum())
+        return cls(mean, eigvecs[:, order].T, scale, ratio)
+
+    @classmethod
+    def load(cls, path: str) -> "PcaProjection":
+        with np.load(path) as data:
+            scale = data["scale"] if data["scale"].size else None
+            return cls(data["mean"], data["components"], scale, float(data["explained_variance_ratio"]))
+
+    def save(self, path: str):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            mean=self.mean,
+            components=self.components,
+            scale=np.empty(0, dtype=np.float32) if self.scale is None else self.scale,
+            explained_variance_ratio=np.float64(self.explained_variance_ratio),
+        )
+        os.replace(tmp_path, path)
+
+    def apply(self, vectors: np.ndarray, block_rows: int = 65536) -> np.ndarray:
+        """Project one vector or a matrix of row vectors."""
+        single = np.ndim(vectors) == 1
+        x = np.atleast_2d(vectors)
+        out = np.empty((len(x), self.dim), dtype=np.float32)
+        for start in range(0, len(x), block_rows):
+            y = (np.asarray(x[start:start + block_rows], dtype=np.float32) - self.mean) @ self.components.T
+            if self.scale is not None:
+                y /= self.scale
+            y /= np.maximum(np.linalg.norm(y, axis=1, keepdims=True), 1e-12)
+            out[start:start + len(y)] = y
+        return out[0] if single else out
+
+
+def reduce_catalog(embeddings: np.ndarray, dim: int, whiten: bool, projection_path: str, full_path: str) -> np.ndarray:
+    """Embedding-pipeline stage: keep the full vectors, fit and save the projection, return reduced vectors."""
+    np.save(full_path, np.asarray(embeddings, dtype=np.float32))
+    projection = PcaProjection.fit(embeddings, dim, whiten=whiten)
+    projection.save(projection_path)
+    print(f"PCA {embeddings.shape[1]} -> {dim} dims{' (whitened)' if whiten else ''}: "
+          f"{projection.explained_variance_ratio:.1%} of variance kept, saved to {projection_path}")
+    return projection.apply(embeddings)
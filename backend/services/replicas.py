@@ -0,0 +1,237 @@
+import asyncio
+import time
+from collections import deque
+from functools import partial
+
+from cortex import AsyncCortexClient, CortexError
+
+from config import ACTIAN_HEALTH_INTERVAL_SECONDS, ACTIAN_HEDGE_PERCENTILE
+
+REPLICA_SEPARATOR = "|"
+
+# Calls answered by any one replica, and calls every replica has to apply.
+_READS = frozenset({
+    "health_check", "has_collection", "describe_alias", "count", "get", "get_many", "search", "query",
+})
+_WRITES = frozenset({
+    "create_collection", "get_or_create_collection", "delete_collection", "create_alias", "alter_alias",
+    "flush", "save_snapshot", "load_snapshot", "upsert", "batch_upsert", "batch_delete", "set_payload",
+})
+# Reads worth hedging: the ones on the request path, not admin calls.
+_HEDGED = frozenset({"get", "get_many", "search", "query"})
+_HEDGE_MIN_SAMPLES = 20
+# Errors meaning the replica answered: raised to the caller as is, without
+# ejecting the replica or retrying elsewhere. The SDK raises
+# NotImplementedError for calls it doesn't support yet (aliases, set_payload).
+_ANSWERED = (CortexError, NotImplementedError)
+
+
+def _settled(task: asyncio.Future) -> bool:
+    # An answer or an answered error settles a read; a transport error doesn't.
+    return task.exception() is None or isinstance(task.exception(), _ANSWERED)
+
+
+class _Replica:
+    def __init__(self, address: str, client: AsyncCortexClient):
+        self.address = address
+        self.client = client
+        self.healthy = True
+        self.outstanding = 0
+        self.requests = 0
+        self.failures = 0
+        self.ejections = 0
+
+    def stats(self) -> dict:
+        return {
+            "address": self.address,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "ejections": self.ejections,
+        }
+
+
+class AsyncReplicaSetClient:
+    """AsyncCortexClient look-alike over identical replicas of one node.
+
+    Reads go to the healthy replica with the fewest requests in flight and
+    fail over to the next one on a transport error; a CortexError means the
+    replica answered, so it is raised as is. Writes go to every replica and
+    raise if any of them failed, since that replica now lags the others.
+
+    A replica is ejected when a call to it fails in transit or it fails the
+    health_check polled every health_interval, and rejoins once a health
+    check passes. With hedge_percentile set, a request-path read that has
+    taken longer than that percentile of recent latencies is duplicated to
+    the next replica and the first answer wins.
+    """
+
+    def __init__(
+        self,
+        replicas: dict[str, AsyncCortexClient],
+        health_interval: float = ACTIAN_HEALTH_INTERVAL_SECONDS,
+        hedge_percentile: float = ACTIAN_HEDGE_PERCENTILE,
+    ):
+        self._replicas = [_Replica(address, client) for address, client in replicas.items()]
+        self._health_interval = health_interval
+        self._hedge_percentile = hedge_percentile
+        self._latencies: dict[str, deque] = {op: deque(maxlen=500) for op in _HEDGED}
+        self._monitor: asyncio.Task | None = None
+        self._hedges = 0
+        self._hedge_wins = 0
+
+    def __getattr__(self, op: str):
+        # Same method names as AsyncCortexClient, dispatched by kind.
+        if op in _READS:
+            return partial(self._read, op)
+        if op in _WRITES:
+            return partial(self._write, op)
+        raise AttributeError(op)
+
+    async def __aenter__(self) -> "AsyncReplicaSetClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def connect(self):
+        await asyncio.gather(*(replica.client.connect() for replica in self._replicas))
+        if self._health_interval > 0:
+            self._monitor = asyncio.create_task(self._monitor_health())
+
+    async def close(self):
+        if self._monitor:
+            self._monitor.cancel()
+            self._monitor = None
+        await asyncio.gather(*(replica.client.close() for replica in self._replicas), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.stats() for replica in self._replicas],
+            "hedges": self._hedges,
+            "hedge_wins": self._hedge_wins,
+        }
+
+    def _eject(self, replica: _Replica, reason: str):
+        if replica.healthy:
+            replica.healthy = False
+            replica.ejections += 1
+            print(f"[actian] replica {replica.address} ejected: {reason}")
+
+    async def _monitor_health(self):
+        while True:
+            await asyncio.sleep(self._health_interval)
+            await asyncio.gather(*(self._check(replica) for replica in self._replicas))
+
+    async def _check(self, replica: _Replica):
+        try:
+            await asyncio.wait_for(replica.client.health_check(), self._health_interval)
+        except Exception as e:
+            self._eject(replica, f"health check failed ({type(e).__name__})")
+            return
+        if not replica.healthy:
+            replica.healthy = True
+            print(f"[actian] replica {replica.address} back in rotation")
+
+    def _ranked(self) -> list[_Replica]:
+        # Least outstanding requests first; fewest requests so far breaks ties
+        # so an idle set still round-robins. If every replica is ejected, try
+        # them all rather than failing without a request.
+        healthy = [replica for replica in self._replicas if replica.healthy] or self._replicas
+        return sorted(healthy, key=lambda replica: (replica.outstanding, replica.requests))
+
+    async def _call(self, replica: _Replica, op: str, *args, **kwargs):
+        replica.outstanding += 1
+        replica.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await getattr(replica.client, op)(*args, **kwargs)
+        except _ANSWERED:
+            raise
+        except Exception as e:
+            replica.failures += 1
+            self._eject(replica, f"{op} failed ({type(e).__name__}: {e})")
+            raise
+        finally:
+            replica.outstanding -= 1
+        if op in self._latencies:
+            self._latencies[op].append(time.perf_counter() - start)
+        return result
+
+    def _hedge_after(self, op: str) -> float | None:
+        if not self._hedge_percentile or op not in _HEDGED:
+            return None
+        latencies = self._latencies[op]
+        if len(latencies) < _HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self._hedge_percentile / 100))]
+
+    async def _hedged(self, primary: _Replica, backup: _Replica, delay: float, op: str, *args, **kwargs):
+        first = asyncio.ensure_future(self._call(primary, op, *args, **kwargs))
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if done and _settled(first):
+                return first.result()
+            # The primary is slow, or already failed in transit (and was
+            # ejected): either way the backup goes out now.
+            if not done:
+                self._hedges += 1
+            tasks.add(asyncio.ensure_future(self._call(backup, op, *args, **kwargs)))
+            tasks -= done
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if _settled(task):
+                        if task is not first:
+                            self._hedge_wins += 1
+                        return task.result()
+            return first.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _read(self, op: str, *args, **kwargs):
+        ranked = self._ranked()
+        error: Exception | None = None
+        while ranked:
+            replica = ranked.pop(0)
+            delay = self._hedge_after(op)
+            try:
+                if delay is not None and ranked:
+                    return await self._hedged(replica, ranked.pop(0), delay, op, *args, **kwargs)
+                return await self._call(replica, op, *args, **kwargs)
+            except _ANSWERED:
+                raise
+            except Exception as e:
+                error = e
+        raise error
+
+    async def _write(self, op: str, *args, **kwargs):
+        results = await asyncio.gather(
+            *(self._call(replica, op, *args, **kwargs) for replica in self._replicas), return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return results[0]
+
+
+def replica_addresses(spec: str) -> list[str]:
+    """Addresses in one ACTIAN_SHARDS entry: a single node, or replicas joined with "|"."""
+    return [address.strip() for address in spec.split(REPLICA_SEPARATOR) if address.strip()]
+
+
+def replica_set(clients: dict[str, AsyncCortexClient]) -> AsyncCortexClient:
+    """One node's client: the client itself, or a replica set over several."""
+    if len(clients) == 1:
+        return next(iter(clients.values()))
+    return AsyncReplicaSetClient(clients)
+
+
+def node_client(spec: str, **kwargs) -> AsyncCortexClient:
+    """Client for one ACTIAN_SHARDS entry; kwargs go to each replica's AsyncCortexClient."""
+    return replica_set({address: AsyncCortexClient(address, **kwargs) for address in replica_addresses(spec)})
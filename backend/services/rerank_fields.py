@@ -0,0 +1,84 @@
+import json
+import os
+
+# Fields the routers need to rerank, filter and dedupe search hits before the
+# final few are hydrated with their full payload.
+RERANK_FIELDS = (
+    "product_code",
+    "product_name",
+    "brands",
+    "categories",
+    "labels_tags",
+    "ecoscore_grade",
+    "nutriscore_grade",
+    "partition",
+)
+
+
+def rerank_row(payload: dict) -> list:
+    return [payload.get(field) for field in RERANK_FIELDS]
+
+
+def write_rerank_fields(path: str, rows: dict[int, list]):
+    """Write the point_id -> rerank fields sidecar next to the catalog."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {"fields": list(RERANK_FIELDS), "rows": {str(pid): row for pid, row in rows.items()}},
+            f,
+            ensure_ascii=False,
+        )
+    os.replace(tmp_path, path)
+
+
+def patch_rerank_fields(path: str, patches: dict[int, dict]) -> int:
+    """Update fields of existing sidecar rows in place; returns the number of rows changed."""
+    if not patches or not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    positions = {field: i for i, field in enumerate(data["fields"])}
+    changed = 0
+    for point_id, patch in patches.items():
+        row = data["rows"].get(str(point_id))
+        if row is None:
+            continue
+        for field, value in patch.items():
+            if field in positions:
+                row[positions[field]] = value
+        changed += 1
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return changed
+
+
+class RerankFieldStore:
+    """Read-only lookup of projected rerank fields by point ID.
+
+    Rows are kept as tuples rather than dicts to keep a 200k-product catalog
+    to a few tens of MB.
+    """
+
+    def __init__(self):
+        self._fields: tuple[str, ...] = RERANK_FIELDS
+        self._rows: dict[int, tuple] = {}
+
+    def load(self, path: str) -> bool:
+        if not os.path.exists(path):
+            return False
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self._fields = tuple(data["fields"])
+        self._rows = {int(point_id): tuple(row) for point_id, row in data["rows"].items()}
+        return True
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, point_id: int) -> dict | None:
+        row = self._rows.get(point_id)
+        if row is None:
+            return None
+        return dict(zip(self._fields, row))
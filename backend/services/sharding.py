@@ -0,0 +1,243 @@
+import asyncio
+import atexit
+import heapq
+import threading
+from collections import defaultdict
+
+from cortex import AsyncCortexClient, CortexClient
+
+from config import ACTIAN_SHARD_TIMEOUT_MS, ACTIAN_SHARDS
+from services.circuit_breaker import mark_stale
+from services.replicas import REPLICA_SEPARATOR, node_client
+
+
+def shard_of(point_id: int, shards: int) -> int:
+    """Shard holding a point. Point IDs are already a hash of product_code."""
+    return point_id % shards
+
+
+def group_by_shard(ids: list[int], shards: int) -> dict[int, list[int]]:
+    """Positions in ids, grouped by the shard each point lives on."""
+    groups: dict[int, list[int]] = defaultdict(list)
+    for position, point_id in enumerate(ids):
+        groups[shard_of(point_id, shards)].append(position)
+    return groups
+
+
+class AsyncShardedCortexClient:
+    """AsyncCortexClient look-alike spreading one logical collection over several nodes.
+
+    Every shard holds a collection of the same name. Gets and writes go to the
+    shard picked by shard_of(); collection management is broadcast; searches
+    go to all shards concurrently and the per-shard top-k are merged by score.
+
+    With partial_results, a shard that fails or misses shard_timeout is left
+    out of the merge (and the response marked stale), so a slow node costs
+    recall rather than latency; the search only raises when every shard
+    fails. Without it, as in the ingest scripts, any shard error raises.
+    """
+
+    def __init__(
+        self,
+        shards: list[AsyncCortexClient],
+        shard_timeout: float | None = None,
+        partial_results: bool = False,
+    ):
+        self.shards = list(shards)
+        self._shard_timeout = shard_timeout
+        self._partial_results = partial_results
+        self._partial_searches = 0
+
+    async def __aenter__(self) -> "AsyncShardedCortexClient":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb) -> None:
+        await self.close()
+
+    async def connect(self):
+        await asyncio.gather(*(shard.connect() for shard in self.shards))
+
+    async def close(self):
+        await asyncio.gather(*(shard.close() for shard in self.shards), return_exceptions=True)
+
+    def _shard(self, point_id: int) -> AsyncCortexClient:
+        return self.shards[shard_of(point_id, len(self.shards))]
+
+    async def _broadcast(self, op: str, *args, **kwargs) -> list:
+        return await asyncio.gather(*(getattr(shard, op)(*args, **kwargs) for shard in self.shards))
+
+    def stats(self) -> dict:
+        stats = {"shards": len(self.shards), "partial_searches": self._partial_searches}
+        replicas = {i: shard.stats() for i, shard in enumerate(self.shards) if hasattr(shard, "stats")}
+        if replicas:
+            stats["replica_sets"] = replicas
+        return stats
+
+    async def health_check(self) -> tuple[str, int]:
+        results = await self._broadcast("health_check")
+        versions = sorted({version for version, _ in results})
+        return f"{', '.join(versions)} ({len(self.shards)} shards)", min(uptime for _, uptime in results)
+
+    async def has_collection(self, name: str) -> bool:
+        return all(await self._broadcast("has_collection", name))
+
+    async def create_collection(self, *args, **kwargs):
+        await self._broadcast("create_collection", *args, **kwargs)
+
+    async def get_or_create_collection(self, *args, **kwargs):
+        return (await self._broadcast("get_or_create_collection", *args, **kwargs))[0]
+
+    async def delete_collection(self, name: str):
+        await self._broadcast("delete_collection", name)
+
+    async def describe_alias(self, alias: str):
+        return (await self._broadcast("describe_alias", alias))[0]
+
+    async def create_alias(self, collection_name: str, alias: str):
+        await self._broadcast("create_alias", collection_name, alias)
+
+    async def alter_alias(self, collection_name: str, alias: str):
+        await self._broadcast("alter_alias", collection_name, alias)
+
+    async def flush(self, collection_name: str):
+        await self._broadcast("flush", collection_name)
+
+    async def save_snapshot(self, collection_name: str):
+        await self._broadcast("save_snapshot", collection_name)
+
+    async def load_snapshot(self, collection_name: str):
+        await self._broadcast("load_snapshot", collection_name)
+
+    async def count(self, collection_name: str, exact: bool = True) -> int:
+        return sum(await self._broadcast("count", collection_name, exact=exact))
+
+    async def get(self, collection_name: str, id: int):
+        return await self._shard(id).get(collection_name, id)
+
+    async def upsert(self, collection_name: str, id: int, vector, payload=None):
+        await self._shard(id).upsert(collection_name, id, vector, payload)
+
+    async def get_many(self, collection_name: str, ids: list[int], with_vectors: bool = True, with_payload: bool = True):
+        groups = group_by_shard(ids, len(self.shards))
+        fetched = await asyncio.gather(
+            *(
+                self.shards[shard].get_many(
+                    collection_name, [ids[p] for p in positions], with_vectors=with_vectors, with_payload=with_payload
+                )
+                for shard, positions in groups.items()
+            )
+        )
+        results = [(None, None)] * len(ids)
+        for positions, records in zip(groups.values(), fetched):
+            for position, record in zip(positions, records):
+                results[position] = record
+        return results
+
+    async def batch_upsert(self, collection_name: str, ids: list[int], vectors, payloads=None):
+        groups = group_by_shard(ids, len(self.shards))
+        await asyncio.gather(
+            *(
+                self.shards[shard].batch_upsert(
+                    collection_name,
+                    ids=[ids[p] for p in positions],
+                    vectors=[vectors[p] for p in positions],
+                    payloads=[payloads[p] for p in positions] if payloads is not None else None,
+                )
+                for shard, positions in groups.items()
+            )
+        )
+
+    async def batch_delete(self, collection_name: str, ids: list[int]):
+        groups = group_by_shard(ids, len(self.shards))
+        await asyncio.gather(
+            *(
+                self.shards[shard].batch_delete(collection_name, [ids[p] for p in positions])
+                for shard, positions in groups.items()
+            )
+        )
+
+    async def _search_shard(self, shard: AsyncCortexClient, collection_name: str, query, top_k: int, **kwargs):
+        search = shard.search(collection_name, query=query, top_k=top_k, **kwargs)
+        if self._shard_timeout is None:
+            return await search
+        return await asyncio.wait_for(search, self._shard_timeout)
+
+    async def search(self, collection_name: str, query, top_k: int = 10, **kwargs):
+        # Each shard returns its own top-k; the global top-k is among them.
+        per_shard = await asyncio.gather(
+            *(self._search_shard(shard, collection_name, query, top_k, **kwargs) for shard in self.shards),
+            return_exceptions=True,
+        )
+        failed = [(i, r) for i, r in enumerate(per_shard) if isinstance(r, BaseException)]
+        if failed and (not self._partial_results or len(failed) == len(self.shards)):
+            raise failed[0][1]
+        if failed:
+            self._partial_searches += 1
+            mark_stale()
+            print(
+                "[actian] partial search results; shards "
+                + ", ".join(f"{i} ({type(e).__name__})" for i, e in failed)
+                + " left out"
+            )
+        hits = [r for results in per_shard if not isinstance(results, BaseException) for r in results]
+        return heapq.nlargest(top_k, hits, key=lambda r: r.score)
+
+
+class ShardedCortexClient(CortexClient):
+    """Sync client over AsyncShardedCortexClient, for the ingest and maintenance scripts.
+
+    CortexClient runs an AsyncCortexClient on a background event loop and
+    forwards every call to it; this swaps in the sharded client, so code
+    written against CortexClient routes and scatters without changes. An
+    address listing replicas ("a:50051|b:50051") becomes a replica set.
+    """
+
+    def __init__(self, addresses: list[str], **kwargs):
+        super().__init__(",".join(addresses), **kwargs)
+        self._addresses = list(addresses)
+
+    def connect(self) -> None:
+        if self._connected:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._loop_thread.start()
+        self._async_client = AsyncShardedCortexClient(
+            [
+                node_client(
+                    address,
+                    api_key=self._api_key,
+                    pool_size=self._pool_size,
+                    enable_smart_batching=self._enable_smart_batching,
+                    timeout=self._timeout,
+                )
+                for address in self._addresses
+            ]
+        )
+        asyncio.run_coroutine_threadsafe(self._async_client.connect(), self._loop).result()
+        self._connected = True
+        atexit.register(self.close)
+
+
+def cortex_client(addresses: list[str] = ACTIAN_SHARDS, **kwargs) -> CortexClient:
+    """Sync client for the configured node, or for all of them when ACTIAN_SHARDS lists several."""
+    if len(addresses) == 1 and REPLICA_SEPARATOR not in addresses[0]:
+        return CortexClient(addresses[0], **kwargs)
+    return ShardedCortexClient(addresses, **kwargs)
+
+
+def async_cortex_client(addresses: list[str] = ACTIAN_SHARDS, **kwargs) -> AsyncCortexClient:
+    """AsyncCortexClient counterpart of cortex_client(), for scripts; any shard error raises."""
+    if len(addresses) == 1:
+        return node_client(addresses[0], **kwargs)
+    return AsyncShardedCortexClient([node_client(address, **kwargs) for address in addresses])
+
+
+def serving_client(shards: list[AsyncCortexClient]) -> AsyncCortexClient:
+    """Client for the API: partial results when a shard is slow or down."""
+    if len(shards) == 1:
+        return shards[0]
+    return AsyncShardedCortexClient(
+        shards, shard_timeout=ACTIAN_SHARD_TIMEOUT_MS / 1000, partial_results=True
+    )
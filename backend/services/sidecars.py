@@ -0,0 +1,139 @@
+import json
+import os
+import shutil
+import time
+
+import config
+
+# Config settings naming the local files the API serves a collection with (and
+# incremental ingest reads). They are kept per collection version, and
+# snapshot bundles carry the same set.
+SIDECAR_SETTINGS = (
+    "EMBEDDINGS_PATH",
+    "EMBEDDING_INDEX_PATH",
+    "EMBEDDINGS_FULL_PATH",
+    "PCA_PROJECTION_PATH",
+    "HNSW_INDEX_PATH",
+    "QUANTIZED_EMBEDDINGS_PATH",
+    "QUANTIZATION_PARAMS_PATH",
+    "RESCORE_EMBEDDINGS_PATH",
+    "RERANK_FIELDS_PATH",
+    "COLD_STORE_PATH",
+    "PARTITIONS_PATH",
+    "ALTERNATIVES_PATH",
+    "INGEST_MANIFEST_PATH",
+)
+VERSION_MANIFEST = "sidecars.json"
+
+
+def staging_path(path: str) -> str:
+    """Where the next collection version's copy of a local file is written before it goes live."""
+    root, ext = os.path.splitext(path)
+    return f"{root}.next{ext}"
+
+
+class StagedSidecars:
+    """The local files for a new collection version, written beside the live ones.
+
+    The API reloads its local files as soon as the products alias moves, so
+    the ingest scripts write each file to path(live_path) and only move them
+    all into place with commit() once the new collection has verified, right
+    before switching the alias. Until then nothing the API reads changes, and
+    a collection that fails verification leaves the live files alone.
+    """
+
+    def __init__(self, *live_paths: str):
+        self._live = list(live_paths)
+
+    def path(self, live_path: str) -> str:
+        if live_path not in self._live:
+            self._live.append(live_path)
+        return staging_path(live_path)
+
+    @staticmethod
+    def current(live_path: str) -> str:
+        """The staged file if there is one, otherwise the live file."""
+        staged = staging_path(live_path)
+        return staged if os.path.exists(staged) else live_path
+
+    def commit(self) -> int:
+        """Move every staged file over its live path; returns how many were moved."""
+        committed = 0
+        for live_path in self._live:
+            staged = staging_path(live_path)
+            if os.path.exists(staged):
+                os.replace(staged, live_path)
+                committed += 1
+        return committed
+
+    def discard(self):
+        for live_path in self._live:
+            staged = staging_path(live_path)
+            if os.path.exists(staged):
+                os.remove(staged)
+
+
+def _link_or_copy(src: str, dst: str):
+    # Every writer replaces these files rather than writing into them, so a
+    # hard link is as good as a copy and costs no space.
+    if os.path.exists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def version_dir(collection: str) -> str:
+    return os.path.join(config.COLLECTION_SIDECARS_DIR, collection)
+
+
+def has_sidecars(collection: str) -> bool:
+    return os.path.exists(os.path.join(version_dir(collection), VERSION_MANIFEST))
+
+
+def archive_sidecars(collection: str) -> int:
+    """Keep the live local files as collection's; returns how many there were.
+
+    Call once the live files describe collection: after it goes live, and
+    after any in-place update to it.
+    """
+    directory = version_dir(collection)
+    tmp_dir = f"{directory}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    files = {}
+    for setting in SIDECAR_SETTINGS:
+        path = getattr(config, setting)
+        if os.path.exists(path):
+            _link_or_copy(path, os.path.join(tmp_dir, os.path.basename(path)))
+            files[setting] = os.path.basename(path)
+    with open(os.path.join(tmp_dir, VERSION_MANIFEST), "w", encoding="utf-8") as f:
+        json.dump({"collection": collection, "files": files, "archived_at": time.time()}, f, indent=2)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return len(files)
+
+
+def restore_sidecars(collection: str) -> int:
+    """Put collection's kept local files back in place; returns how many there were.
+
+    Live files that collection had no copy of (a PCA projection or HNSW index
+    built for another version) are removed rather than left to mismatch.
+    """
+    directory = version_dir(collection)
+    with open(os.path.join(directory, VERSION_MANIFEST), "r", encoding="utf-8") as f:
+        files = json.load(f)["files"]
+    staged = StagedSidecars()
+    for setting, name in files.items():
+        _link_or_copy(os.path.join(directory, name), staged.path(getattr(config, setting)))
+    staged.commit()
+    for setting in SIDECAR_SETTINGS:
+        path = getattr(config, setting)
+        if setting not in files and os.path.exists(path):
+            os.remove(path)
+    return len(files)
+
+
+def drop_sidecars(collection: str):
+    shutil.rmtree(version_dir(collection), ignore_errors=True)
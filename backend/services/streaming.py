@@ -0,0 +1,141 @@
+import json
+import os
+import queue
+import threading
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+_WHITESPACE = " \t\r\n"
+
+
+def iter_json_array(path: str, chunk_chars: int = 1 << 20) -> Iterator:
+    """Yield the elements of a file holding one top-level JSON array, without loading it whole."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        eof = False
+        while not buf and not eof:
+            more = f.read(chunk_chars)
+            eof = not more
+            buf = more.lstrip(_WHITESPACE)
+        if buf[:1] != "[":
+            raise ValueError(f"{path} does not hold a JSON array")
+        pos = 1
+        while True:
+            while pos < len(buf) and buf[pos] in _WHITESPACE + ",":
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            # An element may run past the buffer, and a number cut at its edge
+            # ("1." of "1.5") still decodes as a shorter one, so only trust a
+            # decode followed by "," or "]"; otherwise top up and retry.
+            try:
+                if pos == len(buf):
+                    raise json.JSONDecodeError("buffer exhausted", buf, pos)
+                item, end = decoder.raw_decode(buf, pos)
+                after = end
+                while after < len(buf) and buf[after] in _WHITESPACE:
+                    after += 1
+                if after == len(buf) or buf[after] not in ",]":
+                    raise json.JSONDecodeError("element may continue", buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_chars)
+                if not more:
+                    if eof:
+                        raise ValueError(f"{path} ends inside its JSON array") from None
+                    eof = True
+                buf = buf[pos:] + more
+                pos = 0
+                continue
+            yield item
+            pos = end
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class _Failure:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+_END = object()
+
+
+class Stage:
+    """Runs an iterable on a worker thread and hands its items over through a bounded queue.
+
+    Chaining stages gives a producer/consumer pipeline: each stage works on the
+    next item while downstream handles the previous one, and a full queue makes
+    a fast stage wait for a slow one instead of buffering without limit. An
+    exception in the worker is re-raised in whoever iterates the stage.
+    """
+
+    def __init__(self, name: str, items: Iterable, maxsize: int = 4):
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, args=(items,), name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self, items: Iterable):
+        try:
+            for item in items:
+                self._queue.put(item)
+        except BaseException as e:
+            self._queue.put(_Failure(e))
+            return
+        self._queue.put(_END)
+
+    def __iter__(self) -> Iterator:
+        while True:
+            item = self._queue.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.error
+            yield item
+
+
+class NpyRowWriter:
+    """Appends float32 rows to a .npy file whose row count isn't known up front.
+
+    Rows are spooled to a raw temp file and copied into the final .npy on
+    close(), so memory stays at one block whatever the matrix size.
+    """
+
+    def __init__(self, path: str, dim: int, block_rows: int = 65536):
+        self._path = path
+        self._dim = dim
+        self._block_rows = block_rows
+        self._spool_path = f"{path}.rows.tmp"
+        self._spool = open(self._spool_path, "wb")
+        self._rows = 0
+
+    def append(self, rows: np.ndarray):
+        rows = np.ascontiguousarray(rows, dtype=np.float32).reshape(-1, self._dim)
+        self._spool.write(rows.tobytes())
+        self._rows += len(rows)
+
+    def close(self) -> int:
+        self._spool.close()
+        tmp_path = f"{self._path}.tmp.npy"
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=np.float32, shape=(self._rows, self._dim))
+        if self._rows:
+            spooled = np.memmap(self._spool_path, dtype=np.float32, mode="r", shape=(self._rows, self._dim))
+            for start in range(0, self._rows, self._block_rows):
+                out[start:start + self._block_rows] = spooled[start:start + self._block_rows]
+            del spooled
+        out.flush()
+        del out
+        os.replace(tmp_path, self._path)
+        os.remove(self._spool_path)
+        return self._rows
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import os
+import time
+
+from config import (
+    GEMINI_API_KEY,
+    GEMINI_MODEL,
+    WARMUP_OPTIONAL_TIMEOUT_SECONDS,
+    WARMUP_PRODUCTS_PATH,
+    WARMUP_RETRY_SECONDS,
+)
+from services.actian import actian_client
+from services.embeddings import embed_text, get_model
+
+# Product reads in flight while priming the cache, so a long list doesn't
+# flood Actian alongside real traffic.
+PRIME_CONCURRENCY = 16
+
+
+class Readiness:
+    """Warm-up progress behind /api/ready.
+
+    Each step records whether it passed and how long it took. The worker is
+    ready once every required step has passed; optional steps (Gemini, cache
+    priming) run afterwards and only make the first requests faster.
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.started_at = time.time()
+        self.ready_at: float | None = None
+        self._steps: dict[str, dict] = {}
+
+    def record(self, step: str, ok: bool, seconds: float, detail=None):
+        self._steps[step] = {"ok": ok, "ms": round(seconds * 1000, 1), "detail": detail}
+
+    def mark_ready(self):
+        self.ready = True
+        self.ready_at = time.time()
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "warmup_seconds": round((self.ready_at or time.time()) - self.started_at, 2),
+            "steps": dict(self._steps),
+        }
+
+
+readiness = Readiness()
+
+
+async def _step(step: str, func, timeout: float | None = None):
+    start = time.perf_counter()
+    try:
+        detail = await asyncio.wait_for(func(), timeout)
+    except Exception as e:
+        readiness.record(step, False, time.perf_counter() - start, f"{type(e).__name__}: {e}")
+        print(f"[warmup] {step} failed: {e}")
+        return False
+    readiness.record(step, True, time.perf_counter() - start, detail)
+    return True
+
+
+async def _load_model():
+    # Loading the model reads it from disk (or downloads it); keep it off the event loop.
+    await asyncio.to_thread(get_model)
+
+
+async def _test_search():
+    # The dummy encode also loads the PCA projection when one is configured.
+    # The probe skips the search cache and the local fallback engine, so this
+    # only passes once the primary engine itself answers.
+    embedding = await asyncio.to_thread(embed_text, "warm-up query")
+    return await actian_client.probe_search(embedding)
+
+
+async def _warm_gemini():
+    if not GEMINI_API_KEY:
+        return "skipped: no GEMINI_API_KEY"
+    import google.generativeai as genai
+
+    # A metadata lookup opens the connection without spending a generation.
+    await asyncio.to_thread(genai.get_model, f"models/{GEMINI_MODEL}")
+
+
+async def _prime_products():
+    if not os.path.exists(WARMUP_PRODUCTS_PATH):
+        return "skipped: no product list"
+    with open(WARMUP_PRODUCTS_PATH, "r", encoding="utf-8") as f:
+        codes = [str(code) for code in json.load(f)]
+    slots = asyncio.Semaphore(PRIME_CONCURRENCY)
+
+    async def prime(code: str):
+        async with slots:
+            return await actian_client.get_product_with_vector(code)
+
+    results = await asyncio.gather(*(prime(code) for code in codes), return_exceptions=True)
+    primed = sum(1 for r in results if not isinstance(r, Exception) and r[0] is not None)
+    return {"products": primed, "requested": len(codes)}
+
+
+async def warm_up():
+    """Warm the model and the search path, retrying until both pass, then prime caches.
+
+    The worker is marked ready as soon as the required steps pass; the
+    optional steps run after that, each bounded by WARMUP_OPTIONAL_TIMEOUT_SECONDS.
+    """
+    readiness.started_at = time.time()
+    required = (("model", _load_model), ("search", _test_search))
+    while True:
+        results = [await _step(step, func) for step, func in required]
+        if all(results):
+            break
+        await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    readiness.mark_ready()
+    print(f"[warmup] ready after {readiness.stats()['warmup_seconds']}s")
+    await _step("gemini", _warm_gemini, WARMUP_OPTIONAL_TIMEOUT_SECONDS)
+    await _step("product_cache", _prime_products, WARMUP_OPTIONAL_TIMEOUT_SECONDS)
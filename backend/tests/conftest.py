@@ -0,0 +1,57 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.quantize_embeddings import fit_params, quantize
+from services.point_ids import assign_point_ids
+from services.rerank_fields import rerank_row, write_rerank_fields
+
+DIM = 16
+GRADES = "abcde"
+
+
+@pytest.fixture
+def sidecars(tmp_path):
+    """Local search files for a small random catalog, as setup.py and the index scripts write them."""
+    rng = np.random.default_rng(0)
+    codes = [f"{i:013d}" for i in range(200)]
+    vectors = rng.standard_normal((len(codes), DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    point_ids = assign_point_ids(codes)
+    paths = {
+        "embeddings": str(tmp_path / "embeddings.npy"),
+        "index": str(tmp_path / "embedding_index.json"),
+        "rerank_fields": str(tmp_path / "rerank_fields.json"),
+        "int8": str(tmp_path / "embeddings_int8.npy"),
+        "int8_params": str(tmp_path / "embeddings_int8_params.npz"),
+        "f16": str(tmp_path / "embeddings_f16.npy"),
+        "hnsw": str(tmp_path / "products.hnsw"),
+    }
+    np.save(paths["embeddings"], vectors)
+    with open(paths["index"], "w", encoding="utf-8") as f:
+        json.dump(codes, f)
+    write_rerank_fields(
+        paths["rerank_fields"],
+        {
+            pid: rerank_row({"product_code": code, "ecoscore_grade": GRADES[i % 5], "categories": "Snacks"})
+            for i, (code, pid) in enumerate(zip(codes, point_ids))
+        },
+    )
+    scale, offset = fit_params(vectors)
+    np.save(paths["int8"], quantize(vectors, scale, offset))
+    np.savez(paths["int8_params"], scale=scale, offset=offset)
+    np.save(paths["f16"], vectors.astype(np.float16))
+
+    import hnswlib
+
+    index = hnswlib.Index(space="ip", dim=DIM)
+    index.init_index(max_elements=len(codes), ef_construction=100, M=16)
+    index.add_items(vectors, np.array(point_ids, dtype=np.uint64))
+    index.save_index(paths["hnsw"])
+
+    return {"paths": paths, "codes": codes, "vectors": vectors, "point_ids": point_ids}
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+import services.actian as actian
+from services.actian import ActianClient
+from services.cold_store import ColdStoreWriter
+from services.rerank_fields import rerank_row, write_rerank_fields
+
+
+@pytest.fixture
+def use_sidecars(monkeypatch, tmp_path, sidecars):
+    """Point ActianClient's sidecar settings at the test files."""
+    paths = sidecars["paths"]
+
+    def configure(search_engine: str, fallback: bool = False):
+        for setting, value in {
+            "SEARCH_ENGINE": search_engine,
+            "LOCAL_SEARCH_FALLBACK": fallback,
+            "EMBEDDING_DIM": sidecars["vectors"].shape[1],
+            "EMBEDDINGS_PATH": paths["embeddings"],
+            "EMBEDDING_INDEX_PATH": paths["index"],
+            "RERANK_FIELDS_PATH": paths["rerank_fields"],
+            "QUANTIZED_EMBEDDINGS_PATH": paths["int8"],
+            "QUANTIZATION_PARAMS_PATH": paths["int8_params"],
+            "RESCORE_EMBEDDINGS_PATH": paths["f16"],
+            "HNSW_INDEX_PATH": paths["hnsw"],
+            "COLD_STORE_PATH": str(tmp_path / "cold_store.sqlite"),
+            "PARTITIONS_PATH": str(tmp_path / "missing.json"),
+            "ALTERNATIVES_PATH": str(tmp_path / "missing.npz"),
+        }.items():
+            monkeypatch.setattr(actian, setting, value)
+
+    return configure
+
+
+@pytest.mark.parametrize(
+    "search_engine, fallback, expected",
+    [
+        ("actian", False, None),
+        ("actian", True, "exact"),
+        ("exact", False, "exact"),
+        ("int8", False, "int8"),
+        ("hnsw", False, "hnsw"),
+    ],
+)
+def test_load_local_data_loads_each_search_engine(use_sidecars, sidecars, search_engine, fallback, expected):
+    use_sidecars(search_engine, fallback)
+    client = ActianClient(["localhost:50051"])
+    client.load_local_data()
+
+    engine = client._local_engine
+    if expected is None:
+        assert engine is None
+        return
+    assert engine.name == expected
+    assert len(engine) == len(sidecars["codes"])
+    hits = engine.search(sidecars["vectors"][7].tolist(), top_k=3)
+    assert hits[0][0] == sidecars["point_ids"][7]
+
+
+def test_alias_move_reloads_local_data(monkeypatch, use_sidecars, sidecars):
+    # The switch also reloads the query projection in services.embeddings.
+    pytest.importorskip("sentence_transformers")
+    use_sidecars("exact")
+    monkeypatch.setattr(actian, "COLLECTION_REFRESH_SECONDS", 0)
+    code, point_id = sidecars["codes"][0], sidecars["point_ids"][0]
+    writer = ColdStoreWriter(actian.COLD_STORE_PATH)
+    writer.add_many([(code, {"ingredients_text": "old"})])
+    writer.close()
+
+    pointer = {"collection": "products_v1", "generation": 3}
+
+    async def resolve(client, alias):
+        return pointer["collection"], pointer["generation"]
+
+    monkeypatch.setattr(actian, "resolve_version", resolve)
+
+    async def scenario():
+        client = ActianClient(["localhost:50051"])
+        client.load_local_data()
+        assert await client.collection() == "products_v1"
+        engine = client._local_engine
+        version = client._collection_version
+
+        # A reindex rewrites the sidecars, then moves the alias.
+        write_rerank_fields(
+            actian.RERANK_FIELDS_PATH,
+            {point_id: rerank_row({"product_code": code, "ecoscore_grade": "a", "product_name": "new"})},
+        )
+        writer = ColdStoreWriter(actian.COLD_STORE_PATH)
+        writer.add_many([(code, {"ingredients_text": "new"})])
+        writer.close()
+        assert await client.collection() == "products_v1"
+        assert client._cold_store.get(code) == {"ingredients_text": "old"}
+
+        pointer.update(collection="products_v2", generation=4)
+        assert await client.collection() == "products_v2"
+        assert client._rerank_fields.get(point_id)["product_name"] == "new"
+        assert client._cold_store.get(code) == {"ingredients_text": "new"}
+        assert client._local_engine is not engine
+        assert client._collection_version == version + 1
+
+        # An in-place update rewrites the sidecars and bumps the generation only.
+        write_rerank_fields(
+            actian.RERANK_FIELDS_PATH,
+            {point_id: rerank_row({"product_code": code, "ecoscore_grade": "a", "product_name": "newer"})},
+        )
+        assert await client.collection() == "products_v2"
+        assert client._rerank_fields.get(point_id)["product_name"] == "new"
+        pointer["generation"] = 5
+        assert await client.collection() == "products_v2"
+        assert client._rerank_fields.get(point_id)["product_name"] == "newer"
+        assert client._collection_version == version + 2
+        await client.close()
+
+    asyncio.run(scenario())
+
+
+def test_probe_search_does_not_pass_through_the_local_fallback(use_sidecars, sidecars):
+    use_sidecars("actian", fallback=True)
+    client = ActianClient(["localhost:50051"])
+    client.load_local_data()
+    query = sidecars["vectors"][3].tolist()
+
+    async def scenario():
+        # Never connected: Actian calls fail and searches fall back to the local engine.
+        assert (await client.search_similar(query, top_k=1))[0]["product_code"] == sidecars["codes"][3]
+        with pytest.raises(Exception):
+            await client.probe_search(query)
+
+    asyncio.run(scenario())
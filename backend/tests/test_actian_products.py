@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from cortex import CortexError
+
+from services.actian import ActianClient
+
+
+async def _get_product(monkeypatch, error: CortexError):
+    """get_product against a cluster whose point read fails with error."""
+    client = ActianClient(["localhost:50051"])
+
+    class FailingReads:
+        async def get(self, collection, point_id):
+            raise error
+
+    async def collection():
+        return "products_v1"
+
+    client._client = FailingReads()
+    monkeypatch.setattr(client, "collection", collection)
+    return await client.get_product("123")
+
+
+def test_get_product_caches_the_fetched_vector(monkeypatch):
+    client = ActianClient(["localhost:50051"])
+    reads = []
+
+    async def get_point(product_code):
+        reads.append(product_code)
+        return [0.6, 0.8], {"product_code": product_code, "product_name": "Oat milk"}
+
+    monkeypatch.setattr(client, "_get_point", get_point)
+
+    async def scenario():
+        assert (await client.get_product("123"))["product_name"] == "Oat milk"
+        payload, vector = await client.get_product_with_vector("123")
+        assert payload["product_name"] == "Oat milk"
+        assert vector == [0.6, 0.8]
+
+    asyncio.run(scenario())
+    assert reads == ["123"]
+
+
+@pytest.mark.parametrize("error", [CortexError(5, "vector not found"), CortexError(-1, "Vector not found")])
+def test_missing_point_is_an_unknown_product(monkeypatch, error):
+    assert asyncio.run(_get_product(monkeypatch, error)) is None
+
+
+def test_other_read_errors_are_raised(monkeypatch):
+    with pytest.raises(CortexError):
+        asyncio.run(_get_product(monkeypatch, CortexError(13, "internal error")))
@@ -0,0 +1,69 @@
+from types import SimpleNamespace
+
+import pytest
+
+import services.cache
+from services.cache import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(services.cache, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_ttl_but_stay_available_stale(clock):
+    cache = TTLCache(max_size=4, ttl_seconds=10)
+    cache.set("a", 1)
+
+    clock[0] += 10
+    assert cache.get("a") == 1
+    clock[0] += 0.5
+    assert cache.get("a", "missing") == "missing"
+    assert cache.get_stale("a") == 1
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stale_hits"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_set_refreshes_the_ttl(clock):
+    cache = TTLCache(max_size=4, ttl_seconds=10)
+    cache.set("a", 1)
+    clock[0] += 8
+    cache.set("a", 2)
+    clock[0] += 8
+    assert cache.get("a") == 2
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = TTLCache(max_size=2, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size"] == 2
+
+
+def test_zero_size_cache_is_disabled(clock):
+    cache = TTLCache(max_size=0, ttl_seconds=10)
+    cache.set("a", 1)
+    assert not cache.enabled
+    assert cache.get("a") is None
+    assert cache.get_stale("a") is None
+
+
+def test_invalidate_and_clear(clock):
+    cache = TTLCache(max_size=4, ttl_seconds=10)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.invalidate("a")
+    assert cache.get_stale("a") is None
+    cache.clear()
+    assert cache.stats()["size"] == 0
@@ -0,0 +1,122 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import services.circuit_breaker
+from services.circuit_breaker import CircuitBreaker, CircuitOpenError, mark_stale, track_staleness
+
+
+class NotFound(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(services.circuit_breaker, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+
+async def _ok():
+    return "ok"
+
+
+async def _fail():
+    raise ConnectionError("down")
+
+
+async def _not_found():
+    raise NotFound()
+
+
+async def _slow():
+    await asyncio.sleep(1)
+    return "late"
+
+
+def _call(breaker: CircuitBreaker, fn, op: str = "search"):
+    return asyncio.run(breaker.call(op, fn))
+
+
+def _trip(breaker: CircuitBreaker, failures: int):
+    for _ in range(failures):
+        with pytest.raises(ConnectionError):
+            _call(breaker, _fail)
+
+
+def test_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker({}, failure_threshold=3, open_seconds=15)
+    _trip(breaker, 2)
+    assert _call(breaker, _ok) == "ok"
+    _trip(breaker, 2)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        _call(breaker, _ok)
+    assert breaker.stats() == {"state": "open", "consecutive_failures": 3, "trips": 1, "rejected": 1}
+
+
+def test_half_open_probe_closes_or_reopens(clock):
+    breaker = CircuitBreaker({}, failure_threshold=1, open_seconds=15)
+    _trip(breaker, 1)
+    clock[0] += 15
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+    # A failed probe re-opens for another open_seconds.
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 14
+    assert breaker.state == CircuitBreaker.OPEN
+    clock[0] += 1
+
+    assert _call(breaker, _ok) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["trips"] == 1
+
+
+def test_only_one_probe_at_a_time(clock):
+    breaker = CircuitBreaker({}, failure_threshold=1, open_seconds=15)
+    _trip(breaker, 1)
+    clock[0] += 15
+
+    async def scenario():
+        probe = asyncio.ensure_future(breaker.call("search", _slow))
+        await asyncio.sleep(0)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call("search", _ok)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # A cancelled probe frees the slot without deciding the state.
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        return await breaker.call("search", _ok)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_slow_calls_count_as_failures(clock):
+    breaker = CircuitBreaker({"search": 10}, failure_threshold=1)
+    with pytest.raises(asyncio.TimeoutError):
+        _call(breaker, _slow)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_answered_errors_count_as_successes(clock):
+    breaker = CircuitBreaker({}, failure_threshold=2, answered_errors=(NotFound,))
+    _trip(breaker, 1)
+    with pytest.raises(NotFound):
+        _call(breaker, _not_found)
+    _trip(breaker, 1)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_mark_stale_only_flags_inside_track_staleness():
+    mark_stale()
+    with track_staleness() as flag:
+        assert flag == [False]
+        mark_stale()
+    assert flag == [True]
@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _import_config(**env) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, "-c", "import config"],
+        cwd=BACKEND_DIR,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+    )
+
+
+@pytest.mark.parametrize("growth", ["0", "1"])
+def test_recommend_window_growth_below_two_is_rejected(growth):
+    result = _import_config(RECOMMEND_WINDOW_GROWTH=growth)
+    assert result.returncode != 0
+    assert "RECOMMEND_WINDOW_GROWTH must be at least 2" in result.stderr
+
+
+def test_recommend_window_growth_is_used_as_configured():
+    assert _import_config(RECOMMEND_WINDOW_GROWTH="3").returncode == 0
+
+
+@pytest.mark.parametrize("start", ["0", "-5"])
+def test_recommend_start_window_below_one_is_rejected(start):
+    result = _import_config(RECOMMEND_START_WINDOW=start)
+    assert result.returncode != 0
+    assert "RECOMMEND_START_WINDOW must be at least 1" in result.stderr
+
+
+def test_recommend_max_window_below_start_is_rejected():
+    result = _import_config(RECOMMEND_START_WINDOW="20", RECOMMEND_MAX_WINDOW="10")
+    assert result.returncode != 0
+    assert "RECOMMEND_MAX_WINDOW (10) must be at least RECOMMEND_START_WINDOW (20)" in result.stderr
+
+
+def test_recommend_max_window_equal_to_start_is_accepted():
+    assert _import_config(RECOMMEND_START_WINDOW="20", RECOMMEND_MAX_WINDOW="20").returncode == 0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import services.embeddings as embeddings
+from services.projection import PcaProjection
+
+DIM, REDUCED_DIM = 8, 3
+
+
+class _Model:
+    """Stands in for the SentenceTransformer: a fixed unit vector per text."""
+
+    def encode(self, texts, **kwargs):
+        rows = [np.random.default_rng(len(t)).standard_normal(DIM) for t in texts]
+        return np.array([r / np.linalg.norm(r) for r in rows], dtype=np.float32)
+
+
+def _save_projection(path, seed):
+    vectors = np.random.default_rng(seed).standard_normal((50, DIM)).astype(np.float32)
+    PcaProjection.fit(vectors, REDUCED_DIM).save(path)
+
+
+@pytest.fixture
+def reduced(monkeypatch, tmp_path):
+    path = str(tmp_path / "pca_projection.npz")
+    monkeypatch.setattr(embeddings, "PCA_PROJECTION_PATH", path)
+    monkeypatch.setattr(embeddings, "EMBEDDING_REDUCED_DIM", REDUCED_DIM)
+    monkeypatch.setattr(embeddings, "_model", _Model())
+    monkeypatch.setattr(embeddings, "_projection", None)
+    monkeypatch.setattr(embeddings, "_cache", embeddings.TTLCache(16, 3600))
+    return path
+
+
+def test_reload_projection_replaces_basis_and_cached_vectors(reduced):
+    _save_projection(reduced, seed=1)
+    before = embeddings.embed_text("oat milk")
+    assert len(before) == REDUCED_DIM
+    assert embeddings.cache_stats()["size"] == 1
+
+    # A --full reindex refits the projection file under the running worker.
+    _save_projection(reduced, seed=2)
+    assert embeddings.embed_text("oat milk") == before
+
+    embeddings.reload_projection()
+    assert embeddings.cache_stats()["size"] == 0
+    after = embeddings.embed_text("oat milk")
+    expected = PcaProjection.load(reduced).apply(_Model().encode(["oat milk"]))[0]
+    assert np.allclose(after, expected, atol=1e-6)
+    assert not np.allclose(after, before, atol=1e-3)
+
+
+def test_vectors_encoded_across_a_reload_are_not_cached(reduced, monkeypatch):
+    _save_projection(reduced, seed=1)
+    encode = embeddings._encode
+
+    def encode_then_reload(texts):
+        vectors = encode(texts)
+        embeddings.reload_projection()
+        return vectors
+
+    monkeypatch.setattr(embeddings, "_encode", encode_then_reload)
+    embeddings.embed_text("oat milk")
+    assert embeddings.cache_stats()["size"] == 0
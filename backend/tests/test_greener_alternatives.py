@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from services.actian import ActianClient
+from services.partitions import category_keys
+
+PRODUCTS = [
+    {"product_code": "1", "categories": "Beverages, Sodas", "ecoscore_grade": "a", "partition": "drinks"},
+    {"product_code": "2", "categories": "Snacks, Chips", "ecoscore_grade": "a", "partition": "snacks"},
+    {"product_code": "3", "categories": "Beverages, Waters", "ecoscore_grade": "b", "partition": "drinks"},
+    {"product_code": "4", "categories": "Snacks, Crackers", "ecoscore_grade": "b", "partition": "snacks"},
+]
+
+
+def _client(monkeypatch, with_category_keys: bool) -> tuple[ActianClient, list]:
+    """ActianClient over an in-memory collection; products are in similarity order."""
+    payloads = [
+        {**p, "category_keys": category_keys(p["categories"])} if with_category_keys else dict(p)
+        for p in PRODUCTS
+    ]
+    searches = []
+
+    async def collection():
+        return "products_v1"
+
+    async def search(embedding, top_k, grades=None, partitions=None, categories=None):
+        searches.append(categories)
+        hits = [p for p in payloads if not grades or p["ecoscore_grade"] in grades]
+        if partitions:
+            hits = [p for p in hits if p["partition"] in partitions]
+        if categories:
+            # Like the DB filter: only payloads that have matching category_keys.
+            hits = [p for p in hits if set(categories) & set(p.get("category_keys", ()))]
+        return [dict(p) for p in hits[:top_k]]
+
+    async def get_product(code):
+        return next(dict(p) for p in payloads if p["product_code"] == code)
+
+    client = ActianClient(["localhost:50051"])
+    monkeypatch.setattr(client, "collection", collection)
+    monkeypatch.setattr(client, "_search", search)
+    monkeypatch.setattr(client, "get_product", get_product)
+    return client, searches
+
+
+@pytest.mark.parametrize("with_category_keys", [True, False])
+def test_greener_alternatives_stay_in_category(monkeypatch, with_category_keys):
+    client, searches = _client(monkeypatch, with_category_keys)
+
+    async def scenario():
+        return await client.search_greener_alternatives(
+            [1.0], category="Beverages, Soft drinks", top_k=2, pad_off_category=False
+        )
+
+    results = asyncio.run(scenario())
+    assert [r["product_code"] for r in results] == ["1", "3"]
+    # Collections without category_keys are filtered after the search instead.
+    assert any(searches) == with_category_keys
+
+
+def test_category_keys_check_runs_once_per_collection(monkeypatch):
+    client, searches = _client(monkeypatch, with_category_keys=False)
+
+    async def scenario():
+        for _ in range(3):
+            await client.search_greener_alternatives([1.0], category="Snacks", top_k=2, pad_off_category=False)
+
+    asyncio.run(scenario())
+    assert client._category_keys_by_collection == {"products_v1": False}
+    # One probe search, then one over-fetching search per request.
+    assert len(searches) == 4
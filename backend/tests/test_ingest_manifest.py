@@ -0,0 +1,25 @@
+from services.ingest_manifest import IngestManifest, content_hash
+
+
+def test_content_hash_is_stable_across_key_order():
+    assert content_hash({"a": 1, "b": "é"}) == content_hash({"b": "é", "a": 1})
+    assert content_hash({"a": 1}) != content_hash({"a": 2})
+    assert content_hash("text") != content_hash("text ")
+
+
+def test_manifest_round_trip(tmp_path):
+    path = str(tmp_path / "ingest_manifest.json")
+    assert IngestManifest.load(path) is None
+
+    manifest = IngestManifest("products_v2", "all-MiniLM-L6-v2", 384)
+    manifest.products["001"] = [content_hash({"name": "Cola"}), content_hash("Cola")]
+    manifest.save(path)
+
+    loaded = IngestManifest.load(path)
+    assert loaded.collection == "products_v2"
+    assert loaded.matches("all-MiniLM-L6-v2", 384)
+    assert not loaded.matches("all-MiniLM-L6-v2", 256)
+    assert loaded.payload_hash("001") == content_hash({"name": "Cola"})
+    assert loaded.text_hash("001") == content_hash("Cola")
+    assert loaded.payload_hash("002") is None
+    assert not (tmp_path / "ingest_manifest.json.tmp").exists()
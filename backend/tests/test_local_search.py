@@ -0,0 +1,77 @@
+import numpy as np
+
+from services.local_search import ExactSearchEngine, HnswSearchEngine, QuantizedSearchEngine
+from services.rerank_fields import RerankFieldStore
+
+
+def _engines(sidecars) -> tuple[ExactSearchEngine, QuantizedSearchEngine]:
+    paths = sidecars["paths"]
+    rerank_fields = RerankFieldStore()
+    rerank_fields.load(paths["rerank_fields"])
+    exact = ExactSearchEngine(block_rows=64)
+    assert exact.load(paths["embeddings"], paths["index"], rerank_fields)
+    int8 = QuantizedSearchEngine(rescore_factor=4, block_rows=64)
+    assert int8.load(paths["int8"], paths["int8_params"], paths["f16"], paths["index"], rerank_fields)
+    return exact, int8
+
+
+def test_int8_rescoring_matches_exact_search(sidecars):
+    exact, int8 = _engines(sidecars)
+    rng = np.random.default_rng(1)
+    for query in rng.standard_normal((20, sidecars["vectors"].shape[1])).astype(np.float32):
+        query /= np.linalg.norm(query)
+        expected = exact.search(query.tolist(), top_k=5)
+        got = int8.search(query.tolist(), top_k=5)
+        assert [pid for pid, _ in got] == [pid for pid, _ in expected]
+        # Rescored against float16 originals, so scores are near-exact.
+        np.testing.assert_allclose([s for _, s in got], [s for _, s in expected], atol=1e-2)
+
+
+def test_filters_restrict_both_engines(sidecars):
+    exact, int8 = _engines(sidecars)
+    grade_of = {pid: "abcde"[i % 5] for i, pid in enumerate(sidecars["point_ids"])}
+    query = sidecars["vectors"][0].tolist()
+    for engine in (exact, int8):
+        hits = engine.search(query, top_k=10, grades=["a", "b"])
+        assert len(hits) == 10
+        assert {grade_of[pid] for pid, _ in hits} <= {"a", "b"}
+        assert engine.search(query, top_k=10, categories=["beverages"]) == []
+
+
+def _hnsw(sidecars) -> HnswSearchEngine:
+    paths = sidecars["paths"]
+    rerank_fields = RerankFieldStore()
+    rerank_fields.load(paths["rerank_fields"])
+    engine = HnswSearchEngine(sidecars["vectors"].shape[1], ef_search=8)
+    assert engine.load(paths["hnsw"], paths["index"], rerank_fields)
+    return engine
+
+
+def test_hnsw_returns_more_results_than_ef_search(sidecars):
+    engine = _hnsw(sidecars)
+    exact, _ = _engines(sidecars)
+    query = sidecars["vectors"][0].tolist()
+    hits = engine.search(query, top_k=40, grades=["a"])
+    # 200 products with grades cycling through five letters: all 40 grade-a ones.
+    assert len(hits) == 40
+    assert {pid for pid, _ in hits} == {pid for pid, _ in exact.search(query, top_k=40, grades=["a"])}
+
+
+def test_hnsw_returns_every_reachable_result_when_the_walk_falls_short(sidecars):
+    engine = _hnsw(sidecars)
+    index = engine._index
+
+    class ShortWalk:
+        """An index whose filtered walk only ever reaches 37 allowed items."""
+
+        def get_current_count(self):
+            return index.get_current_count()
+
+        def knn_query(self, q, k, filter=None):
+            if filter is not None and k > 37:
+                raise RuntimeError("Cannot return the results in a contiguous 2D array")
+            return index.knn_query(q, k=k, filter=filter)
+
+    engine._index = ShortWalk()
+    hits = engine.search(sidecars["vectors"][0].tolist(), top_k=50, grades=["a", "b"])
+    assert len(hits) == 37
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+from fastapi import Response
+
+pytest.importorskip("sentence_transformers")
+
+from routers import recommend as recommend_router
+
+
+def test_precomputed_alternatives_are_hydrated_to_full_payloads(monkeypatch):
+    client = recommend_router.actian_client
+    monkeypatch.setattr(
+        client,
+        "precomputed_alternatives",
+        lambda code: [{"product_code": "222", "product_name": "Oat Milk", "similarity_score": 0.9}],
+    )
+
+    async def get_product(code):
+        return {"product_code": code, "product_name": "Oat Milk", "ingredients_text": "oats, water"}
+
+    monkeypatch.setattr(client, "get_product", get_product)
+    # No two-phase sidecar, local engine or cold store: hydrate() would skip by default.
+    assert not client.two_phase and client._local_engine is None and not client._cold_store.is_open
+
+    response = Response()
+    results = asyncio.run(recommend_router.recommend("111", response))
+    assert response.headers["X-Alternatives-Source"] == "table"
+    assert results == [
+        {"product_code": "222", "product_name": "Oat Milk", "ingredients_text": "oats, water", "similarity_score": 0.9}
+    ]
@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from cortex import CortexError
+
+from services.replicas import AsyncReplicaSetClient, replica_addresses, replica_set
+
+
+class FakeReplica:
+    """Minimal AsyncCortexClient stand-in: answers search with its own address."""
+
+    def __init__(self, address: str, delay: float = 0.0):
+        self.address = address
+        self.delay = delay
+        self.error: Exception | None = None
+        self.healthy = True
+        self.calls: list[str] = []
+        self.written: list = []
+
+    async def connect(self):
+        pass
+
+    async def close(self):
+        pass
+
+    async def health_check(self):
+        if not self.healthy:
+            raise ConnectionError("health check failed")
+        return "fake", 1
+
+    async def search(self, collection_name, query, top_k=10):
+        self.calls.append("search")
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.address
+
+    async def batch_upsert(self, collection_name, ids, vectors, payloads=None):
+        self.calls.append("batch_upsert")
+        if self.error:
+            raise self.error
+        self.written.extend(ids)
+
+
+def _replica_set(*replicas: FakeReplica, **kwargs) -> AsyncReplicaSetClient:
+    kwargs.setdefault("health_interval", 0)
+    kwargs.setdefault("hedge_percentile", 0)
+    return AsyncReplicaSetClient({r.address: r for r in replicas}, **kwargs)
+
+
+def _healthy(client: AsyncReplicaSetClient) -> dict[str, bool]:
+    return {r["address"]: r["healthy"] for r in client.stats()["replicas"]}
+
+
+def test_replica_addresses_and_single_replica_passthrough():
+    assert replica_addresses(" a:1 | b:2 ") == ["a:1", "b:2"]
+    assert replica_addresses("a:1") == ["a:1"]
+    only = FakeReplica("a:1")
+    assert replica_set({"a:1": only}) is only
+
+
+def test_reads_go_to_the_replica_with_fewest_requests_in_flight():
+    slow, fast = FakeReplica("slow", delay=0.05), FakeReplica("fast")
+    client = _replica_set(slow, fast)
+
+    async def scenario():
+        stuck = asyncio.ensure_future(client.search("c", query=[1.0]))
+        await asyncio.sleep(0)
+        # While "slow" has a read in flight, every new read prefers the idle replica.
+        answers = [await client.search("c", query=[1.0]) for _ in range(5)]
+        return await stuck, answers
+
+    stuck, answers = asyncio.run(scenario())
+    assert stuck == "slow"
+    assert answers == ["fast"] * 5
+
+
+def test_idle_replicas_take_turns():
+    first, second = FakeReplica("first"), FakeReplica("second")
+    client = _replica_set(first, second)
+
+    async def scenario():
+        return [await client.search("c", query=[1.0]) for _ in range(4)]
+
+    assert asyncio.run(scenario()) == ["first", "second", "first", "second"]
+
+
+def test_transport_error_fails_over_and_ejects_the_replica():
+    broken, good = FakeReplica("broken"), FakeReplica("good")
+    broken.error = ConnectionError("down")
+    client = _replica_set(broken, good)
+
+    assert asyncio.run(client.search("c", query=[1.0])) == "good"
+    assert _healthy(client) == {"broken": False, "good": True}
+    # Ejected replicas get no reads while a healthy one remains.
+    asyncio.run(client.search("c", query=[1.0]))
+    assert broken.calls == ["search"]
+
+
+@pytest.mark.parametrize("error", [CortexError(3, "bad request"), NotImplementedError("unsupported")])
+def test_answered_errors_are_raised_without_failover(error):
+    first, second = FakeReplica("first"), FakeReplica("second")
+    first.error = second.error = error
+    client = _replica_set(first, second)
+
+    with pytest.raises(type(error)):
+        asyncio.run(client.search("c", query=[1.0]))
+    assert len(first.calls) + len(second.calls) == 1
+    assert all(_healthy(client).values())
+
+
+def test_every_replica_down_raises_the_transport_error():
+    first, second = FakeReplica("first"), FakeReplica("second")
+    first.error = second.error = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        asyncio.run(_replica_set(first, second).search("c", query=[1.0]))
+
+
+def test_health_monitor_ejects_and_restores_replicas():
+    flaky, steady = FakeReplica("flaky"), FakeReplica("steady")
+    client = _replica_set(flaky, steady, health_interval=0.01)
+
+    async def scenario():
+        await client.connect()
+        flaky.healthy = False
+        await asyncio.sleep(0.05)
+        ejected = _healthy(client)
+        flaky.healthy = True
+        await asyncio.sleep(0.05)
+        await client.close()
+        return ejected, _healthy(client)
+
+    ejected, restored = asyncio.run(scenario())
+    assert ejected == {"flaky": False, "steady": True}
+    assert restored == {"flaky": True, "steady": True}
+
+
+def test_writes_go_to_every_replica_and_raise_if_one_fails():
+    first, second = FakeReplica("first"), FakeReplica("second")
+    client = _replica_set(first, second)
+    asyncio.run(client.batch_upsert("c", ids=[1, 2], vectors=[[1.0], [2.0]]))
+    assert first.written == second.written == [1, 2]
+
+    second.error = ConnectionError("down")
+    with pytest.raises(ConnectionError):
+        asyncio.run(client.batch_upsert("c", ids=[3], vectors=[[3.0]]))
+    assert first.written == [1, 2, 3]
+    assert _healthy(client)["second"] is False
+
+
+def _hedging_set(primary: FakeReplica, backup: FakeReplica) -> AsyncReplicaSetClient:
+    client = _replica_set(primary, backup, hedge_percentile=95)
+    client._latencies["search"].extend([0.001] * 50)
+    # Make the primary the least-used replica so it is tried first.
+    client._replicas[1].requests = 100
+    return client
+
+
+def test_slow_read_is_hedged_to_a_second_replica():
+    primary, backup = FakeReplica("primary", delay=1.0), FakeReplica("backup")
+    client = _hedging_set(primary, backup)
+
+    async def scenario():
+        return await asyncio.wait_for(client.search("c", query=[1.0]), 0.5)
+
+    assert asyncio.run(scenario()) == "backup"
+    stats = client.stats()
+    assert (stats["hedges"], stats["hedge_wins"]) == (1, 1)
+    assert all(_healthy(client).values())
+
+
+def test_primary_failing_before_the_hedge_delay_tries_the_backup_at_once():
+    primary, backup = FakeReplica("primary"), FakeReplica("backup")
+    primary.error = ConnectionError("down")
+    client = _hedging_set(primary, backup)
+    client._latencies["search"].clear()
+    client._latencies["search"].extend([10.0] * 50)
+
+    async def scenario():
+        return await asyncio.wait_for(client.search("c", query=[1.0]), 1.0)
+
+    assert asyncio.run(scenario()) == "backup"
+    assert _healthy(client) == {"primary": False, "backup": True}
+    assert client.stats()["hedges"] == 0
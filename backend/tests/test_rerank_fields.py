@@ -0,0 +1,33 @@
+from services.rerank_fields import RerankFieldStore, patch_rerank_fields, rerank_row, write_rerank_fields
+
+
+def test_patch_rerank_fields_updates_existing_rows_only(tmp_path):
+    path = str(tmp_path / "rerank_fields.json")
+    write_rerank_fields(
+        path,
+        {
+            1: rerank_row({"product_code": "1", "nutriscore_grade": "unknown", "ecoscore_grade": "b"}),
+            2: rerank_row({"product_code": "2", "nutriscore_grade": "a", "ecoscore_grade": "unknown"}),
+        },
+    )
+
+    changed = patch_rerank_fields(
+        path,
+        {
+            1: {"nutriscore_grade": "c", "nutriscore_score": 7},
+            3: {"ecoscore_grade": "a"},
+        },
+    )
+
+    assert changed == 1
+    store = RerankFieldStore()
+    store.load(path)
+    assert store.get(1)["nutriscore_grade"] == "c"
+    assert store.get(1)["ecoscore_grade"] == "b"
+    assert "nutriscore_score" not in store.get(1)
+    assert store.get(2)["ecoscore_grade"] == "unknown"
+    assert store.get(3) is None
+
+
+def test_patch_rerank_fields_without_a_sidecar_is_a_no_op(tmp_path):
+    assert patch_rerank_fields(str(tmp_path / "missing.json"), {1: {"ecoscore_grade": "a"}}) == 0
@@ -0,0 +1,32 @@
+import asyncio
+
+import pytest
+
+from services.actian import ActianClient
+
+
+def _client(monkeypatch, outcomes: dict) -> ActianClient:
+    async def search_similar(embedding, top_k=5):
+        outcome = outcomes[embedding[0]]
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    client = ActianClient(["localhost:50051"])
+    monkeypatch.setattr(client, "search_similar", search_similar)
+    return client
+
+
+def test_failed_guess_is_returned_in_place(monkeypatch):
+    error = RuntimeError("shard down")
+    client = _client(monkeypatch, {1.0: [{"product_code": "1"}], 2.0: error})
+
+    results = asyncio.run(client.search_similar_many([[1.0], [2.0]]))
+    assert results == [[{"product_code": "1"}], error]
+
+
+def test_cancelled_guess_propagates(monkeypatch):
+    client = _client(monkeypatch, {1.0: [{"product_code": "1"}], 2.0: asyncio.CancelledError()})
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(client.search_similar_many([[1.0], [2.0]]))
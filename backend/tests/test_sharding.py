@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services.circuit_breaker import track_staleness
+from services.sharding import AsyncShardedCortexClient, group_by_shard, shard_of
+
+
+class FakeShard:
+    """Holds the points routed to it; search scores are the point IDs themselves."""
+
+    def __init__(self, delay: float = 0.0, error: Exception | None = None):
+        self.delay = delay
+        self.error = error
+        self.points: dict[int, str] = {}
+
+    async def search(self, collection_name, query, top_k=10):
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        hits = sorted(self.points, reverse=True)[:top_k]
+        return [SimpleNamespace(id=i, score=float(i)) for i in hits]
+
+    async def batch_upsert(self, collection_name, ids, vectors, payloads=None):
+        self.points.update(zip(ids, payloads))
+
+    async def get_many(self, collection_name, ids, with_vectors=True, with_payload=True):
+        return [(None, self.points.get(i)) for i in ids]
+
+
+def _client(*shards: FakeShard, **kwargs) -> AsyncShardedCortexClient:
+    client = AsyncShardedCortexClient(list(shards), **kwargs)
+    ids = list(range(1, 31))
+    asyncio.run(client.batch_upsert("products", ids, [[0.0]] * len(ids), [f"p{i}" for i in ids]))
+    return client
+
+
+def test_group_by_shard_keeps_positions():
+    ids = [7, 3, 10, 4, 6]
+    groups = group_by_shard(ids, 3)
+    assert groups == {1: [0, 2, 3], 0: [1, 4]}
+    assert all(shard_of(ids[p], 3) == shard for shard, positions in groups.items() for p in positions)
+
+
+def test_writes_and_gets_route_by_point_id():
+    shards = [FakeShard() for _ in range(3)]
+    client = _client(*shards)
+    assert all(shard_of(i, 3) == n for n, shard in enumerate(shards) for i in shard.points)
+
+    records = asyncio.run(client.get_many("products", [30, 1, 17, 99]))
+    assert [payload for _, payload in records] == ["p30", "p1", "p17", None]
+
+
+def test_search_merges_the_per_shard_top_k():
+    client = _client(FakeShard(), FakeShard(), FakeShard())
+    hits = asyncio.run(client.search("products", query=[0.0], top_k=5))
+    assert [hit.id for hit in hits] == [30, 29, 28, 27, 26]
+
+
+def test_partial_results_leave_out_a_slow_or_failed_shard():
+    client = _client(
+        FakeShard(), FakeShard(delay=1), FakeShard(error=ConnectionError("down")),
+        shard_timeout=0.05, partial_results=True,
+    )
+
+    async def scenario():
+        with track_staleness() as stale:
+            hits = await client.search("products", query=[0.0], top_k=3)
+        return hits, stale[0]
+
+    hits, stale = asyncio.run(scenario())
+    assert [hit.id for hit in hits] == [30, 27, 24]
+    assert stale
+    assert client.stats()["partial_searches"] == 1
+
+
+def test_search_raises_without_partial_results_or_when_every_shard_fails():
+    strict = _client(FakeShard(), FakeShard(error=ConnectionError("down")))
+    with pytest.raises(ConnectionError):
+        asyncio.run(strict.search("products", query=[0.0], top_k=3))
+
+    lenient = _client(
+        FakeShard(error=ConnectionError("down")), FakeShard(error=ConnectionError("down")), partial_results=True
+    )
+    with pytest.raises(ConnectionError):
+        asyncio.run(lenient.search("products", query=[0.0], top_k=3))
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+import config
+from services.sidecars import (
+    SIDECAR_SETTINGS,
+    StagedSidecars,
+    archive_sidecars,
+    drop_sidecars,
+    has_sidecars,
+    restore_sidecars,
+    staging_path,
+    version_dir,
+)
+
+
+def _write(path: str, text: str):
+    # Like every sidecar writer: a new file moved over the old one, never written in place.
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(f"{path}.tmp", path)
+
+
+def _read(path: str) -> str:
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_staging_path_keeps_the_extension():
+    # np.save / np.savez append their extension to paths without one.
+    assert staging_path("/data/embeddings.npy") == "/data/embeddings.next.npy"
+    assert staging_path("/data/pca_projection.npz") == "/data/pca_projection.next.npz"
+
+
+def test_staged_files_replace_live_ones_only_on_commit(tmp_path):
+    rerank = str(tmp_path / "rerank_fields.json")
+    partitions = str(tmp_path / "partitions.json")
+    _write(rerank, "old")
+    _write(partitions, "old")
+
+    staged = StagedSidecars(rerank)
+    _write(staged.path(rerank), "new")
+    _write(staged.path(partitions), "new")
+    assert staged.current(rerank) == staging_path(rerank)
+    assert _read(rerank) == "old"
+
+    assert staged.commit() == 2
+    assert (_read(rerank), _read(partitions)) == ("new", "new")
+    assert staged.current(rerank) == rerank
+    assert not os.path.exists(staging_path(rerank))
+
+
+def test_discard_leaves_live_files_alone(tmp_path):
+    rerank = str(tmp_path / "rerank_fields.json")
+    _write(rerank, "old")
+    staged = StagedSidecars(rerank)
+    _write(staged.path(rerank), "new")
+
+    staged.discard()
+    assert staged.commit() == 0
+    assert _read(rerank) == "old"
+
+
+@pytest.fixture
+def live_files(monkeypatch, tmp_path):
+    """Points every sidecar setting at tmp_path/live; returns setting -> path."""
+    os.makedirs(tmp_path / "live")
+    paths = {}
+    for setting in SIDECAR_SETTINGS:
+        paths[setting] = str(tmp_path / "live" / os.path.basename(getattr(config, setting)))
+        monkeypatch.setattr(config, setting, paths[setting])
+    monkeypatch.setattr(config, "COLLECTION_SIDECARS_DIR", str(tmp_path / "versions"))
+    return paths
+
+
+def test_switching_back_restores_that_versions_files(live_files):
+    rerank, pca = live_files["RERANK_FIELDS_PATH"], live_files["PCA_PROJECTION_PATH"]
+    _write(rerank, "v1")
+    assert archive_sidecars("products_v1") == 1
+
+    # v2 goes live with its own files, including one v1 never had.
+    _write(rerank, "v2")
+    _write(pca, "v2")
+    archive_sidecars("products_v2")
+    assert _read(os.path.join(version_dir("products_v1"), "rerank_fields.json")) == "v1"
+
+    assert restore_sidecars("products_v1") == 1
+    assert _read(rerank) == "v1"
+    assert not os.path.exists(pca)
+
+    restore_sidecars("products_v2")
+    assert (_read(rerank), _read(pca)) == ("v2", "v2")
+
+
+def test_dropped_versions_cannot_be_restored(live_files):
+    _write(live_files["RERANK_FIELDS_PATH"], "v1")
+    archive_sidecars("products_v1")
+    assert has_sidecars("products_v1")
+
+    drop_sidecars("products_v1")
+    assert not has_sidecars("products_v1")
+    assert not has_sidecars("products_v9")
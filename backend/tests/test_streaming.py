@@ -0,0 +1,78 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from services.streaming import NpyRowWriter, Stage, chunked, iter_json_array
+
+
+def test_chunked():
+    assert list(chunked(range(7), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(chunked([], 3)) == []
+
+
+@pytest.mark.parametrize("chunk_chars", [1, 3, 7, 1 << 20])
+def test_iter_json_array_across_chunk_boundaries(tmp_path, chunk_chars):
+    items = [{"code": "001", "name": "Café é", "tags": ["a", "b"]}, 12345, -0.5, "x", [], None, 7]
+    path = tmp_path / "items.json"
+    path.write_text("  \n" + json.dumps(items, indent=2, ensure_ascii=False), encoding="utf-8")
+    assert list(iter_json_array(str(path), chunk_chars=chunk_chars)) == items
+
+
+def test_iter_json_array_rejects_bad_files(tmp_path):
+    not_array = tmp_path / "object.json"
+    not_array.write_text('{"a": 1}', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(not_array)))
+
+    truncated = tmp_path / "truncated.json"
+    truncated.write_text('[1, 2, {"a": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(str(truncated), chunk_chars=4))
+
+    empty = tmp_path / "empty.json"
+    empty.write_text("[ ]", encoding="utf-8")
+    assert list(iter_json_array(str(empty))) == []
+
+
+def test_stage_runs_on_a_worker_thread_in_order():
+    threads = set()
+
+    def produce():
+        for i in range(50):
+            threads.add(threading.current_thread().name)
+            yield i
+
+    assert list(Stage("squares", (i * i for i in Stage("produce", produce(), maxsize=2)))) == [
+        i * i for i in range(50)
+    ]
+    assert threads == {"produce"}
+
+
+def test_stage_reraises_worker_errors():
+    def produce():
+        yield 1
+        raise KeyError("bad row")
+
+    stage = Stage("produce", produce())
+    with pytest.raises(KeyError):
+        list(stage)
+
+
+def test_npy_row_writer(tmp_path):
+    path = str(tmp_path / "rows.npy")
+    writer = NpyRowWriter(path, dim=3, block_rows=2)
+    writer.append(np.arange(6).reshape(2, 3))
+    writer.append(np.arange(6, 15))
+    assert writer.close() == 5
+    np.testing.assert_array_equal(np.load(path), np.arange(15, dtype=np.float32).reshape(5, 3))
+    assert not (tmp_path / "rows.npy.rows.tmp").exists()
+
+
+@pytest.mark.parametrize("split", range(1, 10))
+def test_iter_json_array_number_cut_at_chunk_edge(tmp_path, split):
+    path = tmp_path / "numbers.json"
+    text = "[-0.5, 1.25e3]"
+    path.write_text(text, encoding="utf-8")
+    assert list(iter_json_array(str(path), chunk_chars=split)) == [-0.5, 1250.0]
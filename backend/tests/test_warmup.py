@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("sentence_transformers")
+
+import services.warmup as warmup
+
+
+@pytest.fixture
+def fresh_readiness(monkeypatch):
+    state = warmup.Readiness()
+    monkeypatch.setattr(warmup, "readiness", state)
+    monkeypatch.setattr(warmup, "WARMUP_RETRY_SECONDS", 0)
+    monkeypatch.setattr(warmup, "WARMUP_OPTIONAL_TIMEOUT_SECONDS", 0.05)
+    return state
+
+
+async def _passes():
+    return None
+
+
+def test_hung_optional_step_does_not_hold_readiness(monkeypatch, fresh_readiness):
+    hung = asyncio.Event()
+
+    async def hang():
+        await hung.wait()
+
+    monkeypatch.setattr(warmup, "_load_model", _passes)
+    monkeypatch.setattr(warmup, "_test_search", _passes)
+    monkeypatch.setattr(warmup, "_warm_gemini", hang)
+    monkeypatch.setattr(warmup, "_prime_products", _passes)
+
+    async def scenario():
+        task = asyncio.create_task(warmup.warm_up())
+        await asyncio.sleep(0.01)
+        assert fresh_readiness.ready
+        await asyncio.wait_for(task, 1)
+
+    asyncio.run(scenario())
+    steps = fresh_readiness.stats()["steps"]
+    assert not steps["gemini"]["ok"]
+    assert steps["product_cache"]["ok"]
+
+
+def test_required_steps_retry_until_search_passes(monkeypatch, fresh_readiness):
+    attempts = []
+
+    async def search():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ConnectionError("down")
+        return {"results": 1}
+
+    monkeypatch.setattr(warmup, "_load_model", _passes)
+    monkeypatch.setattr(warmup, "_test_search", search)
+    monkeypatch.setattr(warmup, "_warm_gemini", _passes)
+    monkeypatch.setattr(warmup, "_prime_products", _passes)
+
+    asyncio.run(warmup.warm_up())
+    assert fresh_readiness.ready
+    assert len(attempts) == 3
+
+
+def test_prime_products_bounds_concurrent_reads(monkeypatch, tmp_path, fresh_readiness):
+    path = tmp_path / "warmup_products.json"
+    path.write_text("[" + ",".join(f'"{i}"' for i in range(40)) + "]")
+    monkeypatch.setattr(warmup, "WARMUP_PRODUCTS_PATH", str(path))
+    monkeypatch.setattr(warmup, "PRIME_CONCURRENCY", 4)
+    in_flight, peak = [0], [0]
+
+    async def get_product_with_vector(code):
+        in_flight[0] += 1
+        peak[0] = max(peak[0], in_flight[0])
+        await asyncio.sleep(0)
+        in_flight[0] -= 1
+        return [0.0], {"product_code": code}
+
+    monkeypatch.setattr(warmup.actian_client, "get_product_with_vector", get_product_with_vector)
+    assert asyncio.run(warmup._prime_products()) == {"products": 40, "requested": 40}
+    assert peak[0] == 4